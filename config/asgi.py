@@ -8,11 +8,35 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
+import logging
 import django
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
-# 直接使用 Django 的 ASGI application
-application = get_asgi_application()
+from wallet.services.http_client import HTTPClientRegistry  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Django 的 ASGI application
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """在 Django ASGI 应用外处理 lifespan 事件，worker 退出时释放共享资源"""
+    if scope['type'] != 'lifespan':
+        await django_application(scope, receive, send)
+        return
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            try:
+                await HTTPClientRegistry.close()
+            except Exception as e:
+                logger.error(f"关闭共享 HTTP 会话失败: {str(e)}")
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
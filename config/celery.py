@@ -19,6 +19,12 @@ app.conf.beat_schedule = {
         'task': 'wallet.tasks.check_pending_swap_transactions',
         'schedule': 10.0,
     },
+    # 热门代币缓存预热，每个代币的实际刷新间隔由 CacheWarmer 按访问频率决定
+    'warm-hot-token-caches': {
+        'task': 'wallet.tasks.warm_hot_token_caches',
+        'schedule': 30.0,
+        'options': {'expires': 25},
+    },
 }
 
 # 添加一些基本配置
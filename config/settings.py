@@ -386,4 +386,44 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'Asia/Shanghai'  # 使用与项目相同的时区
\ No newline at end of file
+CELERY_TIMEZONE = 'Asia/Shanghai'  # 使用与项目相同的时区
+# 共享 Redis 配置（跨进程限流、分布式锁等）
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+
+# 上游 API Key 全局限流（令牌桶，所有 Web 和 Celery 进程共享）
+# rate: 每秒补充的令牌数, capacity: 桶容量（允许的突发请求数）, max_wait: 单次请求最长排队时间（秒）
+UPSTREAM_RATE_LIMITS = {
+    'moralis': {
+        'rate': int(os.getenv('MORALIS_RATE_LIMIT', '25')),
+        'capacity': int(os.getenv('MORALIS_RATE_BURST', '50')),
+        'max_wait': 10,
+    },
+    'helius': {
+        'rate': int(os.getenv('HELIUS_RATE_LIMIT', '10')),
+        'capacity': int(os.getenv('HELIUS_RATE_BURST', '20')),
+        'max_wait': 10,
+    },
+}
+
+# 阻塞链上调用（等待收据、估算 gas、合约 .call() 等）专用线程池
+BLOCKING_EXECUTOR_MAX_WORKERS = int(os.getenv('BLOCKING_EXECUTOR_MAX_WORKERS', '16'))
+BLOCKING_EXECUTOR_MAX_QUEUE = int(os.getenv('BLOCKING_EXECUTOR_MAX_QUEUE', '200'))
+
+# 共享缓存（价格、元数据、余额等，所有 worker 共享，重启不丢失）
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/2'),
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'cocowallet',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'SOCKET_CONNECT_TIMEOUT': 1,
+            'SOCKET_TIMEOUT': 1,
+            'CONNECTION_POOL_KWARGS': {'max_connections': 100},
+            # Redis 不可用时按缓存未命中处理，不影响业务请求
+            'IGNORE_EXCEPTIONS': True,
+        },
+    }
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
@@ -0,0 +1,177 @@
+"""阻塞调用专用的有界线程池"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(RuntimeError):
+    """排队中的阻塞调用超过上限"""
+
+
+class BlockingCallExecutor:
+    """运行同步链上调用（web3 同步 Provider、合约 .call() 等）的独立线程池
+
+    与 sync_to_async 使用的默认线程池隔离，等待交易收据这类长时间占用线程的调用
+    不会拖慢数据库访问；线程数和排队数都有上限，排队超过 MAX_QUEUE 时直接拒绝。
+    按调用名称统计排队时间和执行时间，通过 stats() 查看，并每 STATS_LOG_INTERVAL 秒写一次日志。
+    """
+
+    MAX_WORKERS = getattr(settings, 'BLOCKING_EXECUTOR_MAX_WORKERS', 16)
+    MAX_QUEUE = getattr(settings, 'BLOCKING_EXECUTOR_MAX_QUEUE', 200)
+    # 排队超过该时间（秒）时打印告警
+    SLOW_WAIT_WARNING = 1.0
+    STATS_LOG_INTERVAL = getattr(settings, 'BLOCKING_EXECUTOR_STATS_LOG_INTERVAL', 60)
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock = threading.Lock()
+    _pending = 0
+    _active = 0
+    _rejected = 0
+    _metrics: Dict[str, Dict[str, float]] = {}
+    _stats_logged_at = time.monotonic()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=cls.MAX_WORKERS,
+                        thread_name_prefix='blocking-call'
+                    )
+        return cls._executor
+
+    @classmethod
+    async def run(cls, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """在线程池中执行阻塞调用并等待结果
+
+        Args:
+            func: 同步函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: func 的返回值
+
+        Raises:
+            ExecutorSaturated: 排队数已达上限
+        """
+        # 合约调用按合约方法名统计，其他调用按函数名统计
+        fn_name = getattr(getattr(func, '__self__', None), 'fn_name', None)
+        name = f"contract.{fn_name}" if fn_name else getattr(func, '__qualname__', repr(func))
+        with cls._lock:
+            if cls._pending >= cls.MAX_QUEUE:
+                cls._rejected += 1
+                raise ExecutorSaturated(f"阻塞调用排队已满 ({cls._pending})，拒绝执行 {name}")
+            cls._pending += 1
+
+        submitted_at = time.monotonic()
+        # 是否已离开排队：任务开始执行，或在开始前被取消
+        dequeued = False
+
+        def dequeue() -> None:
+            nonlocal dequeued
+            if not dequeued:
+                dequeued = True
+                cls._pending -= 1
+
+        def task() -> Any:
+            started_at = time.monotonic()
+            with cls._lock:
+                dequeue()
+                cls._active += 1
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                finished_at = time.monotonic()
+                with cls._lock:
+                    cls._active -= 1
+                cls._record(name, started_at - submitted_at, finished_at - started_at, error)
+
+        def on_done(_: asyncio.Future) -> None:
+            # 等待方被取消（请求超时、客户端断开）时任务可能永远不会执行，在这里出队
+            with cls._lock:
+                dequeue()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(cls._get_executor(), task)
+        except Exception:
+            with cls._lock:
+                dequeue()
+            raise
+        future.add_done_callback(on_done)
+        return await future
+
+    @classmethod
+    def _record(cls, name: str, wait: float, duration: float, error: bool) -> None:
+        if wait > cls.SLOW_WAIT_WARNING:
+            logger.warning(f"阻塞调用 {name} 排队 {wait:.2f} 秒，线程池可能已饱和")
+        with cls._lock:
+            metric = cls._metrics.setdefault(name, {
+                'calls': 0,
+                'errors': 0,
+                'wait_total': 0.0,
+                'wait_max': 0.0,
+                'run_total': 0.0,
+                'run_max': 0.0,
+            })
+            metric['calls'] += 1
+            if error:
+                metric['errors'] += 1
+            metric['wait_total'] += wait
+            metric['wait_max'] = max(metric['wait_max'], wait)
+            metric['run_total'] += duration
+            metric['run_max'] = max(metric['run_max'], duration)
+
+            now = time.monotonic()
+            log_stats = now - cls._stats_logged_at >= cls.STATS_LOG_INTERVAL
+            if log_stats:
+                cls._stats_logged_at = now
+        if log_stats:
+            cls._log_stats()
+
+    @classmethod
+    def _log_stats(cls) -> None:
+        stats = cls.stats()
+        slowest = sorted(stats['calls'].items(), key=lambda item: item[1]['max_wait_ms'], reverse=True)[:5]
+        logger.info(
+            f"阻塞调用线程池: 执行中 {stats['active']}/{stats['max_workers']}，"
+            f"排队 {stats['queued']}/{stats['max_queue']}，累计拒绝 {stats['rejected']}，"
+            f"排队最久的调用: {dict(slowest)}"
+        )
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """线程池饱和度及各调用的耗时统计"""
+        with cls._lock:
+            calls = {}
+            for name, metric in cls._metrics.items():
+                count = metric['calls'] or 1
+                calls[name] = {
+                    'calls': int(metric['calls']),
+                    'errors': int(metric['errors']),
+                    'avg_wait_ms': round(metric['wait_total'] / count * 1000, 1),
+                    'max_wait_ms': round(metric['wait_max'] * 1000, 1),
+                    'avg_run_ms': round(metric['run_total'] / count * 1000, 1),
+                    'max_run_ms': round(metric['run_max'] * 1000, 1),
+                }
+            return {
+                'max_workers': cls.MAX_WORKERS,
+                'max_queue': cls.MAX_QUEUE,
+                'active': cls._active,
+                'queued': cls._pending,
+                'rejected': cls._rejected,
+                'calls': calls,
+            }
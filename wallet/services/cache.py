@@ -0,0 +1,192 @@
+"""按业务域划分的共享缓存命名空间"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .cache_codec import CompactCodec
+
+logger = logging.getLogger(__name__)
+
+
+class CacheNamespace:
+    """Redis 缓存中的一个命名空间
+
+    键格式为 ``{name}:v{generation}:{key}``。invalidate() 递增命名空间的代数，
+    旧代数下的键不再被读取，随 TTL 自然过期，不需要逐个删除或 SCAN。
+    代数在进程内缓存 GENERATION_TTL 秒，其他 worker 最多延迟这么久看到失效。
+
+    缓存后端异常（Redis 不可用等）由 django-redis 的 IGNORE_EXCEPTIONS 吞掉，
+    读取按未命中处理。
+
+    django-redis 是同步客户端，协程中使用 a 前缀的异步版本（aget、aget_many 等）：
+    在线程池中执行，不阻塞事件循环，超过 ASYNC_TIMEOUT 秒按未命中（写入按失败）处理。
+    同步方法保留给同步视图和线程中的代码。
+    """
+
+    GENERATION_TTL = 5.0
+    ASYNC_TIMEOUT = 0.5
+
+    def __init__(self, name: str, timeout: int):
+        """
+        Args:
+            name: 命名空间名称
+            timeout: 默认过期时间（秒）
+        """
+        self.name = name
+        self.timeout = timeout
+        self._generation: Optional[int] = None
+        self._generation_checked_at = 0.0
+
+    @property
+    def generation_key(self) -> str:
+        return f"{self.name}:generation"
+
+    def get_generation(self) -> int:
+        """获取当前代数"""
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at > self.GENERATION_TTL:
+            generation = cache.get(self.generation_key)
+            if generation is None:
+                generation = 1
+                cache.add(self.generation_key, generation, timeout=None)
+            self._generation = int(generation)
+            self._generation_checked_at = now
+        return self._generation
+
+    def make_key(self, key: str) -> str:
+        return f"{self.name}:v{self.get_generation()}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return cache.get(self.make_key(key), default)
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        cache.set(self.make_key(key), value, self.timeout if timeout is None else timeout)
+
+    def get_compact(self, key: str, default: Any = None) -> Any:
+        """读取 set_compact() 写入的值"""
+        value = CompactCodec.decode(cache.get(self.make_key(key)))
+        return default if value is None else value
+
+    def set_compact(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """用 msgpack + zstd 编码后写入，适用于体积较大的列表和字典"""
+        self.set(key, CompactCodec.encode(value), timeout)
+
+    def delete(self, key: str) -> None:
+        cache.delete(self.make_key(key))
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        """一次往返删除多个键"""
+        keys = list(keys)
+        if keys:
+            cache.delete_many([self.make_key(key) for key in keys])
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """一次往返读取多个键
+
+        Returns:
+            Dict[str, Any]: 命中的键到值的映射（键为调用方传入的原始键）
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        full_keys = {self.make_key(key): key for key in keys}
+        found = cache.get_many(list(full_keys))
+        return {full_keys[full_key]: value for full_key, value in found.items()}
+
+    def set_many(self, data: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        """一次往返写入多个键"""
+        if not data:
+            return
+        cache.set_many(
+            {self.make_key(key): value for key, value in data.items()},
+            self.timeout if timeout is None else timeout
+        )
+
+    def incr(self, key: str, delta: int = 1) -> int:
+        """递增计数器，键不存在时从 delta 开始"""
+        full_key = self.make_key(key)
+        try:
+            value = cache.incr(full_key, delta)
+        except ValueError:
+            cache.set(full_key, delta, self.timeout)
+            value = delta
+        return int(value or 0)
+
+    async def _run_async(self, func: Callable[..., Any], *args: Any, default: Any = None) -> Any:
+        """在线程池中执行同步缓存操作，超时或出错时返回 default"""
+        try:
+            return await asyncio.wait_for(
+                sync_to_async(func, thread_sensitive=False)(*args),
+                timeout=self.ASYNC_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"缓存命名空间 {self.name} 操作超时: {func.__name__}")
+        except Exception as e:
+            logger.warning(f"缓存命名空间 {self.name} 操作失败: {func.__name__}, {str(e)}")
+        return default
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return await self._run_async(self.get, key, default, default=default)
+
+    async def aset(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        await self._run_async(self.set, key, value, timeout)
+
+    async def aget_compact(self, key: str, default: Any = None) -> Any:
+        return await self._run_async(self.get_compact, key, default, default=default)
+
+    async def aset_compact(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        await self._run_async(self.set_compact, key, value, timeout)
+
+    async def adelete(self, key: str) -> None:
+        await self._run_async(self.delete, key)
+
+    async def adelete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if keys:
+            await self._run_async(self.delete_many, keys)
+
+    async def aget_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        return await self._run_async(self.get_many, keys, default={})
+
+    async def aset_many(self, data: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        if data:
+            await self._run_async(self.set_many, data, timeout)
+
+    async def aincr(self, key: str, delta: int = 1) -> int:
+        return await self._run_async(self.incr, key, delta, default=0)
+
+    def invalidate(self) -> int:
+        """使命名空间下的所有键失效
+
+        Returns:
+            int: 新的代数
+        """
+        try:
+            generation = cache.incr(self.generation_key)
+        except ValueError:
+            # 代数键不存在
+            generation = self.get_generation() + 1
+            cache.set(self.generation_key, generation, timeout=None)
+        self._generation = int(generation)
+        self._generation_checked_at = time.monotonic()
+        logger.info(f"缓存命名空间 {self.name} 已失效，当前代数 {generation}")
+        return self._generation
+
+
+# 代币价格
+PRICE_CACHE = CacheNamespace('price', timeout=300)
+# 代币元数据（名称、符号、精度等）
+METADATA_CACHE = CacheNamespace('metadata', timeout=3600)
+# 钱包余额快照
+BALANCE_CACHE = CacheNamespace('balance', timeout=60)
+# 兑换报价
+QUOTE_CACHE = CacheNamespace('quote', timeout=15)
+# 接口响应的 ETag 及版本号
+ETAG_CACHE = CacheNamespace('etag', timeout=7 * 86400)
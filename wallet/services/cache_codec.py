@@ -0,0 +1,88 @@
+"""大体积缓存值的紧凑编码（msgpack + zstd）"""
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+
+import msgpack
+import zstandard
+
+logger = logging.getLogger(__name__)
+
+
+class CompactCodec:
+    """把列表、字典等缓存值编码为 msgpack，超过 COMPRESS_THRESHOLD 字节时再用 zstd 压缩
+
+    Django 缓存默认用 pickle 序列化，代币列表、NFT 资产、资产快照这类由大量小字典
+    组成的数据体积较大。编码后的值为 bytes，第一个字节标记格式：
+
+    - ``m``：未压缩的 msgpack
+    - ``z``：zstd 压缩的 msgpack
+
+    Decimal 和 datetime 通过 msgpack 扩展类型保留原类型，元组解码后为列表。
+    无法编码的值原样返回，由缓存后端按默认方式序列化；解码时非 bytes 的值原样返回，
+    兼容编码前写入的旧缓存。
+    """
+
+    COMPRESS_THRESHOLD = 1024
+    COMPRESS_LEVEL = 3
+
+    FORMAT_MSGPACK = b'm'
+    FORMAT_ZSTD = b'z'
+
+    EXT_DECIMAL = 1
+    EXT_DATETIME = 2
+
+    @classmethod
+    def _default(cls, value: Any) -> Any:
+        if isinstance(value, Decimal):
+            return msgpack.ExtType(cls.EXT_DECIMAL, str(value).encode())
+        if isinstance(value, datetime):
+            return msgpack.ExtType(cls.EXT_DATETIME, value.isoformat().encode())
+        raise TypeError(f"不支持的类型: {type(value)}")
+
+    @classmethod
+    def _ext_hook(cls, code: int, data: bytes) -> Any:
+        if code == cls.EXT_DECIMAL:
+            return Decimal(data.decode())
+        if code == cls.EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        return msgpack.ExtType(code, data)
+
+    @classmethod
+    def encode(cls, value: Any) -> Any:
+        """编码缓存值
+
+        Returns:
+            Any: 编码后的 bytes，无法编码时返回原值
+        """
+        try:
+            packed = msgpack.packb(value, default=cls._default, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError) as e:
+            logger.debug(f"缓存值无法紧凑编码，使用默认序列化: {str(e)}")
+            return value
+
+        if len(packed) < cls.COMPRESS_THRESHOLD:
+            return cls.FORMAT_MSGPACK + packed
+        compressed = zstandard.ZstdCompressor(level=cls.COMPRESS_LEVEL).compress(packed)
+        return cls.FORMAT_ZSTD + compressed
+
+    @classmethod
+    def decode(cls, data: Any) -> Any:
+        """解码缓存值，格式无法识别时返回 None（按缓存未命中处理）"""
+        if not isinstance(data, bytes):
+            return data
+        if not data:
+            return None
+
+        try:
+            fmt, payload = data[:1], data[1:]
+            if fmt == cls.FORMAT_ZSTD:
+                payload = zstandard.ZstdDecompressor().decompress(payload)
+            elif fmt != cls.FORMAT_MSGPACK:
+                logger.warning(f"未知的缓存编码格式: {fmt!r}")
+                return None
+            return msgpack.unpackb(payload, ext_hook=cls._ext_hook, raw=False, strict_map_key=False)
+        except Exception as e:
+            logger.warning(f"缓存值解码失败: {str(e)}")
+            return None
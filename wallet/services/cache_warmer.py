@@ -0,0 +1,126 @@
+"""热门代币价格和元数据的缓存预热"""
+import logging
+import time
+from typing import Dict, List
+
+from asgiref.sync import sync_to_async
+
+from ..models import Token, TokenIndexGrade
+from .cache import PRICE_CACHE
+from .evm.utils import EVMUtils
+from .hot_tokens import HotTokenTracker
+from .price_cache import PriceCache
+from .price_resolver import PriceResolver
+from .token_registry import TokenRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """在价格缓存过期前预先刷新热门代币
+
+    热门代币包括：推荐代币（Token.is_recommended）、A 级代币（TokenIndexGrade）
+    以及最近资产加载中出现最多的 TOP_N 个代币（HotTokenTracker）。
+
+    每个代币按访问次数决定刷新间隔（REFRESH_TIERS），访问越多刷新越频繁，
+    最热的代币在 PriceCache.SOFT_TTL 内就会刷新，用户请求不会遇到过期价格。
+    下次刷新时间通过 PRICE_CACHE 中带 TTL 的标记记录，键不存在即表示到期。
+    """
+
+    TOP_N = 200
+    # (最少访问次数, 刷新间隔秒数)，按访问次数从高到低
+    REFRESH_TIERS = [
+        (100, PriceCache.SOFT_TTL - 15),
+        (10, 240),
+        (0, 900),
+    ]
+    # 推荐代币和 A 级代币没有访问记录时按该访问次数计算
+    CURATED_SCORE = 10
+    DUE_KEY_PREFIX = 'warm:'
+
+    @classmethod
+    def refresh_interval(cls, score: float) -> int:
+        for min_score, interval in cls.REFRESH_TIERS:
+            if score >= min_score:
+                return interval
+        return cls.REFRESH_TIERS[-1][1]
+
+    @classmethod
+    async def run(cls) -> Dict[str, int]:
+        """预热到期的热门代币
+
+        Returns:
+            Dict[str, int]: 各链本次预热的代币数量
+        """
+        started_at = time.monotonic()
+        hot_set = await cls.get_hot_set()
+
+        warmed = {}
+        for chain, scores in hot_set.items():
+            try:
+                warmed[chain] = await cls._warm_chain(chain, scores)
+            except Exception as e:
+                logger.error(f"预热 {chain} 热门代币失败: {str(e)}")
+
+        logger.info(
+            f"热门代币预热完成: {warmed}，耗时 {time.monotonic() - started_at:.2f} 秒"
+        )
+        return warmed
+
+    @classmethod
+    async def get_hot_set(cls) -> Dict[str, Dict[str, float]]:
+        """按链汇总热门代币及其访问次数"""
+        chains = list(EVMUtils.CHAIN_CONFIG) + [PriceResolver.CHAIN_SOLANA]
+        hot_set: Dict[str, Dict[str, float]] = {}
+        for chain, address in await sync_to_async(cls._load_curated)():
+            if chain not in chains:
+                continue
+            address = TokenRegistry.normalize_address(address)
+            hot_set.setdefault(chain, {})[address] = cls.CURATED_SCORE
+
+        for chain in chains:
+            for address, score in await HotTokenTracker.top(chain, cls.TOP_N):
+                tokens = hot_set.setdefault(chain, {})
+                tokens[address] = max(tokens.get(address, 0), score)
+
+        # 原生代币没有合约地址，不能通过批量接口获取
+        native = EVMUtils.NATIVE_TOKEN_ADDRESS.lower()
+        for tokens in hot_set.values():
+            tokens.pop(native, None)
+        return hot_set
+
+    @staticmethod
+    def _load_curated() -> List[tuple]:
+        curated = set(Token.objects.filter(is_recommended=True).values_list('chain', 'address'))
+        curated.update(
+            TokenIndexGrade.objects.filter(grade='A').values_list('token__chain', 'token__address')
+        )
+        return list(curated)
+
+    @classmethod
+    async def _warm_chain(cls, chain: str, scores: Dict[str, float]) -> int:
+        due_keys = {f"{cls.DUE_KEY_PREFIX}{PriceCache.make_key(chain, address)}": address for address in scores}
+        not_due = await PRICE_CACHE.aget_many(list(due_keys))
+        due = [address for key, address in due_keys.items() if key not in not_due]
+        if not due:
+            return 0
+        due_set = set(due)
+
+        await PriceResolver.refresh(chain, due)
+
+        # 元数据：数据库中有的写入缓存，没有的从上游获取
+        metadata = await TokenRegistry.get_many(chain, due, fill_missing=False)
+        missing = [address for address in due if address not in metadata]
+        if missing:
+            await TokenRegistry.fetch_missing(chain, missing)
+
+        # 按刷新间隔分组记录下次刷新时间
+        by_interval: Dict[int, Dict[str, bool]] = {}
+        for key, address in due_keys.items():
+            if address in due_set:
+                by_interval.setdefault(cls.refresh_interval(scores[address]), {})[key] = True
+        for interval, keys in by_interval.items():
+            await PRICE_CACHE.aset_many(keys, interval)
+
+        logger.debug(f"预热 {chain} 代币 {len(due)} 个")
+        return len(due)
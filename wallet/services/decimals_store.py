@@ -0,0 +1,96 @@
+"""代币精度存储"""
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+
+from ..models import Token
+from .cache import METADATA_CACHE
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DecimalsFetcher = Callable[[], Awaitable[Optional[int]]]
+
+
+class TokenDecimals:
+    """代币精度的永久缓存（进程内 → Redis → Token 表 → 上游）
+
+    代币精度部署后不会再变化，每个代币只需要从上游获取一次，之后报价和转账
+    都不再为精度发起网络请求。上游获取失败时不写入缓存，由调用方决定默认值。
+
+    Token 表中只信任有符号（symbol）的记录：切换显示状态等操作会创建只有地址的记录，
+    其 decimals 是字段默认值而不是真实精度。
+    """
+
+    KEY_PREFIX = 'decimals:'
+    L2_TTL = 30 * 24 * 3600
+    L1_MAX_ENTRIES = 100000
+
+    # 不需要查询的精度
+    KNOWN_DECIMALS = {
+        'SOL:So11111111111111111111111111111111111111112': 9,
+        'SOL:EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': 6,
+    }
+
+    _l1: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(chain: str, address: str) -> str:
+        """EVM 地址不区分大小写，Solana 地址区分大小写"""
+        address = address.lower() if address.startswith('0x') else address
+        return f"{chain.upper()}:{address}"
+
+    @classmethod
+    async def get(cls, chain: str, address: str, fetcher: DecimalsFetcher) -> Optional[int]:
+        """获取代币精度
+
+        Args:
+            chain: 链标识
+            address: 代币地址
+            fetcher: 无参协程函数，从上游获取精度，失败返回 None
+
+        Returns:
+            Optional[int]: 代币精度，全部失败时返回 None
+        """
+        key = cls.make_key(chain, address)
+        decimals = cls.KNOWN_DECIMALS.get(key, cls._l1.get(key))
+        if decimals is not None:
+            return decimals
+
+        async def load() -> Optional[int]:
+            value = await METADATA_CACHE.aget(cls.KEY_PREFIX + key)
+            if value is None:
+                value = await sync_to_async(cls._load_from_db)(chain, address)
+            if value is None:
+                value = await fetcher()
+                if value is None:
+                    return None
+                await METADATA_CACHE.aset(cls.KEY_PREFIX + key, int(value), cls.L2_TTL)
+            return int(value)
+
+        decimals = await SingleFlight.do(f"{cls.KEY_PREFIX}{key}", load)
+        if decimals is not None:
+            cls._set_l1(key, decimals)
+        return decimals
+
+    @classmethod
+    def set(cls, chain: str, address: str, decimals: int) -> None:
+        """写入已知的代币精度（例如从链上账户数据中解析到）"""
+        key = cls.make_key(chain, address)
+        cls._set_l1(key, decimals)
+        METADATA_CACHE.set(cls.KEY_PREFIX + key, int(decimals), cls.L2_TTL)
+
+    @classmethod
+    def _set_l1(cls, key: str, decimals: int) -> None:
+        if len(cls._l1) >= cls.L1_MAX_ENTRIES:
+            cls._l1.clear()
+        cls._l1[key] = int(decimals)
+
+    @staticmethod
+    def _load_from_db(chain: str, address: str) -> Optional[int]:
+        lookup = {'address__iexact': address} if address.startswith('0x') else {'address': address}
+        token = Token.objects.filter(chain=chain, **lookup).exclude(symbol='').only('decimals').first()
+        if token is None or token.decimals is None:
+            return None
+        return token.decimals
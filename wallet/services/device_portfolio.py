@@ -0,0 +1,192 @@
+"""设备下所有钱包的资产汇总"""
+import asyncio
+import logging
+import time
+import weakref
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from asgiref.sync import sync_to_async
+
+from ..models import Wallet
+from .evm.utils import EVMUtils
+from .factory import ChainServiceFactory
+from .portfolio_cache import PortfolioSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class DevicePortfolio:
+    """并发加载设备下所有钱包的资产，返回总价值和每个钱包的结果
+
+    每个钱包通过 ChainServiceFactory 获取对应链的余额服务，并复用 PortfolioSnapshot，
+    与单钱包 tokens 接口共用快照。并发数不超过 MAX_CONCURRENCY；每个钱包的结果
+    （包括排队等待的时间）必须在 CHAIN_DEADLINE 秒内返回，超时或失败的钱包单独标记，
+    不影响其他链的结果，总价值只统计成功的钱包。超时的钱包在后台继续加载并写入快照，
+    下一次请求直接命中快照；同一钱包正在后台加载时，新的请求等待同一个任务。
+    后台加载依赖常驻的事件循环（ASGI 部署），WSGI 下请求结束时随事件循环一起结束。
+
+    frames() 按完成顺序逐个产出钱包结果，用于流式响应。
+    """
+
+    MAX_CONCURRENCY = 4
+    CHAIN_DEADLINE = 8.0
+
+    STATUS_SUCCESS = 'success'
+    STATUS_TIMEOUT = 'timeout'
+    STATUS_ERROR = 'error'
+
+    # 快照键 -> (加载任务, 是否强制刷新)
+    _loading: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Tuple[asyncio.Task, bool]]]' = \
+        weakref.WeakKeyDictionary()
+
+    @classmethod
+    async def load(cls, device_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """加载设备的资产汇总
+
+        Args:
+            device_id: 设备ID
+            refresh: 是否忽略资产快照强制刷新
+
+        Returns:
+            Dict[str, Any]: total_value_usd、complete（是否所有钱包都成功）和 wallets
+        """
+        started_at = time.monotonic()
+        results = []
+        wallets = cls.iter_wallets(device_id, refresh)
+        try:
+            async for result in wallets:
+                results.append(result)
+        finally:
+            await wallets.aclose()
+        results.sort(key=lambda result: result['wallet_id'])
+
+        logger.debug(
+            f"设备 {device_id} 资产汇总完成: {len(results)} 个钱包，"
+            f"耗时 {time.monotonic() - started_at:.2f} 秒"
+        )
+        return {**cls.summarize(results), 'wallets': results}
+
+    @classmethod
+    async def frames(cls, device_id: str, refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """流式响应的帧：每个钱包加载完成后产出 wallet 帧，最后产出 totals 帧"""
+        results = []
+        wallets = cls.iter_wallets(device_id, refresh)
+        try:
+            async for result in wallets:
+                results.append(result)
+                yield {'type': 'wallet', 'wallet': result}
+        finally:
+            await wallets.aclose()
+        yield {'type': 'totals', 'wallet_count': len(results), **cls.summarize(results)}
+
+    @classmethod
+    async def iter_wallets(cls, device_id: str, refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """并发加载设备下的钱包，按完成顺序产出每个钱包的结果"""
+        wallets = await sync_to_async(cls._load_wallets)(device_id)
+        semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+
+        tasks = [asyncio.ensure_future(cls._load_wallet(wallet, semaphore, refresh)) for wallet in wallets]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 调用方提前停止迭代（如客户端断开）时取消未完成的加载
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    def summarize(cls, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """汇总总价值（只统计成功的钱包）及是否全部成功"""
+        total_value = Decimal('0')
+        for result in results:
+            if result['status'] == cls.STATUS_SUCCESS:
+                total_value += cls._to_decimal(result['total_value_usd'])
+        return {
+            'total_value_usd': str(total_value),
+            'complete': all(result['status'] == cls.STATUS_SUCCESS for result in results)
+        }
+
+    @staticmethod
+    def _load_wallets(device_id: str) -> List[Wallet]:
+        chains = set(EVMUtils.CHAIN_CONFIG) | {'SOL'}
+        return [
+            wallet for wallet in Wallet.objects.filter(device_id=device_id, is_active=True).order_by('id')
+            if wallet.chain in chains
+        ]
+
+    @classmethod
+    async def _load_wallet(cls, wallet: Wallet, semaphore: asyncio.Semaphore, refresh: bool) -> Dict[str, Any]:
+        result = {
+            'wallet_id': wallet.id,
+            'name': wallet.name,
+            'chain': wallet.chain,
+            'address': wallet.address,
+            'is_watch_only': wallet.is_watch_only,
+            'status': cls.STATUS_SUCCESS,
+            'total_value_usd': '0',
+            'tokens': []
+        }
+
+        async def load() -> Dict[str, Any]:
+            async with semaphore:
+                # 超时只取消等待，加载任务继续执行并写入快照
+                snapshot, _ = await asyncio.shield(cls._get_load_task(wallet, refresh))
+                return snapshot
+
+        try:
+            snapshot = await asyncio.wait_for(load(), timeout=cls.CHAIN_DEADLINE)
+            result['total_value_usd'] = str(snapshot.get('total_value_usd', '0'))
+            result['tokens'] = snapshot.get('tokens', [])
+        except asyncio.TimeoutError:
+            logger.warning(f"加载钱包资产超时: {wallet.chain} {wallet.address}")
+            result['status'] = cls.STATUS_TIMEOUT
+        except Exception as e:
+            logger.error(f"加载钱包资产失败 {wallet.chain} {wallet.address}: {str(e)}")
+            result['status'] = cls.STATUS_ERROR
+        return result
+
+    @classmethod
+    def _get_load_task(cls, wallet: Wallet, refresh: bool) -> asyncio.Task:
+        """获取钱包的加载任务，已有未完成的任务时直接复用
+
+        强制刷新不复用非刷新的任务（其结果可能来自快照），而是启动新的刷新任务；
+        之后的请求复用这个刷新任务。
+        """
+        loop = asyncio.get_running_loop()
+        loading = cls._loading.get(loop)
+        if loading is None:
+            loading = {}
+            cls._loading[loop] = loading
+
+        key = PortfolioSnapshot.make_key(wallet.chain, wallet.address)
+        entry = loading.get(key)
+        if entry is not None and (entry[1] or not refresh):
+            return entry[0]
+
+        balance_service = ChainServiceFactory.get_balance_service(wallet.chain)
+        task = loop.create_task(PortfolioSnapshot.get_or_load(
+            wallet.chain,
+            wallet.address,
+            lambda: balance_service.get_all_token_balances(wallet.address, include_hidden=False),
+            refresh=refresh
+        ))
+
+        def on_done(finished: asyncio.Task) -> None:
+            current = loading.get(key)
+            if current is not None and current[0] is finished:
+                del loading[key]
+            # 没有等待者（已超时）时避免 "exception was never retrieved" 警告
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.error(f"后台加载钱包资产失败 {wallet.chain} {wallet.address}: {finished.exception()}")
+
+        task.add_done_callback(on_done)
+        loading[key] = (task, refresh)
+        return task
+
+    @staticmethod
+    def _to_decimal(value: Any) -> Decimal:
+        try:
+            return Decimal(str(value))
+        except (InvalidOperation, TypeError, ValueError):
+            return Decimal('0')
@@ -0,0 +1,112 @@
+"""接口响应的 ETag（条件 GET）"""
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import ETAG_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseETag:
+    """为轮询频繁的读接口生成 ETag，If-None-Match 命中时直接返回 304
+
+    两种 ETag：
+    - 内容 ETag：有缓存快照的接口（资产快照）在写入快照时计算一次内容哈希，
+      请求时只读取这个哈希，不需要加载或渲染快照
+    - 版本 ETag：直接查询数据库的接口，由资源的版本号、请求参数和时间窗口计算。
+      数据变化时调用 bump() 递增版本号；链上转入等没有事件的变化由时间窗口兜底，
+      ETag 最多 FRESHNESS_WINDOW 秒后变化
+    两种 ETag 都不需要哈希响应内容，检查只需要一次缓存读取。
+    """
+
+    VERSION_PREFIX = 'version:'
+    FRESHNESS_WINDOW = 60
+
+    @staticmethod
+    def content_etag(payload: Any) -> str:
+        """根据响应内容计算强 ETag"""
+        body = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+        return f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+
+    @staticmethod
+    def wallet_scope(chain: str, address: str) -> str:
+        """钱包的交易记录、NFT 等数据"""
+        address = address.lower() if address.startswith('0x') else address
+        return f"wallet:{chain.upper()}:{address}"
+
+    @classmethod
+    def bump(cls, scope: str) -> None:
+        """资源发生变化，递增版本号"""
+        try:
+            ETAG_CACHE.incr(cls.VERSION_PREFIX + scope)
+        except Exception as e:
+            logger.warning(f"递增 ETag 版本号失败 {scope}: {str(e)}")
+
+    @classmethod
+    async def abump(cls, scope: str) -> None:
+        await ETAG_CACHE.aincr(cls.VERSION_PREFIX + scope)
+
+    @classmethod
+    def version_etag(cls, endpoint: str, scopes: Iterable[str], *params: Any) -> str:
+        """根据资源版本号、请求参数和时间窗口计算弱 ETag
+
+        Args:
+            endpoint: 接口名称
+            scopes: 响应依赖的资源
+            params: 影响响应内容的请求参数
+        """
+        keys = [cls.VERSION_PREFIX + scope for scope in scopes]
+        return cls._version_etag(endpoint, keys, ETAG_CACHE.get_many(keys), params)
+
+    @classmethod
+    async def aversion_etag(cls, endpoint: str, scopes: Iterable[str], *params: Any) -> str:
+        """version_etag() 的异步版本"""
+        keys = [cls.VERSION_PREFIX + scope for scope in scopes]
+        return cls._version_etag(endpoint, keys, await ETAG_CACHE.aget_many(keys), params)
+
+    @classmethod
+    def _version_etag(cls, endpoint: str, keys: List[str], versions: Dict[str, Any], params: Tuple[Any, ...]) -> str:
+        window = int(time.time() // cls.FRESHNESS_WINDOW)
+        parts = [endpoint, str(window)]
+        parts.extend(f"{key}={versions.get(key, 0)}" for key in keys)
+        parts.extend(str(param) for param in params)
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    @staticmethod
+    def matches(request: Any, etag: Optional[str]) -> bool:
+        """If-None-Match 是否与 ETag 匹配（弱比较）"""
+        if not etag:
+            return False
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        target = etag[2:] if etag.startswith('W/') else etag
+        for candidate in header.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == target:
+                return True
+        return False
+
+    @staticmethod
+    def not_modified(etag: str) -> Response:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def attach(response: Response, etag: Optional[str]) -> Response:
+        """成功响应附加 ETag"""
+        if etag and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
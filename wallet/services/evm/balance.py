@@ -1,18 +1,20 @@
 """EVM 余额查询服务"""
 import logging
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from decimal import Decimal
 import aiohttp
 import json
 from web3 import Web3
-from django.core.cache import cache
 from asgiref.sync import sync_to_async
 
 from ...models import Wallet, Token
 from ..evm_config import MoralisConfig, RPCConfig
+from ..http_client import HTTPClientRegistry
 from ...exceptions import WalletNotFoundError, ChainNotSupportError, GetBalanceError
 from .utils import EVMUtils
+from .multicall import Multicall3
 from .token_info import EVMTokenInfoService
+from ..portfolio_cache import PortfolioSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -92,8 +94,8 @@ class EVMBalanceService:
             Decimal: 余额
         """
         try:
-            # 使用 web3 获取原生代币余额
-            balance_wei = self.web3.eth.get_balance(Web3.to_checksum_address(address))
+            # 通过节点池获取原生代币余额，慢节点自动对冲
+            balance_wei = await EVMUtils.get_balance_wei(self.chain, address)
             return EVMUtils.from_wei(balance_wei)
                         
         except Exception as e:
@@ -120,26 +122,26 @@ class EVMBalanceService:
             if not chain_config:
                 raise ChainNotSupportError()
                 
-            # 获取 Web3 实例
-            w3 = Web3(Web3.HTTPProvider(chain_config['rpc_url']))
-            
             # 查询余额
             if token_address == EVMUtils.NATIVE_TOKEN_ADDRESS or not token_address:
                 # 原生代币余额
-                balance = w3.eth.get_balance(wallet.address)
+                balance = await EVMUtils.get_balance_wei(wallet.chain, wallet.address)
                 decimals = chain_config['decimals']
                 symbol = chain_config['symbol']
                 name = chain_config['name']
             else:
-                # ERC20 代币余额
-                contract = w3.eth.contract(
-                    address=Web3.to_checksum_address(token_address),
-                    abi=ERC20_ABI
+                # ERC20 代币余额，四个字段通过 Multicall3 一次请求读取
+                fields = await Multicall3.for_chain(wallet.chain).read_erc20(
+                    token_address,
+                    ('balanceOf', 'decimals', 'symbol', 'name'),
+                    owner=wallet.address
                 )
-                balance = contract.functions.balanceOf(wallet.address).call()
-                decimals = contract.functions.decimals().call()
-                symbol = contract.functions.symbol().call()
-                name = contract.functions.name().call()
+                if fields['balanceOf'] is None or fields['decimals'] is None:
+                    raise ValueError(f"读取代币合约失败: {token_address}")
+                balance = fields['balanceOf']
+                decimals = fields['decimals']
+                symbol = fields['symbol'] or ''
+                name = fields['name'] or ''
                 
             # 格式化余额
             balance_formatted = balance / (10 ** decimals)
@@ -188,140 +190,149 @@ class EVMBalanceService:
 
     async def get_all_token_balances(self, address: str, include_hidden: bool = False) -> Dict:
         """获取所有代币余额
-        
+
         Args:
             address: 钱包地址
             include_hidden: 是否包含隐藏的代币，默认为 False
-            
+
         Returns:
             Dict: 代币余额信息
         """
         try:
-            tokens = []
-            total_value = 0
-            
-            # 获取原生代币余额
-            native_balance = await self.get_native_balance(address)
-            if native_balance > 0:  # 只有当余额大于0时才添加
-                native_token = self.chain_config['native_token']
-                
-                # 获取原生代币价格
-                # 对于 ETH 和其他使用 ETH 作为原生代币的链，使用 ETH 主网的 WETH 价格
-                if self.chain in ['ETH', 'BASE', 'ARBITRUM', 'OPTIMISM']:
-                    eth_mainnet_weth = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'  # ETH 主网 WETH 地址
-                    temp_service = EVMTokenInfoService('ETH')  # 临时创建 ETH 主网的服务
-                    native_price_data = await temp_service.get_token_price(eth_mainnet_weth)
-                else:
-                    native_price_data = await self.token_info_service.get_token_price(native_token['address'])
-                    
-                native_price = float(native_price_data.get('price_usd', '0'))
-                native_value = float(native_balance) * native_price
-                total_value += native_value
-                
-                tokens.append({
-                    'chain': self.chain,
-                    'address': EVMUtils.NATIVE_TOKEN_ADDRESS,  # 使用统一的原生代币地址
-                    'name': native_token['name'],
-                    'symbol': native_token['symbol'],
-                    'decimals': native_token['decimals'],
-                    'logo': native_token.get('logo', ''),
-                    'balance': str(native_balance),
-                    'balance_formatted': str(native_balance),
-                    'price_usd': native_price_data.get('price_usd', '0'),
-                    'value_usd': str(native_value),
-                    'price_change_24h': native_price_data.get('price_change_24h', '+0.00%'),
-                    'is_native': True,
-                    'is_visible': True  # 原生代币始终可见
-                })
-            
-            # 获取 ERC20 代币余额
-            url = MoralisConfig.EVM_WALLET_TOKENS_URL.format(Web3.to_checksum_address(address))
-            params = {
-                'chain': self.chain_id
-            }
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"获取代币列表失败: {await response.text()}")
-                        return {
-                            'total_value_usd': str(total_value),
-                            'tokens': tokens
-                        }
-                    
-                    token_balances = await response.json()
-                    
-                    # 获取所有代币的显示状态
-                    token_addresses = [token['token_address'] for token in token_balances]
-                    db_tokens = await sync_to_async(list)(Token.objects.filter(
-                        chain=self.chain,
-                        address__in=token_addresses
-                    ).values('address', 'is_visible'))
-                    
-                    # 创建地址到显示状态的映射
-                    visibility_map = {t['address']: t['is_visible'] for t in db_tokens}
-                    
-                    # 处理 ERC20 代币
-                    for token_data in token_balances:
-                        try:
-                            token_address = token_data['token_address']
-                            
-                            # 如果代币被隐藏且不包含隐藏代币，则跳过
-                            if not include_hidden and not visibility_map.get(token_address, True):
-                                continue
-                                
-                            decimals = int(token_data.get('decimals', 18))
-                            
-                            # 跳过 decimals 为 0 的代币（可能是 NFT）
-                            if decimals == 0:
-                                continue
-                                
-                            # 计算余额
-                            balance = int(token_data.get('balance', '0'))
-                            if balance <= 0:  # 跳过余额为0的代币
-                                continue
-                                
-                            formatted_balance = str(EVMUtils.from_wei(balance, decimals))
-                            
-                            # 获取代币价格
-                            price_data = await self.token_info_service.get_token_price(token_address)
-                            price = float(price_data.get('price_usd', '0'))
-                            value = float(formatted_balance) * price
-                            total_value += value
-                            
-                            token_info = {
-                                'chain': self.chain,
-                                'address': token_address,
-                                'name': token_data.get('name', ''),
-                                'symbol': token_data.get('symbol', ''),
-                                'decimals': decimals,
-                                'logo': token_data.get('logo', ''),
-                                'balance': str(balance),
-                                'balance_formatted': formatted_balance,
-                                'price_usd': price_data.get('price_usd', '0'),
-                                'value_usd': str(value),
-                                'price_change_24h': price_data.get('price_change_24h', '+0.00%'),
-                                'is_native': False,
-                                'is_visible': visibility_map.get(token_address, True)
-                            }
-                            
-                            tokens.append(token_info)
-                            
-                        except Exception as e:
-                            logger.error(f"处理代币数据失败: {str(e)}")
-                            continue
-                    
-                    # 按价值排序
-                    tokens.sort(key=lambda x: float(x['value_usd']), reverse=True)
-                    
-                    return {
-                        'total_value_usd': str(total_value),
-                        'tokens': tokens
-                    }
-                    
+            tokens = [token async for token in self.iter_token_balances(address, include_hidden)]
         except Exception as e:
             logger.error(f"获取代币列表失败: {str(e)}")
             return {
                 'total_value_usd': '0',
                 'tokens': []
-            }
\ No newline at end of file
+            }
+        return PortfolioSnapshot.summarize(tokens)
+
+    async def iter_token_balances(self, address: str, include_hidden: bool = False) -> AsyncIterator[Dict]:
+        """逐个产出代币余额：先产出原生代币，ERC20 代币在价格解析后立即产出
+
+        Args:
+            address: 钱包地址
+            include_hidden: 是否包含隐藏的代币，默认为 False
+
+        Yields:
+            Dict: 单个代币的余额信息，格式与 get_all_token_balances 的 tokens 元素相同
+        """
+        # 获取原生代币余额
+        native_balance = await self.get_native_balance(address)
+        if native_balance > 0:  # 只有当余额大于0时才添加
+            native_token = self.chain_config['native_token']
+
+            # 获取原生代币价格
+            # 对于 ETH 和其他使用 ETH 作为原生代币的链，使用 ETH 主网的 WETH 价格
+            if self.chain in ['ETH', 'BASE', 'ARBITRUM', 'OPTIMISM']:
+                eth_mainnet_weth = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'  # ETH 主网 WETH 地址
+                temp_service = EVMTokenInfoService('ETH')  # 临时创建 ETH 主网的服务
+                native_price_data = await temp_service.get_token_price(eth_mainnet_weth)
+            else:
+                native_price_data = await self.token_info_service.get_token_price(native_token['address'])
+
+            native_price = float(native_price_data.get('price_usd', '0'))
+            native_value = float(native_balance) * native_price
+
+            yield {
+                'chain': self.chain,
+                'address': EVMUtils.NATIVE_TOKEN_ADDRESS,  # 使用统一的原生代币地址
+                'name': native_token['name'],
+                'symbol': native_token['symbol'],
+                'decimals': native_token['decimals'],
+                'logo': native_token.get('logo', ''),
+                'balance': str(native_balance),
+                'balance_formatted': str(native_balance),
+                'price_usd': native_price_data.get('price_usd', '0'),
+                'value_usd': str(native_value),
+                'price_change_24h': native_price_data.get('price_change_24h', '+0.00%'),
+                'is_native': True,
+                'is_visible': True  # 原生代币始终可见
+            }
+
+        # 获取 ERC20 代币余额
+        url = MoralisConfig.EVM_WALLET_TOKENS_URL.format(Web3.to_checksum_address(address))
+        params = {
+            'chain': self.chain_id
+        }
+
+        async with HTTPClientRegistry.session('moralis') as session:
+            async with session.get(url, headers=self.headers, params=params) as response:
+                if response.status != 200:
+                    logger.error(f"获取代币列表失败: {await response.text()}")
+                    return
+
+                token_balances = await response.json()
+
+        # 获取所有代币的显示状态
+        token_addresses = [token['token_address'] for token in token_balances]
+        db_tokens = await sync_to_async(list)(Token.objects.filter(
+            chain=self.chain,
+            address__in=token_addresses
+        ).values('address', 'is_visible'))
+
+        # 创建地址到显示状态的映射
+        visibility_map = {t['address']: t['is_visible'] for t in db_tokens}
+
+        # 先过滤出需要展示的代币，只为这些代币解析价格
+        pending = {}
+        for token_data in token_balances:
+            try:
+                token_address = token_data['token_address']
+
+                # 如果代币被隐藏且不包含隐藏代币，则跳过
+                if not include_hidden and not visibility_map.get(token_address, True):
+                    continue
+
+                decimals = int(token_data.get('decimals', 18))
+
+                # 跳过 decimals 为 0 的代币（可能是 NFT）
+                if decimals == 0:
+                    continue
+
+                # 计算余额
+                balance = int(token_data.get('balance', '0'))
+                if balance <= 0:  # 跳过余额为0的代币
+                    continue
+
+                pending[token_address] = (token_data, decimals, balance)
+
+            except Exception as e:
+                logger.error(f"处理代币数据失败: {str(e)}")
+                continue
+
+        # 价格按到达顺序分批返回，缓存命中的代币最先产出
+        price_chunks = self.token_info_service.iter_token_prices(list(pending))
+        try:
+            async for price_map in price_chunks:
+                for token_address, price_data in price_map.items():
+                    if token_address not in pending:
+                        continue
+                    token_data, decimals, balance = pending[token_address]
+                    try:
+                        formatted_balance = str(EVMUtils.from_wei(balance, decimals))
+                        price = float(price_data.get('price_usd', '0'))
+                        value = float(formatted_balance) * price
+                        token_info = {
+                            'chain': self.chain,
+                            'address': token_address,
+                            'name': token_data.get('name', ''),
+                            'symbol': token_data.get('symbol', ''),
+                            'decimals': decimals,
+                            'logo': token_data.get('logo', ''),
+                            'balance': str(balance),
+                            'balance_formatted': formatted_balance,
+                            'price_usd': price_data.get('price_usd', '0'),
+                            'value_usd': str(value),
+                            'price_change_24h': price_data.get('price_change_24h', '+0.00%'),
+                            'is_native': False,
+                            'is_visible': visibility_map.get(token_address, True)
+                        }
+                    except Exception as e:
+                        logger.error(f"处理代币数据失败: {str(e)}")
+                        continue
+
+                    yield token_info
+        finally:
+            await price_chunks.aclose()
@@ -6,13 +6,15 @@ import aiohttp
 import asyncio
 from web3 import Web3
 from django.utils import timezone
-from asgiref.sync import sync_to_async
 from datetime import datetime
 from hexbytes import HexBytes
 
-from ...models import Transaction, Token, Wallet
+from ...models import Transaction, Wallet
 from ..evm_config import RPCConfig, MoralisConfig
+from ..http_client import HTTPClientRegistry
 from .utils import EVMUtils
+from ..blocking_executor import BlockingCallExecutor
+from ..token_registry import TokenRegistry
 from .token_info import EVMTokenInfoService
 
 logger = logging.getLogger(__name__)
@@ -29,6 +31,7 @@ class EVMHistoryService:
         self.chain = chain
         self.chain_config = EVMUtils.get_chain_config(chain)
         self.web3 = EVMUtils.get_web3(chain)
+        self.async_web3 = EVMUtils.get_async_web3(chain)
         
         # Moralis API 配置
         self.headers = {
@@ -60,7 +63,7 @@ class EVMHistoryService:
             if end_time:
                 params['to_date'] = end_time.isoformat()
                 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         raise Exception(f"获取交易历史失败: {await response.text()}")
@@ -130,7 +133,7 @@ class EVMHistoryService:
                 
             url = f"{MoralisConfig.BASE_URL}/erc20/transfers"
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 # 获取发送的交易
                 async with session.get(url, headers=self.headers, params=sent_params) as sent_response:
                     if sent_response.status != 200:
@@ -163,21 +166,18 @@ class EVMHistoryService:
                 token_info = {}
                 
                 if token_address:
-                    # 首先尝试从数据库获取代币信息
-                    token = await sync_to_async(Token.objects.filter(
-                        chain=self.chain,
-                        address=token_address
-                    ).first)()
+                    # 首先从代币注册表获取代币信息（下面会自行请求上游，不需要后台补充）
+                    token = await TokenRegistry.get(self.chain, token_address, fill_missing=False)
                     
                     if token:
                         token_info = {
-                            'logo': token.logo if token else '',
-                            'name': token.name if token else 'Unknown Token',
-                            'symbol': token.symbol if token else 'Unknown',
+                            'logo': token['logo'],
+                            'name': token['name'],
+                            'symbol': token['symbol'],
                             'address': token_address,
-                            'decimals': token.decimals if token else 18,
-                            'verified': token.verified if token else False,
-                            'thumbnail': token.thumbnail if token else ''
+                            'decimals': token['decimals'],
+                            'verified': token['verified'],
+                            'thumbnail': token['thumbnail']
                         }
                     else:
                         try:
@@ -201,9 +201,9 @@ class EVMHistoryService:
                                     address=Web3.to_checksum_address(token_address),
                                     abi=ERC20_ABI # type: ignore
                                 )
-                                name = await token_contract.functions.name().call()
-                                symbol = await token_contract.functions.symbol().call()
-                                decimals = await token_contract.functions.decimals().call()
+                                name = await BlockingCallExecutor.run(token_contract.functions.name().call)
+                                symbol = await BlockingCallExecutor.run(token_contract.functions.symbol().call)
+                                decimals = await BlockingCallExecutor.run(token_contract.functions.decimals().call)
                                 
                                 token_info = {
                                     'logo': '',
@@ -279,17 +279,17 @@ class EVMHistoryService:
         """获取交易详情"""
         try:
             # 获取交易信息
-            tx = await self.web3.eth.get_transaction(tx_hash) # type: ignore
+            tx = await self.async_web3.eth.get_transaction(tx_hash) # type: ignore
             if not tx:
                 return {}
                 
             # 获取交易收据
-            receipt = await self.web3.eth.get_transaction_receipt(tx_hash) # type: ignore
+            receipt = await self.async_web3.eth.get_transaction_receipt(tx_hash) # type: ignore
             if not receipt:
                 return {}
                 
             # 获取区块信息
-            block = await self.web3.eth.get_block(tx['blockNumber']) # type: ignore
+            block = await self.async_web3.eth.get_block(tx['blockNumber']) # type: ignore
             if not block:
                 return {}
                 
@@ -303,16 +303,13 @@ class EVMHistoryService:
                 token_address = tx['to']
                 
                 # 获取代币信息
-                token = await sync_to_async(Token.objects.filter(
-                    chain=self.chain,
-                    address=token_address
-                ).first)()
+                token = await TokenRegistry.get(self.chain, token_address)
                 
                 if token:
                     token_info = {
-                        'name': token.name,
-                        'symbol': token.symbol,
-                        'decimals': token.decimals
+                        'name': token['name'],
+                        'symbol': token['symbol'],
+                        'decimals': token['decimals']
                     }
             
             return {
@@ -0,0 +1,187 @@
+"""Multicall3 合约调用聚合"""
+import asyncio
+import logging
+import weakref
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+try:
+    from eth_abi import decode as decode_abi, encode as encode_abi
+except ImportError:  # eth-abi < 4
+    from eth_abi import decode_abi, encode_abi
+
+from .utils import EVMUtils
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingCalls:
+    """事件循环内等待打包的合约调用"""
+
+    def __init__(self):
+        self.calls: List[Tuple[str, bytes, List[str], asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class Multicall3:
+    """通过 Multicall3.aggregate3 把多个 eth_call 打包为一次请求
+
+    在 BATCH_WINDOW 时间窗口内收集同一条链上的只读调用（不区分代币和钱包），
+    打包后通过节点池发送一次 eth_call。每个子调用都设置 allowFailure，
+    单个调用 revert 或解码失败只会让该调用返回 None，不影响同批次的其他调用。
+    """
+
+    # Multicall3 在各条 EVM 链上的部署地址相同
+    ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+    # aggregate3((address,bool,bytes)[]) 返回 (bool,bytes)[]
+    AGGREGATE3_SELECTOR = Web3.keccak(text='aggregate3((address,bool,bytes)[])')[:4]
+
+    BATCH_WINDOW = 0.01
+    MAX_BATCH_SIZE = 200
+
+    # ERC20 只读方法：字段名 -> (函数签名, 参数类型, 返回类型)
+    ERC20_CALLS: Dict[str, Tuple[str, List[str], List[str]]] = {
+        'name': ('name()', [], ['string']),
+        'symbol': ('symbol()', [], ['string']),
+        'decimals': ('decimals()', [], ['uint8']),
+        'totalSupply': ('totalSupply()', [], ['uint256']),
+        'balanceOf': ('balanceOf(address)', ['address'], ['uint256']),
+    }
+
+    _instances: Dict[str, 'Multicall3'] = {}
+
+    def __init__(self, chain: str):
+        self.chain = chain
+        self._pending: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingCalls]' = \
+            weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_chain(cls, chain: str) -> 'Multicall3':
+        """获取链对应的共享聚合器"""
+        instance = cls._instances.get(chain)
+        if instance is None:
+            instance = cls(chain)
+            cls._instances[chain] = instance
+        return instance
+
+    @staticmethod
+    def encode_call(signature: str, arg_types: Sequence[str] = (), args: Sequence[Any] = ()) -> bytes:
+        """编码合约调用数据"""
+        selector = Web3.keccak(text=signature)[:4]
+        if not arg_types:
+            return bytes(selector)
+        return bytes(selector) + encode_abi(list(arg_types), list(args))
+
+    async def call(
+        self,
+        target: str,
+        signature: str,
+        arg_types: Sequence[str] = (),
+        args: Sequence[Any] = (),
+        output_types: Sequence[str] = ('uint256',)
+    ) -> Optional[Any]:
+        """加入当前批次执行一次只读调用
+
+        Args:
+            target: 合约地址
+            signature: 函数签名，如 balanceOf(address)
+            arg_types: 参数类型
+            args: 参数
+            output_types: 返回值类型
+
+        Returns:
+            Optional[Any]: 单个返回值直接返回，多个返回值返回元组，调用失败返回 None
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = _PendingCalls()
+            self._pending[loop] = batch
+
+        future = loop.create_future()
+        batch.calls.append((
+            Web3.to_checksum_address(target),
+            self.encode_call(signature, arg_types, args),
+            list(output_types),
+            future
+        ))
+        if len(batch.calls) >= self.MAX_BATCH_SIZE:
+            self._flush(loop)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.BATCH_WINDOW, self._flush, loop)
+        return await future
+
+    async def read_erc20(
+        self,
+        token_address: str,
+        fields: Sequence[str] = ('name', 'symbol', 'decimals'),
+        owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """读取 ERC20 代币字段，多个字段在同一批次中完成
+
+        Args:
+            token_address: 代币合约地址
+            fields: ERC20_CALLS 中的字段名
+            owner: 查询 balanceOf 时的钱包地址
+
+        Returns:
+            Dict[str, Any]: 字段名到值的映射，读取失败的字段为 None
+        """
+        calls = []
+        for field in fields:
+            signature, arg_types, output_types = self.ERC20_CALLS[field]
+            args = [Web3.to_checksum_address(owner)] if arg_types else []
+            calls.append(self.call(token_address, signature, arg_types, args, output_types))
+        results = await asyncio.gather(*calls)
+        return dict(zip(fields, results))
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        if batch.calls:
+            loop.create_task(self._send(batch.calls))
+
+    async def _send(self, calls: List[Tuple[str, bytes, List[str], asyncio.Future]]) -> None:
+        try:
+            data = bytes(self.AGGREGATE3_SELECTOR) + encode_abi(
+                ['(address,bool,bytes)[]'],
+                [[(target, True, call_data) for target, call_data, _, _ in calls]]
+            )
+            response = await EVMUtils.get_rpc_pool(self.chain).call(
+                'eth_call',
+                [{'to': self.ADDRESS, 'data': HexBytes(data).hex()}, 'latest']
+            )
+            if not response or 'result' not in response:
+                logger.warning(f"{self.chain} Multicall3 请求失败: {response}")
+                results = [None] * len(calls)
+            else:
+                returned = decode_abi(['(bool,bytes)[]'], bytes(HexBytes(response['result'])))[0]
+                results = [
+                    self._decode_result(success, return_data, output_types)
+                    for (success, return_data), (_, _, output_types, _) in zip(returned, calls)
+                ]
+
+            for (_, _, _, future), result in zip(calls, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"{self.chain} Multicall3 请求出错: {str(e)}")
+            for _, _, _, future in calls:
+                if not future.done():
+                    future.set_result(None)
+
+    @staticmethod
+    def _decode_result(success: bool, return_data: bytes, output_types: List[str]) -> Optional[Any]:
+        if not success or not return_data:
+            return None
+        try:
+            values = decode_abi(output_types, return_data)
+        except Exception:
+            # 例如部分老合约的 name/symbol 返回 bytes32
+            return None
+        return values[0] if len(values) == 1 else tuple(values)
@@ -10,6 +10,7 @@ import json
 
 from ...models import Wallet, Transaction, NFTCollection
 from ..evm_config import RPCConfig, MoralisConfig
+from ..http_client import HTTPClientRegistry
 from ...exceptions import (
     WalletNotFoundError, 
     ChainNotSupportError, 
@@ -17,6 +18,10 @@ from ...exceptions import (
     TransferError
 )
 from .utils import EVMUtils
+from ..blocking_executor import BlockingCallExecutor
+from ..portfolio_cache import PortfolioSnapshot
+from ..nft_inventory import NFTInventory
+from ..etag import ResponseETag
 
 logger = logging.getLogger(__name__)
 
@@ -92,108 +97,124 @@ class EVMNFTService:
         self.chain = chain
         self.chain_config = EVMUtils.get_chain_config(chain)
         self.web3 = EVMUtils.get_web3(chain)
+        self.async_web3 = EVMUtils.get_async_web3(chain)
         
         # Moralis API 配置
         self.chain_id = MoralisConfig.get_chain_id(chain)
         self.headers = MoralisConfig.get_headers()
         self.timeout = aiohttp.ClientTimeout(total=MoralisConfig.TIMEOUT)
 
-    async def get_nft_collections(self, address: str) -> List[Dict]:
-        """获取 NFT 合集列表（仅显示可见的）
-        
+    async def _get_owned_nfts(self, address: str) -> Optional[List[Dict]]:
+        """获取钱包持有的全部 NFT（Moralis 原始数据），结果按钱包缓存
+
         Args:
             address: 钱包地址
-            
+
         Returns:
-            List[Dict]: NFT 合集列表
+            Optional[List[Dict]]: NFT 列表，获取失败时返回 None
         """
-        try:
-            # 获取所有 NFT
+        async def load() -> Optional[List[Dict]]:
             url = f"{MoralisConfig.BASE_URL}/{address}/nft"
             params = {
                 'chain': self.chain_id,
                 'format': 'decimal'
             }
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         logger.error(f"获取 NFT 列表失败: {await response.text()}")
-                        return []
-                    
+                        return None
+
                     result = await response.json()
+
+            # 检查返回的数据格式
+            if isinstance(result, dict) and 'result' in result:
+                return result['result']
+            if isinstance(result, list):
+                return result
+            logger.error(f"API 返回的数据格式不正确: {result}")
+            return None
+
+        return await NFTInventory.get_or_load(self.chain, address, load)
+
+    async def get_nft_collections(self, address: str) -> List[Dict]:
+        """获取 NFT 合集列表（仅显示可见的）
+        
+        Args:
+            address: 钱包地址
+            
+        Returns:
+            List[Dict]: NFT 合集列表
+        """
+        try:
+            # 获取所有 NFT
+            nft_list = await self._get_owned_nfts(address)
+            if nft_list is None:
+                return []
+
+            # 按合约地址分组
+            collections = {}
+            for nft in nft_list:
+                if not isinstance(nft, dict):
+                    logger.warning(f"NFT 数据格式不正确: {nft}")
+                    continue
                     
-                    # 检查返回的数据格式
-                    if isinstance(result, dict) and 'result' in result:
-                        nft_list = result['result']
-                    elif isinstance(result, list):
-                        nft_list = result
-                    else:
-                        logger.error(f"API 返回的数据格式不正确: {result}")
-                        return []
-                    
-                    # 按合约地址分组
-                    collections = {}
-                    for nft in nft_list:
-                        if not isinstance(nft, dict):
-                            logger.warning(f"NFT 数据格式不正确: {nft}")
-                            continue
-                            
-                        contract_address = nft.get('token_address', '').lower()
-                        if not contract_address:
-                            continue
-                            
-                        if contract_address not in collections:
-                            collections[contract_address] = {
-                                'chain': self.chain,
-                                'contract_address': contract_address,
-                                'name': nft.get('name', ''),
-                                'symbol': nft.get('symbol', ''),
-                                'contract_type': nft.get('contract_type', 'ERC721'),
-                                'logo': nft.get('token_uri', ''),
-                                'is_verified': False,
-                                'is_spam': False,
-                                'is_visible': True,  # 默认显示
-                                'floor_price': '0',
-                                'floor_price_usd': '0',
-                                'floor_price_currency': 'eth',
-                                'nft_count': 0
-                            }
-                            
-                        collections[contract_address]['nft_count'] += 1
-                    
-                    # 获取已存在的合集信息
-                    existing_collections = await sync_to_async(list)(
-                        NFTCollection.objects.filter(
-                            chain=self.chain,
-                            contract_address__in=list(collections.keys())
-                        ).values('contract_address', 'is_verified', 'is_spam', 'is_visible', 'floor_price', 'floor_price_usd')
-                    )
-                    
-                    # 更新合集信息
-                    for collection in existing_collections:
-                        contract_address = collection['contract_address']
-                        if contract_address in collections:
-                            collections[contract_address].update({
-                                'is_verified': collection['is_verified'],
-                                'is_spam': collection['is_spam'],
-                                'is_visible': collection['is_visible'],
-                                'floor_price': str(collection['floor_price']),
-                                'floor_price_usd': str(collection['floor_price_usd'])
-                            })
-                    
-                    # 保存新的合集
-                    for collection_data in collections.values():
-                        await self._save_collection(collection_data)
-                    
-                    # 只返回可见的合集
-                    visible_collections = [
-                        collection for collection in collections.values()
-                        if collection['is_visible']
-                    ]
+                contract_address = nft.get('token_address', '').lower()
+                if not contract_address:
+                    continue
                     
-                    return visible_collections
+                if contract_address not in collections:
+                    collections[contract_address] = {
+                        'chain': self.chain,
+                        'contract_address': contract_address,
+                        'name': nft.get('name', ''),
+                        'symbol': nft.get('symbol', ''),
+                        'contract_type': nft.get('contract_type', 'ERC721'),
+                        'logo': nft.get('token_uri', ''),
+                        'is_verified': False,
+                        'is_spam': False,
+                        'is_visible': True,  # 默认显示
+                        'floor_price': '0',
+                        'floor_price_usd': '0',
+                        'floor_price_currency': 'eth',
+                        'nft_count': 0
+                    }
                     
+                collections[contract_address]['nft_count'] += 1
+            
+            # 获取已存在的合集信息
+            existing_collections = await sync_to_async(list)(
+                NFTCollection.objects.filter(
+                    chain=self.chain,
+                    contract_address__in=list(collections.keys())
+                ).values('contract_address', 'is_verified', 'is_spam', 'is_visible', 'floor_price', 'floor_price_usd')
+            )
+            
+            # 更新合集信息
+            for collection in existing_collections:
+                contract_address = collection['contract_address']
+                if contract_address in collections:
+                    collections[contract_address].update({
+                        'is_verified': collection['is_verified'],
+                        'is_spam': collection['is_spam'],
+                        'is_visible': collection['is_visible'],
+                        'floor_price': str(collection['floor_price']),
+                        'floor_price_usd': str(collection['floor_price_usd'])
+                    })
+            
+            # 保存新的合集
+            for collection_data in collections.values():
+                await self._save_collection(collection_data)
+            
+            # 只返回可见的合集
+            visible_collections = [
+                collection for collection in collections.values()
+                if collection['is_visible']
+            ]
+            
+            return visible_collections
+            
         except Exception as e:
             logger.error(f"获取 NFT 合集列表失败: {str(e)}")
             return []
@@ -220,7 +241,7 @@ class EVMNFTService:
             if collection_address:
                 params['token_addresses'] = collection_address  # 修改为单个地址字符串
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         logger.error(f"获取 NFT 列表失败: {await response.text()}")
@@ -306,7 +327,7 @@ class EVMNFTService:
             
             logger.debug(f"请求 NFT 详情: {url}, 参数: {params}")
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     response_text = await response.text()
                     logger.debug(f"Moralis API 响应: {response_text}")
@@ -390,7 +411,7 @@ class EVMNFTService:
                 address=Web3.to_checksum_address(token_address),
                 abi=ERC721_ABI
             )
-            owner = await contract.functions.ownerOf(int(token_id)).call()
+            owner = await BlockingCallExecutor.run(contract.functions.ownerOf(int(token_id)).call)
             return owner
         except Exception as e:
             logger.error(f"获取 NFT 所有者失败: {str(e)}")
@@ -414,7 +435,7 @@ class EVMNFTService:
                 'limit': 1
             }
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         return {}
@@ -501,89 +522,70 @@ class EVMNFTService:
         """
         try:
             # 获取所有 NFT
-            url = f"{MoralisConfig.BASE_URL}/{address}/nft"
-            params = {
-                'chain': self.chain_id,
-                'format': 'decimal'
-            }
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"获取 NFT 列表失败: {await response.text()}")
-                        return []
-                    
-                    result = await response.json()
-                    
-                    # 检查返回的数据格式
-                    if isinstance(result, dict) and 'result' in result:
-                        nft_list = result['result']
-                    elif isinstance(result, list):
-                        nft_list = result
-                    else:
-                        logger.error(f"API 返回的数据格式不正确: {result}")
-                        return []
-                    
-                    # 按合约地址分组
-                    collections = {}
-                    for nft in nft_list:
-                        if not isinstance(nft, dict):
-                            logger.warning(f"NFT 数据格式不正确: {nft}")
-                            continue
-                            
-                        contract_address = nft.get('token_address', '').lower()
-                        if not contract_address:
-                            continue
-                            
-                        if contract_address not in collections:
-                            collections[contract_address] = {
-                                'chain': self.chain,
-                                'contract_address': contract_address,
-                                'name': nft.get('name', ''),
-                                'symbol': nft.get('symbol', ''),
-                                'contract_type': nft.get('contract_type', 'ERC721'),
-                                'logo': nft.get('token_uri', ''),
-                                'is_verified': False,
-                                'is_spam': False,
-                                'is_visible': True,  # 默认显示
-                                'floor_price': '0',
-                                'floor_price_usd': '0',
-                                'floor_price_currency': 'eth',
-                                'nft_count': 0
-                            }
-                            
-                        collections[contract_address]['nft_count'] += 1
-                    
-                    if not collections:
-                        logger.debug(f"没有找到任何 NFT 合集")
-                        return []
-                    
-                    # 获取已存在的合集信息
-                    existing_collections = await sync_to_async(list)(
-                        NFTCollection.objects.filter(
-                            chain=self.chain,
-                            contract_address__in=list(collections.keys())
-                        ).values('contract_address', 'is_verified', 'is_spam', 'is_visible', 'floor_price', 'floor_price_usd')
-                    )
-                    
-                    # 更新合集信息
-                    for collection in existing_collections:
-                        contract_address = collection['contract_address']
-                        if contract_address in collections:
-                            collections[contract_address].update({
-                                'is_verified': collection['is_verified'],
-                                'is_spam': collection['is_spam'],
-                                'is_visible': collection['is_visible'],
-                                'floor_price': str(collection['floor_price']),
-                                'floor_price_usd': str(collection['floor_price_usd'])
-                            })
+            nft_list = await self._get_owned_nfts(address)
+            if nft_list is None:
+                return []
+
+            # 按合约地址分组
+            collections = {}
+            for nft in nft_list:
+                if not isinstance(nft, dict):
+                    logger.warning(f"NFT 数据格式不正确: {nft}")
+                    continue
                     
-                    # 保存新的合集
-                    for collection_data in collections.values():
-                        await self._save_collection(collection_data)
+                contract_address = nft.get('token_address', '').lower()
+                if not contract_address:
+                    continue
                     
-                    return list(collections.values())
+                if contract_address not in collections:
+                    collections[contract_address] = {
+                        'chain': self.chain,
+                        'contract_address': contract_address,
+                        'name': nft.get('name', ''),
+                        'symbol': nft.get('symbol', ''),
+                        'contract_type': nft.get('contract_type', 'ERC721'),
+                        'logo': nft.get('token_uri', ''),
+                        'is_verified': False,
+                        'is_spam': False,
+                        'is_visible': True,  # 默认显示
+                        'floor_price': '0',
+                        'floor_price_usd': '0',
+                        'floor_price_currency': 'eth',
+                        'nft_count': 0
+                    }
                     
+                collections[contract_address]['nft_count'] += 1
+            
+            if not collections:
+                logger.debug(f"没有找到任何 NFT 合集")
+                return []
+            
+            # 获取已存在的合集信息
+            existing_collections = await sync_to_async(list)(
+                NFTCollection.objects.filter(
+                    chain=self.chain,
+                    contract_address__in=list(collections.keys())
+                ).values('contract_address', 'is_verified', 'is_spam', 'is_visible', 'floor_price', 'floor_price_usd')
+            )
+            
+            # 更新合集信息
+            for collection in existing_collections:
+                contract_address = collection['contract_address']
+                if contract_address in collections:
+                    collections[contract_address].update({
+                        'is_verified': collection['is_verified'],
+                        'is_spam': collection['is_spam'],
+                        'is_visible': collection['is_visible'],
+                        'floor_price': str(collection['floor_price']),
+                        'floor_price_usd': str(collection['floor_price_usd'])
+                    })
+            
+            # 保存新的合集
+            for collection_data in collections.values():
+                await self._save_collection(collection_data)
+            
+            return list(collections.values())
+            
         except Exception as e:
             logger.error(f"获取 NFT 合集列表失败: {str(e)}")
             return []
@@ -621,7 +623,7 @@ class EVMNFTService:
             )
             
             # 验证 NFT 所有权
-            owner = nft_contract.functions.ownerOf(int(token_id)).call()
+            owner = await BlockingCallExecutor.run(nft_contract.functions.ownerOf(int(token_id)).call)
             if owner.lower() != from_address.lower():
                 raise TransferError("您不是该 NFT 的所有者")
             
@@ -630,10 +632,10 @@ class EVMNFTService:
             to_address = EVMUtils.to_checksum_address(to_address)
             
             # 获取 nonce
-            nonce = self.web3.eth.get_transaction_count(from_address)
+            nonce = await self.async_web3.eth.get_transaction_count(from_address)
             
             # 获取 gas 价格
-            gas_price = EVMUtils.get_gas_price(self.chain)
+            gas_price = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
             
             # 构建交易数据
             tx_data = nft_contract.functions.transferFrom(
@@ -649,17 +651,17 @@ class EVMNFTService:
             }) # type: ignore
             
             # 估算 gas
-            gas_limit = self.web3.eth.estimate_gas(tx_data)
+            gas_limit = await self.async_web3.eth.estimate_gas(tx_data)
             tx_data['gas'] = int(gas_limit * 1.1)  # type: ignore # 添加 10% 缓冲
             
             # 签名交易
             signed_tx = self.web3.eth.account.sign_transaction(tx_data, private_key)
             
             # 发送交易
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = await self.async_web3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # 等待交易确认
-            receipt = EVMUtils.wait_for_transaction_receipt(self.chain, tx_hash)
+            receipt = await BlockingCallExecutor.run(EVMUtils.wait_for_transaction_receipt, self.chain, tx_hash)
             if not receipt:
                 raise TransferError("交易确认超时")
                 
@@ -766,4 +768,9 @@ class EVMNFTService:
             
         except Exception as e:
             logger.error(f"保存交易记录失败: {str(e)}")
-            # 不抛出异常，因为转账已经成功了
\ No newline at end of file
+            # 不抛出异常，因为转账已经成功了
+        finally:
+            # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+            await PortfolioSnapshot.ainvalidate(self.chain, from_address)
+            await NFTInventory.ainvalidate(self.chain, from_address)
+            await ResponseETag.abump(ResponseETag.wallet_scope(self.chain, from_address))
\ No newline at end of file
@@ -3,13 +3,16 @@ import logging
 from typing import Dict, List, Any, Optional
 from decimal import Decimal
 import aiohttp
-import asyncio
+import functools
 from web3 import Web3
 from django.utils import timezone
-from django.core.cache import cache
 
 from ...models import Token
 from ..evm_config import RPCConfig, MoralisConfig
+from ..http_client import HTTPClientRegistry
+from ..gateway import UpstreamGateway
+from ..price_cache import PriceCache
+from ..price_resolver import PriceResolver
 from .utils import EVMUtils
 
 logger = logging.getLogger(__name__)
@@ -17,8 +20,6 @@ logger = logging.getLogger(__name__)
 class EVMPriceService:
     """EVM 价格服务实现类"""
 
-    PRICE_CACHE_TTL = 300  # 价格缓存5分钟
-
     def __init__(self, chain: str):
         """初始化
         
@@ -40,36 +41,15 @@ class EVMPriceService:
     async def get_token_price(self, token_address: str) -> Optional[Dict]:
         """获取代币价格"""
         try:
-            # 检查缓存
-            cache_key = f"evm_token_price_{self.chain}_{token_address}"
-            cached_price = cache.get(cache_key)
-            if cached_price:
-                return cached_price
-                
-            # 使用 Moralis API 获取价格
-            url = MoralisConfig.EVM_TOKEN_PRICE_URL.format(token_address)
-            params = {'chain': self.chain.lower()}
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status != 200:
-                        raise Exception(f"获取代币价格失败: {await response.text()}")
-                    
-                    result = await response.json()
-                    if not result:
-                        return None
-                    
-                    price_data = {
-                        'address': token_address,
-                        'price_usd': Decimal(str(result.get('usdPrice', 0))),
-                        'price_change_24h': Decimal(str(result.get('24hrPercentChange', 0))),
-                        'volume_24h': Decimal(str(result.get('24hrVolume', 0))),
-                        'market_cap': Decimal(str(result.get('marketCap', 0)))
-                    }
-                    
-                    # 缓存价格数据
-                    cache.set(cache_key, price_data, self.PRICE_CACHE_TTL)
-                    return price_data
+            # 两级缓存，过期价格先返回并在后台刷新
+            result = await PriceCache.get(
+                self.chain,
+                token_address,
+                functools.partial(self._fetch_token_price, token_address)
+            )
+            if not result:
+                return None
+            return self._build_price_data(token_address, result)
             
         except Exception as e:
             logger.error(f"获取代币价格失败: {str(e)}")
@@ -90,7 +70,7 @@ class EVMPriceService:
                 'days': days
             }
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         raise Exception(f"获取代币历史价格失败: {await response.text()}")
@@ -114,66 +94,54 @@ class EVMPriceService:
         vs_currency: str = "usd"
     ) -> Dict[str, Dict]:
         """批量获取代币价格"""
-        result = {}
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            try:
-                # 创建异步任务列表
-                tasks = []
-                for address in token_addresses:
-                    cache_key = f"evm_token_price_{self.chain}_{address}"
-                    cached_price = cache.get(cache_key)
-                    if cached_price:
-                        result[address] = cached_price
-                    else:
-                        tasks.append(self._get_single_token_price(session, address))
-                
-                if tasks:
-                    # 并发执行所有任务
-                    prices = await asyncio.gather(*tasks)
-                    
-                    # 处理结果
-                    for price_data in prices:
-                        if price_data and 'address' in price_data:
-                            result[price_data['address']] = price_data
-                            # 缓存价格数据
-                            cache_key = f"evm_token_price_{self.chain}_{price_data['address']}"
-                            cache.set(cache_key, price_data, self.PRICE_CACHE_TTL)
-                
-                return result
-                
-            except Exception as e:
-                logger.error(f"批量获取代币价格失败: {str(e)}")
-                return {addr: None for addr in token_addresses} # type: ignore
-
-    async def _get_single_token_price(self, session: aiohttp.ClientSession, token_address: str) -> Optional[Dict]:
-        """获取单个代币价格"""
         try:
-            url = MoralisConfig.EVM_TOKEN_PRICE_URL.format(token_address)
-            params = {'chain': self.chain.lower()}
+            # 缓存一次读取，未命中的通过 Moralis 批量价格接口获取
+            prices = await PriceResolver.resolve(
+                self.chain,
+                token_addresses,
+                fetcher_factory=lambda address: functools.partial(self._fetch_token_price, address)
+            )
+            return {
+                address: self._build_price_data(address, price)
+                for address, price in prices.items()
+                if price
+            }
             
-            async with session.get(url, headers=self.headers, params=params) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    if result:
-                        return {
-                            'address': token_address,
-                            'price_usd': Decimal(str(result.get('usdPrice', 0))),
-                            'price_change_24h': Decimal(str(result.get('24hrPercentChange', 0))),
-                            'volume_24h': Decimal(str(result.get('24hrVolume', 0))),
-                            'market_cap': Decimal(str(result.get('marketCap', 0)))
-                        }
-                return None
-                
         except Exception as e:
-            logger.error(f"获取单个代币价格失败: {str(e)}")
-            return None
+            logger.error(f"批量获取代币价格失败: {str(e)}")
+            return {addr: None for addr in token_addresses} # type: ignore
+
+    async def _fetch_token_price(self, token_address: str) -> Optional[Dict]:
+        """从 Moralis 获取原始价格数据"""
+        url = MoralisConfig.EVM_TOKEN_PRICE_URL.format(token_address)
+        # 与 EVMTokenInfoService、PriceResolver 共用价格缓存，请求参数需保持一致
+        params = {
+            'chain': MoralisConfig.get_chain_id(self.chain),
+            'include': 'percent_change'
+        }
+        
+        # 相同代币的并发价格请求合并为一次上游调用
+        return await UpstreamGateway.fetch_json(
+            'moralis', url, headers=self.headers, params=params, coalesce=True, not_found={}
+        )
+
+    @staticmethod
+    def _build_price_data(token_address: str, result: Dict) -> Dict:
+        """把 Moralis 原始价格数据转换为价格信息"""
+        return {
+            'address': token_address,
+            'price_usd': Decimal(str(result.get('usdPrice', 0))),
+            'price_change_24h': Decimal(str(result.get('24hrPercentChange', 0))),
+            'volume_24h': Decimal(str(result.get('24hrVolume', 0))),
+            'market_cap': Decimal(str(result.get('marketCap', 0)))
+        }
 
     async def get_native_token_price(self) -> Optional[Dict]:
         """获取原生代币价格"""
         try:
             url = MoralisConfig.EVM_TOKEN_PRICE_BATCH_URL.format(self.chain.lower()) # type: ignore
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers) as response:
                     if response.status != 200:
                         raise Exception(f"获取原生代币价格失败: {await response.text()}")
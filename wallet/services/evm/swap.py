@@ -10,8 +10,9 @@ from eth_account import Account
 import json
 import asyncio
 
-from ...models import Token, Wallet, Transaction
+from ...models import Wallet, Transaction
 from ..evm_config import RPCConfig, MoralisConfig
+from ..http_client import HTTPClientRegistry
 from ...exceptions import (
     WalletNotFoundError, 
     ChainNotSupportError, 
@@ -20,6 +21,12 @@ from ...exceptions import (
     GetSupportedTokensError
 )
 from .utils import EVMUtils
+from ..blocking_executor import BlockingCallExecutor
+from ..portfolio_cache import PortfolioSnapshot
+from ..etag import ResponseETag
+from ..token_registry import TokenRegistry
+from ..decimals_store import TokenDecimals
+from .multicall import Multicall3
 from .token_info import EVMTokenInfoService
 
 logger = logging.getLogger(__name__)
@@ -36,6 +43,7 @@ class EVMSwapService:
         self.chain = chain
         self.chain_config = EVMUtils.get_chain_config(chain)
         self.web3 = EVMUtils.get_web3(chain)
+        self.async_web3 = EVMUtils.get_async_web3(chain)
         
         # Moralis API 配置
         self.api_url = RPCConfig.get_alchemy_url(chain)
@@ -327,30 +335,26 @@ class EVMSwapService:
             }
 
     async def _get_token_decimals(self, token_address: str) -> int:
-        """获取代币精度"""
+        """获取代币精度，每个代币只从链上读取一次"""
         if token_address == EVMUtils.NATIVE_TOKEN_ADDRESS:
             return 18
-            
+        
+        decimals = await TokenDecimals.get(self.chain, token_address, lambda: self._fetch_token_decimals(token_address))
+        if decimals is not None:
+            return decimals
+        # USDC 使用 6 位精度
+        if token_address.lower() == "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913":
+            return 6
+        return 18  # 默认返回18位精度
+
+    async def _fetch_token_decimals(self, token_address: str) -> Optional[int]:
+        """通过 Multicall3 读取合约精度"""
         try:
-            contract = self.web3.eth.contract(
-                address=Web3.to_checksum_address(token_address),
-                abi=[{
-                    "constant": True,
-                    "inputs": [],
-                    "name": "decimals",
-                    "outputs": [{"name": "", "type": "uint8"}],
-                    "type": "function"
-                }]
-            )
-            
-            return contract.functions.decimals().call()
-            
+            data = await Multicall3.for_chain(self.chain).read_erc20(token_address, fields=('decimals',))
+            return data.get('decimals')
         except Exception as e:
             logger.error(f"获取代币精度失败: {str(e)}")
-            # USDC 使用 6 位精度
-            if token_address.lower() == "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913":
-                return 6
-            return 18  # 默认返回18位精度
+            return None
 
     async def _get_market_price(self, from_token: str, to_token: str) -> Optional[Decimal]:
         """获取市场价格"""
@@ -387,10 +391,10 @@ class EVMSwapService:
                 path = [Web3.to_checksum_address(from_token), Web3.to_checksum_address(to_token)]
                 logger.info(f"尝试获取兑换路径的输出金额: {path}")
                 
-                amounts = router.functions.getAmountsOut(
+                amounts = await BlockingCallExecutor.run(router.functions.getAmountsOut(
                     base_amount,
                     path
-                ).call()
+                ).call)
                 logger.info(f"获取到的输出金额序列: {amounts}")
                 
                 if not amounts or len(amounts) < 2:
@@ -468,10 +472,10 @@ class EVMSwapService:
                 logger.info(f"兑换路径: {path}")
                 
                 # 计算输出金额
-                amounts_out = await router.functions.getAmountsOut(
+                amounts_out = await BlockingCallExecutor.run(router.functions.getAmountsOut(
                     amount_in,
                     path
-                ).call()
+                ).call)
                 logger.info(f"预期输出金额: {amounts_out}")
                 
                 if not amounts_out or len(amounts_out) < 2:
@@ -604,10 +608,10 @@ class EVMSwapService:
                 path = [from_token_address, to_token_address]
                 logger.info(f"尝试获取兑换路径的输出金额: {path}")
                 
-                amounts = router.functions.getAmountsOut(
+                amounts = await BlockingCallExecutor.run(router.functions.getAmountsOut(
                     chain_amount,
                     path
-                ).call()
+                ).call)
                 logger.info(f"获取到的输出金额序列: {amounts}")
                 
                 if not amounts or len(amounts) < 2:
@@ -639,10 +643,10 @@ class EVMSwapService:
                         "type": "function"
                     }])
                     
-                    pair_address = factory.functions.getPair(
+                    pair_address = await BlockingCallExecutor.run(factory.functions.getPair(
                         from_token_address,
                         to_token_address
-                    ).call()
+                    ).call)
                     
                     if pair_address == "0x0000000000000000000000000000000000000000":
                         logger.error(f"交易对不存在: {from_token_address} - {to_token_address}")
@@ -761,14 +765,14 @@ class EVMSwapService:
                 }
             
             # 检查是否支持 EIP-1559
-            if self.web3.eth.get_block('latest').get('baseFeePerGas') is not None:
+            if (await self.async_web3.eth.get_block('latest')).get('baseFeePerGas') is not None:
                 # 使用 EIP-1559 费用
-                fee_data = EVMUtils.get_gas_price(self.chain)
+                fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                 tx_data['maxPriorityFeePerGas'] = fee_data['max_priority_fee']
                 tx_data['maxFeePerGas'] = fee_data['max_fee']
             else:
                 # 使用传统 gas price
-                tx_data['gasPrice'] = self.web3.eth.gas_price
+                tx_data['gasPrice'] = await self.async_web3.eth.gas_price
             
             # 返回交易数据和额外信息
             return {
@@ -962,10 +966,10 @@ class EVMSwapService:
             }])
             
             # 获取授权额度
-            allowance = contract.functions.allowance(
+            allowance = await BlockingCallExecutor.run(contract.functions.allowance(
                 Web3.to_checksum_address(wallet_address),
                 Web3.to_checksum_address(spender)
-            ).call()
+            ).call)
             
             # 使用代币精度格式化输出
             formatted_allowance = EVMUtils.from_wei(allowance, decimals)
@@ -1028,11 +1032,11 @@ class EVMSwapService:
             )
             
             # 获取 nonce
-            nonce = self.web3.eth.get_transaction_count(from_address, 'pending')
+            nonce = await self.async_web3.eth.get_transaction_count(from_address, 'pending')
             
             # 检查是否支持 EIP-1559
             try:
-                latest_block = self.web3.eth.get_block('latest')
+                latest_block = await self.async_web3.eth.get_block('latest')
                 supports_eip1559 = 'baseFeePerGas' in latest_block
             except Exception:
                 supports_eip1559 = False
@@ -1048,17 +1052,17 @@ class EVMSwapService:
             
             if supports_eip1559:
                 # 使用 EIP-1559 费用机制
-                fee_data = EVMUtils.get_gas_price(self.chain)
+                fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                 tx_data['maxPriorityFeePerGas'] = fee_data.get('max_priority_fee', 1500000000)  # 1.5 Gwei
                 tx_data['maxFeePerGas'] = fee_data.get('max_fee', 3000000000)  # 3 Gwei
             else:
                 # 使用传统 gas price，确保至少 5 Gwei
-                gas_price = max(self.web3.eth.gas_price, 5000000000)  # 5 Gwei
+                gas_price = max(await self.async_web3.eth.gas_price, 5000000000)  # 5 Gwei
                 tx_data['gasPrice'] = gas_price
             
             # 估算 gas
             try:
-                gas_limit = self.web3.eth.estimate_gas({
+                gas_limit = await self.async_web3.eth.estimate_gas({
                     'from': from_address,
                     'to': token_address,
                     'data': approve_data
@@ -1144,10 +1148,10 @@ class EVMSwapService:
                 path = [from_token_address, to_token_address]
                 logger.info(f"尝试获取兑换路径的输出金额: {path}")
                 
-                amounts = router.functions.getAmountsOut(
+                amounts = await BlockingCallExecutor.run(router.functions.getAmountsOut(
                     chain_amount,
                     path
-                ).call()
+                ).call)
                 logger.info(f"获取到的输出金额序列: {amounts}")
                 
                 if not amounts or len(amounts) < 2:
@@ -1179,10 +1183,10 @@ class EVMSwapService:
                         "type": "function"
                     }])
                     
-                    pair_address = factory.functions.getPair(
+                    pair_address = await BlockingCallExecutor.run(factory.functions.getPair(
                         from_token_address,
                         to_token_address
-                    ).call()
+                    ).call)
                     
                     if pair_address == "0x0000000000000000000000000000000000000000":
                         logger.error(f"交易对不存在: {from_token_address} - {to_token_address}")
@@ -1213,7 +1217,7 @@ class EVMSwapService:
                 ).build_transaction({
                     'from': Web3.to_checksum_address(from_address),
                     'value': chain_amount,
-                    'nonce': self.web3.eth.get_transaction_count(from_address, 'pending'),
+                    'nonce': await self.async_web3.eth.get_transaction_count(from_address, 'pending'),
                     'chainId': self.chain_config['chain_id']
                 })
             elif is_to_native:
@@ -1227,7 +1231,7 @@ class EVMSwapService:
                 ).build_transaction({
                     'from': Web3.to_checksum_address(from_address),
                     'value': 0,
-                    'nonce': self.web3.eth.get_transaction_count(from_address, 'pending'),
+                    'nonce': await self.async_web3.eth.get_transaction_count(from_address, 'pending'),
                     'chainId': self.chain_config['chain_id']
                 })
             else:
@@ -1241,25 +1245,25 @@ class EVMSwapService:
                 ).build_transaction({
                     'from': Web3.to_checksum_address(from_address),
                     'value': 0,
-                    'nonce': self.web3.eth.get_transaction_count(from_address, 'pending'),
+                    'nonce': await self.async_web3.eth.get_transaction_count(from_address, 'pending'),
                     'chainId': self.chain_config['chain_id']
                 })
             
             # 检查是否支持 EIP-1559
-            if self.web3.eth.get_block('latest').get('baseFeePerGas') is not None:
+            if (await self.async_web3.eth.get_block('latest')).get('baseFeePerGas') is not None:
                 # 使用 EIP-1559 费用
-                fee_data = EVMUtils.get_gas_price(self.chain)
+                fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                 tx_data['maxPriorityFeePerGas'] = fee_data['max_priority_fee']
                 tx_data['maxFeePerGas'] = fee_data['max_fee']
                 # 移除 gasPrice 字段（如果存在）
                 tx_data.pop('gasPrice', None)
             else:
                 # 使用传统 gas price
-                tx_data['gasPrice'] = self.web3.eth.gas_price
+                tx_data['gasPrice'] = await self.async_web3.eth.gas_price
             
             # 估算 gas
             try:
-                gas_limit = self.web3.eth.estimate_gas({
+                gas_limit = await self.async_web3.eth.estimate_gas({
                     'from': Web3.to_checksum_address(from_address),
                     'to': router_address,
                     'value': chain_amount if is_from_native else 0, # type: ignore
@@ -1328,6 +1332,10 @@ class EVMSwapService:
                 logger.info(f"已保存 Swap 交易记录: {result['data']['tx_hash']}")
             except Exception as e:
                 logger.error(f"保存交易记录失败: {str(e)}")
+            finally:
+                # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+                await PortfolioSnapshot.ainvalidate(self.chain, from_address)
+                await ResponseETag.abump(ResponseETag.wallet_scope(self.chain, from_address))
             
             return result
             
@@ -1351,19 +1359,15 @@ class EVMSwapService:
                     'verified': True
                 }
             
-            token = await sync_to_async(Token.objects.filter(
-                chain=self.chain,
-                address=token_address
-            ).first)()
-            
+            token = await TokenRegistry.get(self.chain, token_address)
             if token:
                 return {
-                    'address': token.address,
-                    'name': token.name,
-                    'symbol': token.symbol,
-                    'decimals': token.decimals,
-                    'logo': token.logo,
-                    'verified': token.verified
+                    'address': token['address'],
+                    'name': token['name'],
+                    'symbol': token['symbol'],
+                    'decimals': token['decimals'],
+                    'logo': token['logo'],
+                    'verified': token['verified']
                 }
             
             return {}
@@ -1393,7 +1397,7 @@ class EVMSwapService:
                 'limit': limit
             }
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         raise Exception(f"获取钱包 Swap 历史失败: {await response.text()}")
@@ -1426,7 +1430,7 @@ class EVMSwapService:
                 'limit': limit
             }
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=self.headers, params=params) as response:
                     if response.status != 200:
                         raise Exception(f"获取代币 Swap 历史失败: {await response.text()}")
@@ -1508,13 +1512,13 @@ class EVMSwapService:
             
             # 获取 nonce
             sender = Account.from_key(private_key).address
-            tx['nonce'] = self.web3.eth.get_transaction_count(sender, 'pending')
+            tx['nonce'] = await self.async_web3.eth.get_transaction_count(sender, 'pending')
             
             # 确保必要的交易字段存在
             if 'gas' not in tx:
                 # 估算 gas limit
                 try:
-                    gas_limit = self.web3.eth.estimate_gas({
+                    gas_limit = await self.async_web3.eth.estimate_gas({
                         'from': Web3.to_checksum_address(tx.get('from')), # type: ignore
                         'to': Web3.to_checksum_address(tx.get('to')), # type: ignore
                         'value': tx.get('value', 0),
@@ -1527,7 +1531,7 @@ class EVMSwapService:
             
             # 检查是否支持 EIP-1559
             try:
-                latest_block = self.web3.eth.get_block('latest')
+                latest_block = await self.async_web3.eth.get_block('latest')
                 supports_eip1559 = 'baseFeePerGas' in latest_block
             except Exception:
                 supports_eip1559 = False
@@ -1535,7 +1539,7 @@ class EVMSwapService:
             if supports_eip1559:
                 # 使用 EIP-1559 费用机制
                 if 'maxFeePerGas' not in tx or 'maxPriorityFeePerGas' not in tx:
-                    fee_data = EVMUtils.get_gas_price(self.chain)
+                    fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                     tx['maxPriorityFeePerGas'] = fee_data.get('max_priority_fee', 1500000000)  # 1.5 Gwei
                     tx['maxFeePerGas'] = fee_data.get('max_fee', 3000000000)  # 3 Gwei
                 # 移除 gasPrice 字段（如果存在）
@@ -1543,7 +1547,7 @@ class EVMSwapService:
             else:
                 # 使用传统 gas price
                 if 'gasPrice' not in tx:
-                    tx['gasPrice'] = self.web3.eth.gas_price
+                    tx['gasPrice'] = await self.async_web3.eth.gas_price
                 # 移除 EIP-1559 相关字段（如果存在）
                 tx.pop('maxFeePerGas', None)
                 tx.pop('maxPriorityFeePerGas', None)
@@ -1558,10 +1562,11 @@ class EVMSwapService:
             signed_tx = self.web3.eth.account.sign_transaction(tx, private_key=private_key)
             
             # 发送交易
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = await self.async_web3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # 等待交易确认
-            receipt = EVMUtils.wait_for_transaction_receipt(
+            receipt = await BlockingCallExecutor.run(
+                EVMUtils.wait_for_transaction_receipt,
                 self.chain,
                 tx_hash,
                 timeout=60
@@ -1,20 +1,25 @@
 """EVM 代币信息服务"""
 import logging
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from decimal import Decimal
 import aiohttp
 import asyncio
+import functools
 from web3 import Web3
 from asgiref.sync import sync_to_async
 from django.utils import timezone
 from datetime import datetime
-from django.core.cache import cache
 import json
 import os
 
 from ...models import Token
 from ..evm_config import RPCConfig, MoralisConfig
+from ..http_client import HTTPClientRegistry
+from ..gateway import UpstreamGateway
+from ..price_cache import PriceCache
+from ..price_resolver import PriceResolver
 from .utils import EVMUtils
+from .multicall import Multicall3
 
 logger = logging.getLogger(__name__)
 
@@ -82,62 +87,11 @@ class EVMTokenInfoService:
             # 如果元数据获取失败，尝试直接从合约获取基本信息
             try:
                 logger.info(f"尝试从合约获取代币信息: {token_address}")
-                contract = self.web3.eth.contract(
-                    address=Web3.to_checksum_address(token_address),
-                    abi=[{
-                        "constant": True,
-                        "inputs": [],
-                        "name": "name",
-                        "outputs": [{"name": "", "type": "string"}],
-                        "type": "function"
-                    }, {
-                        "constant": True,
-                        "inputs": [],
-                        "name": "symbol",
-                        "outputs": [{"name": "", "type": "string"}],
-                        "type": "function"
-                    }, {
-                        "constant": True,
-                        "inputs": [],
-                        "name": "decimals",
-                        "outputs": [{"name": "", "type": "uint8"}],
-                        "type": "function"
-                    }]
-                )
-                
-                try:
-                    # 分别获取每个字段，并记录日志
-                    name = await self.web3.eth.call_async({ # type: ignore
-                        'to': token_address,
-                        'data': contract.encodeABI('name')
-                    })
-                    name = self.web3.decode_function_result(contract.get_function_by_name('name'), name)[0] # type: ignore
-                    logger.info(f"获取到代币名称: {name}")
-                except Exception as e:
-                    logger.error(f"获取代币名称失败: {str(e)}")
-                    name = 'Unknown Token'
-
-                try:
-                    symbol = await self.web3.eth.call_async({ # type: ignore
-                        'to': token_address,
-                        'data': contract.encodeABI('symbol')
-                    })
-                    symbol = self.web3.decode_function_result(contract.get_function_by_name('symbol'), symbol)[0] # type: ignore
-                    logger.info(f"获取到代币符号: {symbol}")
-                except Exception as e:
-                    logger.error(f"获取代币符号失败: {str(e)}")
-                    symbol = '???'
-
-                try:
-                    decimals = await self.web3.eth.call_async({ # type: ignore
-                        'to': token_address,
-                        'data': contract.encodeABI('decimals')
-                    })
-                    decimals = self.web3.decode_function_result(contract.get_function_by_name('decimals'), decimals)[0] # type: ignore
-                    logger.info(f"获取到代币精度: {decimals}")
-                except Exception as e:
-                    logger.error(f"获取代币精度失败: {str(e)}")
-                    decimals = 18
+                fields = await Multicall3.for_chain(self.chain).read_erc20(token_address)
+                name = fields['name'] or 'Unknown Token'
+                symbol = fields['symbol'] or '???'
+                decimals = fields['decimals'] if fields['decimals'] is not None else 18
+                logger.info(f"获取到代币信息: {name} {symbol} {decimals}")
                 
                 return {
                     'address': token_address,
@@ -287,40 +241,15 @@ class EVMTokenInfoService:
         """直接从合约获取代币信息"""
         try:
             logger.info(f"从合约获取代币信息: {token_address}")
-            contract = self.web3.eth.contract(
-                address=Web3.to_checksum_address(token_address),
-                abi=[{
-                    "constant": True,
-                    "inputs": [],
-                    "name": "name",
-                    "outputs": [{"name": "", "type": "string"}],
-                    "type": "function"
-                }, {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "symbol",
-                    "outputs": [{"name": "", "type": "string"}],
-                    "type": "function"
-                }, {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "decimals",
-                    "outputs": [{"name": "", "type": "uint8"}],
-                    "type": "function"
-                }, {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "totalSupply",
-                    "outputs": [{"name": "", "type": "uint256"}],
-                    "type": "function"
-                }]
+            # 获取基本信息，所有字段通过 Multicall3 一次请求读取
+            fields = await Multicall3.for_chain(self.chain).read_erc20(
+                token_address,
+                ('name', 'symbol', 'decimals', 'totalSupply')
             )
-            
-            # 获取基本信息
-            name = await self._safe_call_contract(contract, 'name', 'Unknown Token')
-            symbol = await self._safe_call_contract(contract, 'symbol', '???')
-            decimals = await self._safe_call_contract(contract, 'decimals', 18)
-            total_supply = await self._safe_call_contract(contract, 'totalSupply', '0')
+            name = fields['name'] or 'Unknown Token'
+            symbol = fields['symbol'] or '???'
+            decimals = fields['decimals'] if fields['decimals'] is not None else 18
+            total_supply = fields['totalSupply'] if fields['totalSupply'] is not None else 0
             
             # 获取价格信息
             price_data = await self.get_token_price(token_address)
@@ -357,17 +286,6 @@ class EVMTokenInfoService:
                 'price_change_24h': '+0.00%'
             }
 
-    async def _safe_call_contract(self, contract, method_name: str, default_value: Any) -> Any:
-        """安全调用合约方法"""
-        try:
-            method = getattr(contract.functions, method_name)
-            result = await method().call()
-            logger.info(f"获取到{method_name}: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"获取{method_name}失败: {str(e)}")
-            return default_value
-
     def validate_token_address(self, token_address: str) -> bool:
         """验证代币合约地址"""
         try:
@@ -539,7 +457,7 @@ class EVMTokenInfoService:
             
             logger.debug(f"请求 Moralis API 获取交易对 - URL: {pairs_url}, 参数: {pairs_params}")
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(
                     pairs_url, 
                     headers=MoralisConfig.get_headers(), 
@@ -668,6 +586,43 @@ class EVMTokenInfoService:
             # 恢复原始链设置
             self.chain = original_chain
 
+    async def get_token_prices(self, token_addresses: List[str]) -> Dict[str, Dict]:
+        """批量获取代币价格，缓存只读取一次，未命中的代币批量请求
+        
+        Args:
+            token_addresses: 代币合约地址列表
+            
+        Returns:
+            Dict[str, Dict]: 代币地址到价格信息的映射
+        """
+        prices = {}
+        async for chunk in self.iter_token_prices(token_addresses):
+            prices.update(chunk)
+        return prices
+
+    async def iter_token_prices(self, token_addresses: List[str]) -> AsyncIterator[Dict[str, Dict]]:
+        """与 get_token_prices 相同，但按价格到达顺序分批产出（缓存命中的最先产出）"""
+        # 原生代币需要映射到包装代币，单独获取
+        native = [address for address in token_addresses if address == EVMUtils.NATIVE_TOKEN_ADDRESS]
+        contracts = [address for address in token_addresses if address != EVMUtils.NATIVE_TOKEN_ADDRESS]
+        
+        # 缓存一次读取，未命中的通过 Moralis 批量价格接口获取
+        raw_chunks = PriceResolver.resolve_iter(
+            self.chain,
+            contracts,
+            fetcher_factory=lambda address: functools.partial(self._fetch_token_price, self.chain, address)
+        )
+        try:
+            async for raw_prices in raw_chunks:
+                yield {
+                    address: self._format_price(result) if result else {'price_usd': '0', 'price_change_24h': '+0.00%'}
+                    for address, result in raw_prices.items()
+                }
+        finally:
+            await raw_chunks.aclose()
+        for address in native:
+            yield {address: await self.get_token_price(address)}
+
     async def get_token_price(self, token_address: str) -> Dict:
         """获取代币价格
         
@@ -678,117 +633,111 @@ class EVMTokenInfoService:
             Dict: 价格信息，包含 price_usd 和 price_change_24h
         """
         try:
-            # 检查缓存
-            cache_key = f"token_price_{self.chain}_{token_address}"
-            cached_price = cache.get(cache_key)
-            if cached_price:
-                return cached_price
-            
             # 如果是原生代币，使用对应的包装代币地址
-            original_chain = self.chain
-            try:
-                if token_address == EVMUtils.NATIVE_TOKEN_ADDRESS:
-                    if self.chain in ['ETH', 'BASE', 'ARBITRUM', 'OPTIMISM']:
-                        # 对于 ETH 和其他使用 ETH 作为原生代币的链，使用 ETH 主网的 WETH
-                        self.chain = 'ETH'  # 切换到 ETH 主网
-                        token_address = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'  # ETH 主网 WETH
-                    else:
-                        # 其他链使用各自的包装代币
-                        native_token = RPCConfig.NATIVE_TOKENS.get(self.chain)
-                        if not native_token or 'address' not in native_token:
-                            logger.error(f"找不到 {self.chain} 的包装代币地址")
-                            return {
-                                'price_usd': '0',
-                                'price_change_24h': '+0.00%'
-                            }
-                        token_address = native_token['address']
-                
-                # 获取 Moralis API 配置
-                if not MoralisConfig.API_KEY:
-                    logger.error("未配置 MORALIS_API_KEY")
-                    return {
-                        'price_usd': '0',
-                        'price_change_24h': '+0.00%'
-                    }
-                
-                # 获取链 ID
-                chain = MoralisConfig.get_chain_id(self.chain)
-                
-                # 构建 API URL
-                url = MoralisConfig.EVM_TOKEN_PRICE_URL.format(token_address)
-                params = {
-                    'chain': chain,
-                    'include': 'percent_change'
+            price_chain = self.chain
+            if token_address == EVMUtils.NATIVE_TOKEN_ADDRESS:
+                if self.chain in ['ETH', 'BASE', 'ARBITRUM', 'OPTIMISM']:
+                    # 对于 ETH 和其他使用 ETH 作为原生代币的链，使用 ETH 主网的 WETH
+                    price_chain = 'ETH'
+                    token_address = '0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2'  # ETH 主网 WETH
+                else:
+                    # 其他链使用各自的包装代币
+                    native_token = RPCConfig.NATIVE_TOKENS.get(self.chain)
+                    if not native_token or 'address' not in native_token:
+                        logger.error(f"找不到 {self.chain} 的包装代币地址")
+                        return {
+                            'price_usd': '0',
+                            'price_change_24h': '+0.00%'
+                        }
+                    token_address = native_token['address']
+            
+            # 获取 Moralis API 配置
+            if not MoralisConfig.API_KEY:
+                logger.error("未配置 MORALIS_API_KEY")
+                return {
+                    'price_usd': '0',
+                    'price_change_24h': '+0.00%'
                 }
-                
-                logger.debug(f"请求 Moralis API - URL: {url}, 参数: {params}")
-                
-                async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                    async with session.get(url, headers=MoralisConfig.get_headers(), params=params) as response:
-                        response_text = await response.text()
-                        logger.debug(f"Moralis API 响应: {response_text}")
-                        
-                        if response.status == 200:
-                            try:
-                                result = json.loads(response_text)
-                            except json.JSONDecodeError:
-                                logger.error(f"解析价格数据失败: {response_text}")
-                                return {
-                                    'price_usd': '0',
-                                    'price_change_24h': '+0.00%'
-                                }
-                            
-                            # 获取价格
-                            try:
-                                price = float(result.get('usdPrice', result.get('usdPriceFormatted', 0)))
-                            except (TypeError, ValueError):
-                                price = 0
-                            
-                            # 获取24小时价格变化
-                            try:
-                                price_change = float(result.get('24hrPercentChange', 0))
-                            except (TypeError, ValueError):
-                                price_change = 0
-                            
-                            # 格式化价格
-                            if price < 0.000001:
-                                formatted_price = '{:.12f}'.format(price)
-                            elif price < 0.00001:
-                                formatted_price = '{:.10f}'.format(price)
-                            elif price < 0.0001:
-                                formatted_price = '{:.8f}'.format(price)
-                            elif price < 0.01:
-                                formatted_price = '{:.6f}'.format(price)
-                            else:
-                                formatted_price = '{:.4f}'.format(price)
-                            formatted_price = formatted_price.rstrip('0').rstrip('.')
-                            
-                            # 格式化价格变化
-                            formatted_price_change = '{:+.2f}%'.format(price_change)
-                            
-                            price_data = {
-                                'price_usd': formatted_price,
-                                'price_change_24h': formatted_price_change
-                            }
-                            
-                            # 缓存价格数据
-                            if price_data['price_usd'] != '0':
-                                cache.set(cache_key, price_data, timeout=300)  # 5分钟缓存
-                                
-                            return price_data
-                        else:
-                            logger.error(f"获取代币价格失败: {response_text}")
-                            return {
-                                'price_usd': '0',
-                                'price_change_24h': '+0.00%'
-                            }
-            finally:
-                # 恢复原始链设置
-                self.chain = original_chain
+            
+            # 两级缓存，过期价格先返回并在后台刷新
+            result = await PriceCache.get(
+                price_chain,
+                token_address,
+                functools.partial(self._fetch_token_price, price_chain, token_address)
+            )
+            if not isinstance(result, dict):
+                logger.error(f"获取代币价格失败: {token_address}")
+                return {
+                    'price_usd': '0',
+                    'price_change_24h': '+0.00%'
+                }
+            
+            return self._format_price(result)
                         
         except Exception as e:
             logger.error(f"获取代币价格失败: {str(e)}")
             return {
                 'price_usd': '0',
                 'price_change_24h': '+0.00%'
-            }
\ No newline at end of file
+            }
+
+    async def _fetch_token_price(self, chain: str, token_address: str) -> Optional[Dict]:
+        """从 Moralis 获取原始价格数据"""
+        url = MoralisConfig.EVM_TOKEN_PRICE_URL.format(token_address)
+        params = {
+            'chain': MoralisConfig.get_chain_id(chain),
+            'include': 'percent_change'
+        }
+        
+        logger.debug(f"请求 Moralis API - URL: {url}, 参数: {params}")
+        
+        # 相同代币的并发价格请求合并为一次上游调用
+        result = await UpstreamGateway.fetch_json(
+            'moralis',
+            url,
+            headers=MoralisConfig.get_headers(),
+            params=params,
+            coalesce=True,
+            not_found={}
+        )
+        logger.debug(f"Moralis API 响应: {result}")
+        
+        if not isinstance(result, dict):
+            return None
+        return result
+
+    @staticmethod
+    def _format_price(result: Dict) -> Dict:
+        """把 Moralis 原始价格数据格式化为 price_usd / price_change_24h"""
+        # 获取价格
+        try:
+            price = float(result.get('usdPrice', result.get('usdPriceFormatted', 0)))
+        except (TypeError, ValueError):
+            price = 0
+        
+        # 获取24小时价格变化
+        try:
+            price_change = float(result.get('24hrPercentChange', 0))
+        except (TypeError, ValueError):
+            price_change = 0
+        
+        # 格式化价格
+        if price < 0.000001:
+            formatted_price = '{:.12f}'.format(price)
+        elif price < 0.00001:
+            formatted_price = '{:.10f}'.format(price)
+        elif price < 0.0001:
+            formatted_price = '{:.8f}'.format(price)
+        elif price < 0.01:
+            formatted_price = '{:.6f}'.format(price)
+        else:
+            formatted_price = '{:.4f}'.format(price)
+        formatted_price = formatted_price.rstrip('0').rstrip('.')
+        
+        # 格式化价格变化
+        formatted_price_change = '{:+.2f}%'.format(price_change)
+        
+        return {
+            'price_usd': formatted_price,
+            'price_change_24h': formatted_price_change
+        }
\ No newline at end of file
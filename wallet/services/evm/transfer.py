@@ -13,6 +13,11 @@ from ...models import Wallet, Transaction, Token
 from ..evm_config import RPCConfig
 from ...exceptions import InsufficientBalanceError, InvalidAddressError, TransferError
 from .utils import EVMUtils
+from .multicall import Multicall3
+from ..blocking_executor import BlockingCallExecutor
+from ..decimals_store import TokenDecimals
+from ..portfolio_cache import PortfolioSnapshot
+from ..etag import ResponseETag
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +33,7 @@ class EVMTransferService:
         self.chain = chain
         self.chain_config = EVMUtils.get_chain_config(chain)
         self.web3 = EVMUtils.get_web3(chain)
+        self.async_web3 = EVMUtils.get_async_web3(chain)
         
         # Alchemy API 配置
         self.api_url = RPCConfig.get_alchemy_url(chain)
@@ -87,7 +93,7 @@ class EVMTransferService:
                 }
                 
             # 获取 nonce
-            nonce = self.web3.eth.get_transaction_count(
+            nonce = await self.async_web3.eth.get_transaction_count(
                 Web3.to_checksum_address(from_address),
                 'pending'
             )
@@ -106,21 +112,22 @@ class EVMTransferService:
                 tx_params['gas'] = gas_limit
             else:
                 # 估算 gas limit
-                tx_params['gas'] = EVMUtils.estimate_gas_limit(
+                tx_params['gas'] = await BlockingCallExecutor.run(
+                    EVMUtils.estimate_gas_limit,
                     self.chain,
                     to_address,
                     value=int(amount)
                 )
             
             # 检查是否支持 EIP-1559
-            if self.web3.eth.get_block('latest').get('baseFeePerGas') is not None:
+            if (await self.async_web3.eth.get_block('latest')).get('baseFeePerGas') is not None:
                 # 使用 EIP-1559 费用
                 if max_priority_fee and max_fee:
                     tx_params['maxPriorityFeePerGas'] = max_priority_fee
                     tx_params['maxFeePerGas'] = max_fee
                 else:
                     # 获取建议费用
-                    fee_data = EVMUtils.get_gas_price(self.chain)
+                    fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                     tx_params['maxPriorityFeePerGas'] = fee_data['max_priority_fee']
                     tx_params['maxFeePerGas'] = fee_data['max_fee']
             else:
@@ -128,7 +135,7 @@ class EVMTransferService:
                 if gas_price:
                     tx_params['gasPrice'] = gas_price
                 else:
-                    tx_params['gasPrice'] = self.web3.eth.gas_price
+                    tx_params['gasPrice'] = await self.async_web3.eth.gas_price
             
             # 签名交易
             signed_tx = self.web3.eth.account.sign_transaction(
@@ -137,10 +144,11 @@ class EVMTransferService:
             )
             
             # 发送交易
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = await self.async_web3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # 等待交易确认
-            receipt = EVMUtils.wait_for_transaction_receipt(
+            receipt = await BlockingCallExecutor.run(
+                EVMUtils.wait_for_transaction_receipt,
                 self.chain,
                 tx_hash,
                 timeout=60
@@ -179,7 +187,7 @@ class EVMTransferService:
                 ).first())()
                 
                 # 获取区块时间
-                block = await sync_to_async(lambda: self.web3.eth.get_block(receipt['blockNumber']))()
+                block = await self.async_web3.eth.get_block(receipt['blockNumber'])
                 block_timestamp = block.get('timestamp', None)
                 
                 # 获取原生代币信息
@@ -250,6 +258,15 @@ class EVMTransferService:
                 'message': f"转账失败: {str(e)}"
             }
 
+    async def _fetch_token_decimals(self, token_address: str) -> Optional[int]:
+        """通过 Multicall3 读取合约精度"""
+        try:
+            data = await Multicall3.for_chain(self.chain).read_erc20(token_address, fields=('decimals',))
+            return data.get('decimals')
+        except Exception as e:
+            logger.error(f"获取代币精度失败: {str(e)}")
+            return None
+
     async def transfer_token(
         self,
         from_address: str,
@@ -336,8 +353,17 @@ class EVMTransferService:
                 }]
             )
             
-            # 获取代币精度
-            decimals = contract.functions.decimals().call()
+            # 获取代币精度，每个代币只从链上读取一次
+            decimals = await TokenDecimals.get(
+                self.chain,
+                token_address,
+                lambda: self._fetch_token_decimals(token_address)
+            )
+            if decimals is None:
+                return {
+                    'status': 'error',
+                    'message': f'获取代币精度失败: {token_address}'
+                }
             logger.info(f"代币精度: {decimals}, 原始金额: {amount}")
             
             # 将输入金额转换为链上金额
@@ -351,7 +377,7 @@ class EVMTransferService:
             )
             
             # 获取 nonce
-            nonce = self.web3.eth.get_transaction_count(
+            nonce = await self.async_web3.eth.get_transaction_count(
                 Web3.to_checksum_address(from_address),
                 'pending'
             )
@@ -370,21 +396,22 @@ class EVMTransferService:
                 tx_params['gas'] = gas_limit
             else:
                 # 估算 gas limit
-                tx_params['gas'] = EVMUtils.estimate_gas_limit(
+                tx_params['gas'] = await BlockingCallExecutor.run(
+                    EVMUtils.estimate_gas_limit,
                     self.chain,
                     token_address,
                     data=tx_data
                 )
             
             # 检查是否支持 EIP-1559
-            if self.web3.eth.get_block('latest').get('baseFeePerGas') is not None:
+            if (await self.async_web3.eth.get_block('latest')).get('baseFeePerGas') is not None:
                 # 使用 EIP-1559 费用
                 if max_priority_fee and max_fee:
                     tx_params['maxPriorityFeePerGas'] = max_priority_fee
                     tx_params['maxFeePerGas'] = max_fee
                 else:
                     # 获取建议费用
-                    fee_data = EVMUtils.get_gas_price(self.chain)
+                    fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                     tx_params['maxPriorityFeePerGas'] = fee_data['max_priority_fee']
                     tx_params['maxFeePerGas'] = fee_data['max_fee']
             else:
@@ -392,7 +419,7 @@ class EVMTransferService:
                 if gas_price:
                     tx_params['gasPrice'] = gas_price
                 else:
-                    tx_params['gasPrice'] = self.web3.eth.gas_price
+                    tx_params['gasPrice'] = await self.async_web3.eth.gas_price
             
             # 签名交易
             signed_tx = self.web3.eth.account.sign_transaction(
@@ -401,10 +428,11 @@ class EVMTransferService:
             )
             
             # 发送交易
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            tx_hash = await self.async_web3.eth.send_raw_transaction(signed_tx.rawTransaction)
             
             # 等待交易确认
-            receipt = EVMUtils.wait_for_transaction_receipt(
+            receipt = await BlockingCallExecutor.run(
+                EVMUtils.wait_for_transaction_receipt,
                 self.chain,
                 tx_hash,
                 timeout=60
@@ -474,7 +502,7 @@ class EVMTransferService:
                 }
                 
                 # 获取区块时间
-                block = await sync_to_async(lambda: self.web3.eth.get_block(receipt['blockNumber']))()
+                block = await self.async_web3.eth.get_block(receipt['blockNumber'])
                 block_timestamp = block.get('timestamp', None)
                 
                 # 计算实际金额
@@ -595,7 +623,7 @@ class EVMTransferService:
                     "type": "function"
                 }]
             )
-            return contract.functions.name().call()
+            return await BlockingCallExecutor.run(contract.functions.name().call)
         except Exception as e:
             logger.error(f"获取代币名称失败: {str(e)}")
             return ''
@@ -613,7 +641,7 @@ class EVMTransferService:
                     "type": "function"
                 }]
             )
-            return contract.functions.symbol().call()
+            return await BlockingCallExecutor.run(contract.functions.symbol().call)
         except Exception as e:
             logger.error(f"获取代币符号失败: {str(e)}")
             return ''
@@ -693,23 +721,25 @@ class EVMTransferService:
                 )
                 
                 # 估算 gas limit
-                gas_limit = EVMUtils.estimate_gas_limit(
+                gas_limit = await BlockingCallExecutor.run(
+                    EVMUtils.estimate_gas_limit,
                     self.chain,
                     token_address,
                     data=tx_data
                 )
             else:
                 # 原生代币转账
-                gas_limit = EVMUtils.estimate_gas_limit(
+                gas_limit = await BlockingCallExecutor.run(
+                    EVMUtils.estimate_gas_limit,
                     self.chain,
                     to_address,
                     value=int(amount)
                 )
             
             # 获取 gas 价格
-            if self.web3.eth.get_block('latest').get('baseFeePerGas') is not None:
+            if (await self.async_web3.eth.get_block('latest')).get('baseFeePerGas') is not None:
                 # 使用 EIP-1559 费用
-                fee_data = EVMUtils.get_gas_price(self.chain)
+                fee_data = await BlockingCallExecutor.run(EVMUtils.get_gas_price, self.chain)
                 max_priority_fee = fee_data['max_priority_fee']
                 max_fee = fee_data['max_fee']
                 estimated_fee = gas_limit * max_fee
@@ -727,7 +757,7 @@ class EVMTransferService:
                 }
             else:
                 # 使用传统 gas price
-                gas_price = self.web3.eth.gas_price
+                gas_price = await self.async_web3.eth.gas_price
                 estimated_fee = gas_limit * gas_price
                 
                 return {
@@ -798,4 +828,8 @@ class EVMTransferService:
             
         except Exception as e:
             logger.error(f"保存交易记录失败: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
+        finally:
+            # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+            await PortfolioSnapshot.ainvalidate(self.chain, wallet_address)
+            await ResponseETag.abump(ResponseETag.wallet_scope(self.chain, wallet_address))
\ No newline at end of file
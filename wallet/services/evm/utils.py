@@ -7,12 +7,43 @@ from eth_account.messages import encode_defunct
 from decimal import Decimal
 from hexbytes import HexBytes
 from web3.providers.rpc import HTTPProvider
+from web3.providers.async_rpc import AsyncHTTPProvider
+from web3.eth import AsyncEth
+from web3.types import RPCEndpoint, RPCResponse
 import asyncio
+import requests
+from requests.adapters import HTTPAdapter
 
 from ..evm_config import RPCConfig
+from ..rpc_pool import RPCEndpointPool
+from ..http_client import HTTPClientRegistry
 
 logger = logging.getLogger(__name__)
 
+
+class PooledAsyncHTTPProvider(AsyncHTTPProvider):
+    """使用 HTTPClientRegistry 共享会话的异步 HTTP Provider
+
+    会话在请求时按当前事件循环获取，同一个 Provider 可以在不同事件循环中复用。
+    """
+
+    def __init__(self, endpoint_uri: str, provider: str = 'alchemy'):
+        super().__init__(endpoint_uri)
+        self.provider = provider
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        session = HTTPClientRegistry.get_session(self.provider)
+        async with session.post(
+            self.endpoint_uri,
+            data=request_data,
+            headers={'Content-Type': 'application/json'}
+        ) as response:
+            response.raise_for_status()
+            raw_response = await response.read()
+        return self.decode_rpc_response(raw_response)
+
+
 class EVMUtils:
     """EVM 链通用工具类"""
     
@@ -132,9 +163,63 @@ class EVMUtils:
             raise ValueError(f"不支持的链: {chain}")
         return cls.CHAIN_CONFIG[chain]
     
+    # 各链 JSON-RPC 节点池
+    _rpc_pools: Dict[str, RPCEndpointPool] = {}
+    
+    @classmethod
+    def get_rpc_pool(cls, chain: str) -> RPCEndpointPool:
+        """获取链的 JSON-RPC 节点池（主节点 + 备用节点）
+        
+        Args:
+            chain: 链标识
+            
+        Returns:
+            RPCEndpointPool: 节点池
+        """
+        pool = cls._rpc_pools.get(chain)
+        if pool is None:
+            config = cls.get_chain_config(chain)
+            pool = RPCEndpointPool(
+                [config['rpc_url']] + RPCConfig.get_backup_rpc_urls(chain),
+                provider='alchemy'
+            )
+            cls._rpc_pools[chain] = pool
+        return pool
+    
+    @classmethod
+    async def get_balance_wei(cls, chain: str, address: str, hedge: bool = True) -> int:
+        """通过节点池查询原生代币余额（wei），默认启用对冲请求
+        
+        Args:
+            chain: 链标识
+            address: 钱包地址
+            hedge: 是否对冲
+            
+        Returns:
+            int: 余额（wei）
+        """
+        response = await cls.get_rpc_pool(chain).call(
+            'eth_getBalance',
+            [Web3.to_checksum_address(address), 'latest'],
+            hedge=hedge
+        )
+        if not response or 'result' not in response:
+            raise ValueError(f"eth_getBalance 请求失败: {response}")
+        return int(response['result'], 16)
+    
+    # 各链共享的 Web3 实例
+    _web3_instances: Dict[str, Web3] = {}
+    _async_web3_instances: Dict[str, Web3] = {}
+    
+    # 同步 Provider 的连接池大小
+    HTTP_POOL_SIZE = 50
+    
     @classmethod
     def get_web3(cls, chain: str) -> Web3:
-        """获取 Web3 实例
+        """获取同步 Web3 实例（按链缓存，复用 HTTP 连接）
+        
+        只用于合约编码、交易签名等本地操作，以及同步代码中的调用；
+        异步方法中的链上请求请使用 get_async_web3，避免阻塞事件循环。
         
         Args:
             chain: 链标识
@@ -142,8 +227,36 @@ class EVMUtils:
         Returns:
             Web3: Web3 实例
         """
-        config = cls.get_chain_config(chain)
-        web3 = Web3(Web3.HTTPProvider(config['rpc_url']))
+        web3 = cls._web3_instances.get(chain)
+        if web3 is None:
+            config = cls.get_chain_config(chain)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=cls.HTTP_POOL_SIZE, pool_maxsize=cls.HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            web3 = Web3(HTTPProvider(config['rpc_url'], session=session))
+            cls._web3_instances[chain] = web3
+        return web3
+    
+    @classmethod
+    def get_async_web3(cls, chain: str) -> Web3:
+        """获取异步 Web3 实例（按链缓存，请求走共享 aiohttp 连接池）
+        
+        Args:
+            chain: 链标识
+            
+        Returns:
+            Web3: eth 模块为 AsyncEth 的 Web3 实例
+        """
+        web3 = cls._async_web3_instances.get(chain)
+        if web3 is None:
+            config = cls.get_chain_config(chain)
+            web3 = Web3(
+                PooledAsyncHTTPProvider(config['rpc_url']),
+                modules={'eth': (AsyncEth,)},
+                middlewares=[]
+            )
+            cls._async_web3_instances[chain] = web3
         return web3
     
     @staticmethod
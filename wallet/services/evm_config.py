@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 import os
 from enum import Enum
 from dataclasses import dataclass
@@ -149,6 +149,22 @@ class RPCConfig:
     OPTIMISM_RPC_URL: str = os.getenv('OPTIMISM_RPC_URL', f'https://opt-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}')
     BASE_RPC_URL: str = os.getenv('BASE_RPC_URL', f'https://base-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}')
     
+    # 各链备用公共 RPC 节点，主节点慢或熔断时使用
+    BACKUP_RPC_URLS: Dict[str, List[str]] = {
+        'ETH': ['https://cloudflare-eth.com', 'https://rpc.ankr.com/eth'],
+        'BSC': ['https://bsc-dataseed1.defibit.io', 'https://bsc-dataseed1.ninicoin.io'],
+        'MATIC': ['https://polygon-rpc.com'],
+        'AVAX': ['https://api.avax.network/ext/bc/C/rpc'],
+        'ARBITRUM': ['https://arb1.arbitrum.io/rpc'],
+        'OPTIMISM': ['https://mainnet.optimism.io'],
+        'BASE': ['https://mainnet.base.org'],
+    }
+    
+    @classmethod
+    def get_backup_rpc_urls(cls, chain: str) -> List[str]:
+        """获取链的备用 RPC 节点"""
+        return cls.BACKUP_RPC_URLS.get('BSC' if chain == 'BNB' else chain, [])
+    
     @classmethod
     def get_rpc_endpoints(cls) -> Dict:
         """获取所有 RPC 节点配置"""
@@ -183,6 +199,7 @@ class MoralisConfig:
     
     # EVM 代币相关接口
     EVM_TOKEN_PRICE_URL: str = f"{BASE_URL}/erc20/{{0}}/price"  # 获取代币价格
+    EVM_TOKEN_PRICES_URL: str = f"{BASE_URL}/erc20/prices"  # 批量获取代币价格（POST，每次最多 25 个）
     EVM_TOKEN_PAIRS_URL: str = f"{BASE_URL}/erc20/{{0}}/pairs"  # 获取代币交易对
     EVM_TOKEN_PRICE_CHART_URL: str = f"{BASE_URL}/pairs/{{0}}/ohlcv"  # 获取代币价格历史
     EVM_TOKEN_METADATA_URL: str = f"{BASE_URL}/erc20/metadata"  # 获取代币元数据
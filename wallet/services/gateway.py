@@ -0,0 +1,279 @@
+"""上游请求网关：统一重试、退避、限流延后与并发控制"""
+import asyncio
+import json
+import logging
+import random
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+
+from .http_client import HTTPClientRegistry
+from .rate_limiter import RateLimitExceeded
+from .single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget:
+    """按时间窗口统计的重试预算
+
+    窗口内的重试次数不超过 min_retries + 请求数 * ratio，
+    上游故障时重试不会把请求量放大数倍。
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._window_start = time.monotonic()
+        self._requests = 0
+        self._retries = 0
+
+    def _roll(self) -> None:
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._requests = 0
+            self._retries = 0
+
+    def record_request(self) -> None:
+        """记录一次新请求"""
+        self._roll()
+        self._requests += 1
+
+    def try_acquire_retry(self) -> bool:
+        """尝试占用一次重试额度"""
+        self._roll()
+        if self._retries < self.min_retries + self._requests * self.ratio:
+            self._retries += 1
+            return True
+        return False
+
+
+class UpstreamGateway:
+    """上游 HTTP / RPC 请求的统一入口
+
+    - 每个服务商独立的并发信号量，一个端点的突发流量不会占满其他端点
+    - 带抖动的指数退避，重试受 RetryBudget 限制
+    - 收到 429 时记录服务商冷却时间并释放并发槽位，不在持有连接的情况下阻塞等待；
+      冷却时间过长时直接放弃请求，由调用方走降级逻辑
+    - 配置了全局限流的服务商由共享会话在发出请求前经 UpstreamRateLimiter 获取令牌
+    """
+
+    # 各服务商最大并发请求数
+    PROVIDER_CONCURRENCY: Dict[str, int] = {
+        'moralis': 20,
+        'helius': 10,
+        'alchemy': 20,
+        'solana_rpc': 20,
+        'jupiter': 10,
+        'default': 10,
+    }
+
+    MAX_ATTEMPTS = 3
+    # 退避基础时间与上限（秒）
+    BASE_DELAY = 0.5
+    MAX_DELAY = 8.0
+    # 冷却剩余时间不超过该值时等待后再发起请求，否则直接放弃
+    MAX_DEFER = 5.0
+
+    _semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]' = \
+        weakref.WeakKeyDictionary()
+    _budgets: Dict[str, RetryBudget] = {}
+    _cooldown_until: Dict[str, float] = {}
+
+    @classmethod
+    def _get_semaphore(cls, provider: str) -> asyncio.Semaphore:
+        """获取当前事件循环中服务商的并发信号量"""
+        loop = asyncio.get_running_loop()
+        semaphores = cls._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = {}
+            cls._semaphores[loop] = semaphores
+
+        semaphore = semaphores.get(provider)
+        if semaphore is None:
+            limit = cls.PROVIDER_CONCURRENCY.get(provider, cls.PROVIDER_CONCURRENCY['default'])
+            semaphore = asyncio.Semaphore(limit)
+            semaphores[provider] = semaphore
+        return semaphore
+
+    @classmethod
+    def _get_budget(cls, provider: str) -> RetryBudget:
+        budget = cls._budgets.get(provider)
+        if budget is None:
+            budget = RetryBudget()
+            cls._budgets[provider] = budget
+        return budget
+
+    @classmethod
+    def backoff_delay(cls, attempt: int, cap: Optional[float] = None) -> float:
+        """全抖动指数退避时间"""
+        upper = min(cap if cap is not None else cls.MAX_DELAY, cls.BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, upper)
+
+    @classmethod
+    def cooldown_remaining(cls, key: str) -> float:
+        """剩余的限流冷却时间（秒）"""
+        return max(0.0, cls._cooldown_until.get(key, 0.0) - time.monotonic())
+
+    @classmethod
+    def mark_rate_limited(cls, key: str, retry_after: float) -> None:
+        """记录限流冷却时间"""
+        until = time.monotonic() + retry_after
+        if until > cls._cooldown_until.get(key, 0.0):
+            cls._cooldown_until[key] = until
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str], default: float) -> float:
+        try:
+            return max(0.0, float(value)) if value is not None else default
+        except (TypeError, ValueError):
+            return default
+
+    @classmethod
+    async def _wait_for_cooldown(cls, key: str) -> bool:
+        """等待较短的冷却时间；冷却时间过长时返回 False"""
+        remaining = cls.cooldown_remaining(key)
+        if remaining <= 0:
+            return True
+        if remaining > cls.MAX_DEFER:
+            logger.warning(f"{key} 处于限流冷却中，剩余 {remaining:.1f} 秒，跳过请求")
+            return False
+        await asyncio.sleep(remaining)
+        return True
+
+    @classmethod
+    async def fetch_json(
+        cls,
+        provider: str,
+        url: str,
+        method: str = 'get',
+        session: Optional[aiohttp.ClientSession] = None,
+        max_attempts: Optional[int] = None,
+        cooldown_key: Optional[str] = None,
+        coalesce: bool = False,
+        not_found: Any = None,
+        **kwargs
+    ) -> Optional[Any]:
+        """发起 HTTP 请求并解析 JSON
+
+        Args:
+            provider: 服务商名称，决定连接池、并发限制和冷却状态
+            url: 请求地址
+            method: HTTP 方法
+            session: 指定会话，默认使用 HTTPClientRegistry 中的共享会话
+            max_attempts: 最大尝试次数
+            cooldown_key: 限流冷却的粒度，默认按服务商；同一服务商有多个节点时可按节点区分
+            coalesce: 是否合并相同的并发 GET 请求（进程内及跨 worker），适用于价格等热点查询
+            not_found: 404 时的返回值，用于区分资源不存在与请求失败
+            **kwargs: 透传给 aiohttp 的参数（headers、params、json、timeout 等）
+
+        Returns:
+            Optional[Any]: 成功时返回解析后的 JSON，404 时返回 not_found，其他失败返回 None
+        """
+        if coalesce and method.lower() == 'get':
+            params = kwargs.get('params') or {}
+            key = f"{provider}:{url}?{urlencode(sorted(params.items()))}"
+            return await SingleFlight.do(
+                key,
+                lambda: cls.fetch_json(
+                    provider, url, method, session=session, max_attempts=max_attempts,
+                    cooldown_key=cooldown_key, not_found=not_found, **kwargs
+                )
+            )
+
+        attempts = max_attempts or cls.MAX_ATTEMPTS
+        cooldown_key = cooldown_key or provider
+        budget = cls._get_budget(provider)
+        budget.record_request()
+
+        for attempt in range(attempts):
+            if attempt > 0 and not budget.try_acquire_retry():
+                logger.warning(f"{provider} 重试预算已耗尽，放弃请求: {url}")
+                return None
+            if not await cls._wait_for_cooldown(cooldown_key):
+                return None
+
+            retryable = False
+            try:
+                async with cls._get_semaphore(provider):
+                    client = session or HTTPClientRegistry.get_session(provider)
+                    async with client.request(method.upper(), url, **kwargs) as response:
+                        if response.status == 200:
+                            response_text = await response.text()
+                            try:
+                                return json.loads(response_text)
+                            except json.JSONDecodeError as e:
+                                logger.error(f"JSON解析错误: {url}, {str(e)}")
+                                return None
+
+                        if response.status == 429:
+                            retry_after = cls._parse_retry_after(
+                                response.headers.get('Retry-After'),
+                                cls.backoff_delay(attempt)
+                            )
+                            cls.mark_rate_limited(cooldown_key, retry_after)
+                            logger.warning(f"请求频率限制: {url}, {cooldown_key} 冷却 {retry_after} 秒")
+                            continue
+
+                        error_content = await response.text()
+                        if response.status >= 500:
+                            logger.warning(f"上游服务错误: {url}, 状态码: {response.status}")
+                            retryable = True
+                        else:
+                            logger.error(f"请求失败: {url}, 状态码: {response.status}")
+                            if response.status == 404:
+                                return not_found
+                            logger.error(f"错误响应内容: {error_content}")
+                            return None
+            except RateLimitExceeded as e:
+                # 全局令牌桶已排队超时，重试只会继续加剧拥塞
+                logger.warning(str(e))
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"请求出错: {url}, 错误: {str(e)}")
+                retryable = True
+
+            if retryable and attempt < attempts - 1:
+                await asyncio.sleep(cls.backoff_delay(attempt))
+
+        logger.error(f"请求最终失败: {url}")
+        return None
+
+    @classmethod
+    async def call(
+        cls,
+        provider: str,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        max_attempts: Optional[int] = None,
+        **kwargs
+    ) -> Any:
+        """在网关的并发与重试控制下调用 SDK 协程（如 AsyncClient 方法）
+
+        Raises:
+            Exception: 所有尝试失败后抛出最后一次的异常
+        """
+        attempts = max_attempts or cls.MAX_ATTEMPTS
+        budget = cls._get_budget(provider)
+        budget.record_request()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(attempts):
+            if attempt > 0:
+                if not budget.try_acquire_retry():
+                    logger.warning(f"{provider} 重试预算已耗尽")
+                    break
+                await asyncio.sleep(cls.backoff_delay(attempt - 1))
+            try:
+                async with cls._get_semaphore(provider):
+                    return await func(*args, **kwargs)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{provider} 调用失败 (第 {attempt + 1} 次): {str(e)}")
+
+        raise last_error  # type: ignore[misc]
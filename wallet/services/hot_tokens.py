@@ -0,0 +1,71 @@
+"""热门代币统计"""
+import logging
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from .redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class HotTokenTracker:
+    """按天统计每个代币出现在多少次钱包资产加载中
+
+    资产快照按钱包缓存，同一钱包短时间内只计一次，计数近似于最近持有该代币的钱包数，
+    同时反映代币的访问频率。数据存放在 Redis 有序集合中，保留 WINDOW_DAYS 天。
+    Redis 不可用时不统计。
+    """
+
+    KEY_PREFIX = 'hot_tokens'
+    WINDOW_DAYS = 2
+
+    @classmethod
+    def _bucket_keys(cls, chain: str) -> List[str]:
+        today = int(time.time() // 86400)
+        return [f"{cls.KEY_PREFIX}:{chain.upper()}:{day}" for day in range(today, today - cls.WINDOW_DAYS, -1)]
+
+    @classmethod
+    async def record(cls, chain: str, addresses: Iterable[str]) -> None:
+        """记录一次资产加载中出现的代币"""
+        addresses = {address.lower() if address.startswith('0x') else address for address in addresses if address}
+        if not addresses:
+            return
+        client = AsyncRedisClient.get_client()
+        if client is None:
+            return
+
+        key = cls._bucket_keys(chain)[0]
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for address in addresses:
+                pipeline.zincrby(key, 1, address)
+            pipeline.expire(key, cls.WINDOW_DAYS * 86400)
+            await pipeline.execute()
+        except Exception as e:
+            AsyncRedisClient.mark_unavailable(e)
+
+    @classmethod
+    async def top(cls, chain: str, limit: int) -> List[Tuple[str, float]]:
+        """最近 WINDOW_DAYS 天出现次数最多的代币
+
+        Returns:
+            List[Tuple[str, float]]: (代币地址, 出现次数)，按次数降序
+        """
+        client = AsyncRedisClient.get_client()
+        if client is None:
+            return []
+
+        scores: Dict[str, float] = {}
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key in cls._bucket_keys(chain):
+                pipeline.zrevrange(key, 0, limit - 1, withscores=True)
+            for bucket in await pipeline.execute():
+                for address, score in bucket:
+                    address = address.decode() if isinstance(address, bytes) else address
+                    scores[address] = scores.get(address, 0) + score
+        except Exception as e:
+            AsyncRedisClient.mark_unavailable(e)
+            return []
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
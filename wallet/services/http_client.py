@@ -0,0 +1,139 @@
+"""上游服务共享 HTTP 客户端注册表"""
+import asyncio
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPClientRegistry:
+    """按上游服务商划分的进程级 aiohttp 会话注册表
+
+    每个事件循环、每个服务商只维护一个 ClientSession，复用 keep-alive 连接池和 DNS 缓存，
+    避免每次请求都重新建立 TCP/TLS 连接。会话与事件循环绑定：同步包装器中临时创建的
+    事件循环会拿到各自的会话，并应在关闭循环前调用 close()。
+    """
+
+    DEFAULT_PROVIDER = 'default'
+
+    # 连接池总上限
+    CONNECTOR_LIMIT = 200
+    # DNS 缓存时间（秒）
+    DNS_CACHE_TTL = 300
+    # 空闲连接保活时间（秒）
+    KEEPALIVE_TIMEOUT = 30
+
+    DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=10)
+
+    # 各服务商连接池配置
+    PROVIDERS: Dict[str, Dict[str, Any]] = {
+        'moralis': {
+            'limit_per_host': 50,
+            'timeout': DEFAULT_TIMEOUT,
+        },
+        'helius': {
+            'limit_per_host': 30,
+            'timeout': DEFAULT_TIMEOUT,
+        },
+        'alchemy': {
+            'limit_per_host': 30,
+            'timeout': DEFAULT_TIMEOUT,
+        },
+        'solana_rpc': {
+            'limit_per_host': 30,
+            'timeout': DEFAULT_TIMEOUT,
+            'ssl': False,
+        },
+        'jupiter': {
+            'limit_per_host': 20,
+            'timeout': aiohttp.ClientTimeout(total=60, connect=20, sock_connect=20, sock_read=30),
+            'ssl': False,
+        },
+        'default': {
+            'limit_per_host': 20,
+            'timeout': DEFAULT_TIMEOUT,
+        },
+    }
+
+    _sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, aiohttp.ClientSession]]' = \
+        weakref.WeakKeyDictionary()
+    # 与事件循环绑定的其他共享资源（如 Redis 客户端）的关闭回调
+    _close_hooks: List[Callable[[], Awaitable[None]]] = []
+
+    @classmethod
+    def _create_session(cls, provider: str) -> aiohttp.ClientSession:
+        """按服务商配置创建会话"""
+        config = cls.PROVIDERS.get(provider) or cls.PROVIDERS[cls.DEFAULT_PROVIDER]
+        connector = aiohttp.TCPConnector(
+            limit=cls.CONNECTOR_LIMIT,
+            limit_per_host=config['limit_per_host'],
+            ttl_dns_cache=cls.DNS_CACHE_TTL,
+            use_dns_cache=True,
+            keepalive_timeout=cls.KEEPALIVE_TIMEOUT,
+            ssl=config.get('ssl', True)
+        )
+        # 配置了全局限流的服务商在发出请求前先获取令牌
+        from .rate_limiter import UpstreamRateLimiter
+        trace_configs = []
+        if UpstreamRateLimiter.is_limited(provider):
+            trace_configs.append(UpstreamRateLimiter.trace_config(provider))
+
+        logger.debug(f"创建共享 HTTP 会话: {provider}")
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=config['timeout'],
+            trace_configs=trace_configs or None
+        )
+
+    @classmethod
+    def get_session(cls, provider: str = DEFAULT_PROVIDER) -> aiohttp.ClientSession:
+        """获取当前事件循环中指定服务商的共享会话，必须在协程中调用"""
+        loop = asyncio.get_running_loop()
+        sessions = cls._sessions.get(loop)
+        if sessions is None:
+            sessions = {}
+            cls._sessions[loop] = sessions
+
+        session = sessions.get(provider)
+        if session is None or session.closed:
+            session = cls._create_session(provider)
+            sessions[provider] = session
+        return session
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls, provider: str = DEFAULT_PROVIDER) -> AsyncIterator[aiohttp.ClientSession]:
+        """以 async with 方式使用共享会话，退出时不关闭会话"""
+        yield cls.get_session(provider)
+
+    @classmethod
+    def add_close_hook(cls, hook: Callable[[], Awaitable[None]]) -> None:
+        """注册关闭回调，close() 时在同一事件循环中调用"""
+        if hook not in cls._close_hooks:
+            cls._close_hooks.append(hook)
+
+    @classmethod
+    async def close(cls) -> None:
+        """关闭当前事件循环中的全部共享会话及注册的共享资源"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        for hook in cls._close_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.warning(f"关闭共享资源失败: {str(e)}")
+
+        sessions = cls._sessions.pop(loop, None) or {}
+        for provider, session in sessions.items():
+            try:
+                if not session.closed:
+                    await session.close()
+            except Exception as e:
+                logger.warning(f"关闭共享 HTTP 会话失败 {provider}: {str(e)}")
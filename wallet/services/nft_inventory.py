@@ -0,0 +1,66 @@
+"""钱包 NFT 资产缓存"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .cache import BALANCE_CACHE
+
+logger = logging.getLogger(__name__)
+
+
+class NFTInventory:
+    """按 (chain, address) 缓存上游返回的钱包 NFT 列表
+
+    NFT 合集列表和合集详情都从同一份资产列表计算，短时间内的重复请求共用缓存，
+    不再重复请求 Moralis / Helius。缓存的是上游原始列表，合集的显示状态仍从数据库读取，
+    切换显示状态不需要使缓存失效。钱包转出 NFT 后调用 invalidate()。
+
+    资产列表体积较大，以 CompactCodec 编码存储。
+    """
+
+    TTL = 60
+    KEY_PREFIX = 'nft_inventory:'
+
+    @classmethod
+    def make_key(cls, chain: str, address: str) -> str:
+        """EVM 地址不区分大小写，Solana 地址区分大小写"""
+        address = address.lower() if address.startswith('0x') else address
+        return f"{cls.KEY_PREFIX}{chain.upper()}:{address}"
+
+    @classmethod
+    def invalidate(cls, chain: str, address: str) -> None:
+        """删除钱包的 NFT 资产缓存，失败时只记录日志（最多 TTL 秒后过期）"""
+        try:
+            BALANCE_CACHE.delete(cls.make_key(chain, address))
+        except Exception as e:
+            logger.warning(f"NFT 资产缓存失效失败 {chain} {address}: {str(e)}")
+
+    @classmethod
+    async def ainvalidate(cls, chain: str, address: str) -> None:
+        await BALANCE_CACHE.adelete(cls.make_key(chain, address))
+
+    @classmethod
+    async def get_or_load(
+        cls,
+        chain: str,
+        address: str,
+        loader: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """读取 NFT 资产列表，不存在时调用 loader 从上游获取
+
+        Args:
+            chain: 链标识
+            address: 钱包地址
+            loader: 无参协程函数，返回上游的 NFT 列表，失败返回 None
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: NFT 列表，上游失败时返回 None
+        """
+        key = cls.make_key(chain, address)
+        items = await BALANCE_CACHE.aget_compact(key)
+        if items is not None:
+            return items
+
+        items = await loader()
+        if items is not None:
+            await BALANCE_CACHE.aset_compact(key, items, cls.TTL)
+        return items
@@ -0,0 +1,144 @@
+"""钱包资产快照缓存"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache import BALANCE_CACHE
+from .cache_codec import CompactCodec
+from .etag import ResponseETag
+from .hot_tokens import HotTokenTracker
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioSnapshot:
+    """按 (chain, address) 缓存 get_all_token_balances 的结果
+
+    下拉刷新等短时间内的重复请求直接返回快照，不再重新查询余额和价格。
+    钱包发出交易（转账、兑换、NFT 转移）保存交易记录后、代币显示状态变化后
+    调用 invalidate() 使快照失效；客户端也可以通过 refresh 参数强制刷新。
+
+    写入快照时同时保存内容 ETag，条件请求只需读取 ETag 即可判断是否返回 304。
+    快照以 CompactCodec 编码存储。协程中使用 a 前缀的异步方法。
+    """
+
+    TTL = 30
+    KEY_PREFIX = 'portfolio:'
+    ETAG_PREFIX = 'portfolio_etag:'
+
+    @classmethod
+    def make_key(cls, chain: str, address: str, prefix: Optional[str] = None) -> str:
+        """EVM 地址不区分大小写，Solana 地址区分大小写"""
+        address = address.lower() if address.startswith('0x') else address
+        return f"{prefix or cls.KEY_PREFIX}{chain.upper()}:{address}"
+
+    @classmethod
+    def get(cls, chain: str, address: str) -> Optional[Dict[str, Any]]:
+        return BALANCE_CACHE.get_compact(cls.make_key(chain, address))
+
+    @classmethod
+    async def aget(cls, chain: str, address: str) -> Optional[Dict[str, Any]]:
+        return await BALANCE_CACHE.aget_compact(cls.make_key(chain, address))
+
+    @classmethod
+    async def aget_with_etag(cls, chain: str, address: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """一次往返读取快照及其 ETag，保证两者属于同一次写入"""
+        snapshot_key = cls.make_key(chain, address)
+        etag_key = cls.make_key(chain, address, cls.ETAG_PREFIX)
+        found = await BALANCE_CACHE.aget_many([snapshot_key, etag_key])
+        snapshot = CompactCodec.decode(found.get(snapshot_key))
+        if snapshot is None:
+            return None, None
+        return snapshot, found.get(etag_key)
+
+    @classmethod
+    def get_etag(cls, chain: str, address: str) -> Optional[str]:
+        """当前快照的内容 ETag，快照不存在时返回 None"""
+        return BALANCE_CACHE.get(cls.make_key(chain, address, cls.ETAG_PREFIX))
+
+    @classmethod
+    async def aget_etag(cls, chain: str, address: str) -> Optional[str]:
+        return await BALANCE_CACHE.aget(cls.make_key(chain, address, cls.ETAG_PREFIX))
+
+    @classmethod
+    async def aset(cls, chain: str, address: str, snapshot: Dict[str, Any]) -> str:
+        """写入快照及其内容 ETag
+
+        Returns:
+            str: 快照的 ETag
+        """
+        etag = ResponseETag.content_etag(snapshot)
+        await BALANCE_CACHE.aset_many({
+            cls.make_key(chain, address): CompactCodec.encode(snapshot),
+            cls.make_key(chain, address, cls.ETAG_PREFIX): etag
+        }, cls.TTL)
+        return etag
+
+    @classmethod
+    async def save(cls, chain: str, address: str, snapshot: Dict[str, Any]) -> Optional[str]:
+        """保存新计算的资产数据并统计热门代币，没有代币的结果可能是上游临时失败，不缓存
+
+        Returns:
+            Optional[str]: 快照的 ETag，未缓存时返回 None
+        """
+        if not snapshot or not snapshot.get('tokens'):
+            return None
+        etag = await cls.aset(chain, address, snapshot)
+        # 统计热门代币，用于缓存预热
+        await HotTokenTracker.record(
+            chain,
+            [token.get('address', '') for token in snapshot['tokens'] if not token.get('is_native')]
+        )
+        return etag
+
+    @staticmethod
+    def summarize(tokens: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """由代币列表组装资产数据：计算总价值并按价值降序排列"""
+        total_value = sum(float(token['value_usd']) for token in tokens)
+        tokens.sort(key=lambda x: float(x['value_usd']), reverse=True)
+        return {
+            'total_value_usd': str(total_value),
+            'tokens': tokens
+        }
+
+    @classmethod
+    def invalidate(cls, chain: str, address: str) -> None:
+        """删除钱包的资产快照，失败时只记录日志（快照最多 TTL 秒后过期）"""
+        try:
+            BALANCE_CACHE.delete_many([cls.make_key(chain, address), cls.make_key(chain, address, cls.ETAG_PREFIX)])
+            logger.debug(f"资产快照已失效: {chain} {address}")
+        except Exception as e:
+            logger.warning(f"资产快照失效失败 {chain} {address}: {str(e)}")
+
+    @classmethod
+    async def ainvalidate(cls, chain: str, address: str) -> None:
+        await BALANCE_CACHE.adelete_many([cls.make_key(chain, address), cls.make_key(chain, address, cls.ETAG_PREFIX)])
+
+    @classmethod
+    async def get_or_load(
+        cls,
+        chain: str,
+        address: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+        refresh: bool = False
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """读取资产快照，不存在或强制刷新时调用 loader 重新计算
+
+        ETag 与资产数据一起返回，不再单独读取，避免并发写入时 ETag 与返回内容不一致。
+
+        Args:
+            chain: 链标识
+            address: 钱包地址
+            loader: 无参协程函数，返回 get_all_token_balances 的结果
+            refresh: 是否忽略快照强制刷新
+
+        Returns:
+            Tuple[Dict[str, Any], Optional[str]]: 资产数据及其 ETag，未缓存时 ETag 为 None
+        """
+        if not refresh:
+            snapshot, etag = await cls.aget_with_etag(chain, address)
+            if snapshot is not None:
+                return snapshot, etag
+
+        snapshot = await loader()
+        etag = await cls.save(chain, address, snapshot)
+        return snapshot, etag
@@ -0,0 +1,122 @@
+"""资产数据的流式响应（NDJSON / Server-Sent Events）"""
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List
+
+from django.http import StreamingHttpResponse
+
+from .portfolio_cache import PortfolioSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioStream:
+    """把资产加载过程拆成多个帧逐个写出，客户端可以边接收边渲染
+
+    单钱包的帧顺序：
+    - ``native``：原生代币（余额为 0 时没有）
+    - ``token``：每个代币在价格解析后立即写出，顺序不固定
+    - ``totals``：总价值和代币数量，最后一帧
+    - ``error``：加载失败，代替 totals 作为最后一帧
+
+    有资产快照时直接按快照写出所有帧（totals 中 cached 为 true）；
+    实时加载完成后把结果写入快照，与普通接口共用。
+
+    传输格式：NDJSON（默认，每行一个 JSON）或 SSE（``event: 类型`` + ``data: JSON``）。
+    流式输出需要 ASGI 部署；WSGI 下 Django 会先读完整个异步迭代器再返回。
+    """
+
+    TRANSPORT_NDJSON = 'ndjson'
+    TRANSPORT_SSE = 'sse'
+    CONTENT_TYPES = {
+        TRANSPORT_NDJSON: 'application/x-ndjson',
+        TRANSPORT_SSE: 'text/event-stream',
+    }
+
+    @staticmethod
+    def token_frame(token: Dict[str, Any]) -> Dict[str, Any]:
+        return {'type': 'native' if token.get('is_native') else 'token', 'token': token}
+
+    @staticmethod
+    def totals_frame(total_value_usd: Any, token_count: int, cached: bool = False) -> Dict[str, Any]:
+        return {
+            'type': 'totals',
+            'total_value_usd': str(total_value_usd),
+            'token_count': token_count,
+            'cached': cached
+        }
+
+    @classmethod
+    async def wallet_frames(
+        cls,
+        chain: str,
+        address: str,
+        balance_service: Any,
+        refresh: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """单个钱包的资产帧
+
+        Args:
+            chain: 链标识
+            address: 钱包地址
+            balance_service: 提供 iter_token_balances() 的余额服务
+            refresh: 是否忽略资产快照强制刷新
+        """
+        snapshot = None if refresh else await PortfolioSnapshot.aget(chain, address)
+        if snapshot is not None:
+            tokens = snapshot.get('tokens', [])
+            # 快照按价值排序，原生代币放在最前面
+            for token in sorted(tokens, key=lambda token: not token.get('is_native')):
+                yield cls.token_frame(token)
+            yield cls.totals_frame(snapshot.get('total_value_usd', '0'), len(tokens), cached=True)
+            return
+
+        tokens: List[Dict[str, Any]] = []
+        balances = balance_service.iter_token_balances(address, include_hidden=False)
+        try:
+            async for token in balances:
+                tokens.append(token)
+                yield cls.token_frame(token)
+        except Exception as e:
+            logger.error(f"流式获取代币余额失败 {chain} {address}: {str(e)}")
+            yield {'type': 'error', 'message': f'获取代币余额失败: {str(e)}'}
+            return
+        finally:
+            await balances.aclose()
+
+        snapshot = PortfolioSnapshot.summarize(tokens)
+        await PortfolioSnapshot.save(chain, address, snapshot)
+        yield cls.totals_frame(snapshot['total_value_usd'], len(tokens))
+
+    @staticmethod
+    def encode_ndjson(frame: Dict[str, Any]) -> bytes:
+        return (json.dumps(frame, ensure_ascii=False, default=str) + '\n').encode()
+
+    @staticmethod
+    def encode_sse(frame: Dict[str, Any]) -> bytes:
+        data = json.dumps(frame, ensure_ascii=False, default=str)
+        return f"event: {frame.get('type', 'message')}\ndata: {data}\n\n".encode()
+
+    @classmethod
+    def get_transport(cls, request: Any) -> str:
+        """transport=sse 时使用 SSE，否则使用 NDJSON"""
+        transport = request.query_params.get('transport', '').lower()
+        return cls.TRANSPORT_SSE if transport == cls.TRANSPORT_SSE else cls.TRANSPORT_NDJSON
+
+    @classmethod
+    def response(cls, frames: AsyncIterator[Dict[str, Any]], transport: str) -> StreamingHttpResponse:
+        """把帧编码为流式 HTTP 响应"""
+        encode = cls.encode_sse if transport == cls.TRANSPORT_SSE else cls.encode_ndjson
+
+        async def body() -> AsyncIterator[bytes]:
+            try:
+                async for frame in frames:
+                    yield encode(frame)
+            finally:
+                await frames.aclose()
+
+        response = StreamingHttpResponse(body(), content_type=cls.CONTENT_TYPES[transport])
+        response['Cache-Control'] = 'no-cache'
+        # 禁止 nginx 缓冲，帧生成后立即发送
+        response['X-Accel-Buffering'] = 'no'
+        return response
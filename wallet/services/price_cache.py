@@ -0,0 +1,320 @@
+"""两级代币价格缓存（进程内 L1 + Redis L2）"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .cache import PRICE_CACHE
+
+logger = logging.getLogger(__name__)
+
+PriceFetcher = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class PriceCache:
+    """按 (chain, asset) 缓存上游返回的原始价格数据
+
+    - SOFT_TTL 内的价格直接返回
+    - 超过 SOFT_TTL 但未超过 HARD_TTL 的价格仍然立即返回，同时在后台刷新（stale-while-revalidate）
+    - 超过 HARD_TTL 或不存在时同步请求上游
+
+    L1 是进程内的 LRU，L2 是共享的 Redis（PRICE_CACHE 命名空间），L1 过期后先回查 L2，
+    其他 worker 刷新过的价格可以直接使用。L2 通过异步接口读写，不阻塞事件循环。
+
+    fetcher 的返回值分三种：
+    - 有效价格：写入缓存
+    - None：请求失败（限流、冷却、5xx、超时等），只按未命中处理，不记录负缓存，
+      缓存中过期但未超过 HARD_TTL 的价格继续返回
+    - 不含有效价格的数据（上游 200 但没有价格，或 404 时的空字典）：确认没有价格
+
+    确认没有价格的代币（空投的垃圾币、没有流动性的代币）单独做负缓存，
+    在退避时间内直接返回 None 而不请求上游；连续确认时退避时间从 NEGATIVE_BASE_TTL
+    开始翻倍，最长 NEGATIVE_MAX_TTL，取到价格后清除。
+    """
+
+    SOFT_TTL = 60
+    HARD_TTL = 600
+    L1_MAX_ENTRIES = 10000
+
+    NEGATIVE_BASE_TTL = 300
+    NEGATIVE_MAX_TTL = 6 * 3600
+    NEGATIVE_PREFIX = 'negative:'
+
+    # key -> (value, fresh_until, expires_at)
+    _l1: 'OrderedDict[str, Tuple[Dict[str, Any], float, float]]' = OrderedDict()
+    # key -> (until, failures)
+    _negative_l1: 'OrderedDict[str, Tuple[float, int]]' = OrderedDict()
+    _refreshing: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]' = \
+        weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def make_key(chain: str, asset: str) -> str:
+        """统一的价格缓存键，EVM 地址不区分大小写，Solana 地址区分大小写"""
+        asset = asset.lower() if asset.startswith('0x') else asset
+        return f"{chain.upper()}:{asset}"
+
+    @classmethod
+    async def get(cls, chain: str, asset: str, fetcher: PriceFetcher) -> Optional[Dict[str, Any]]:
+        """获取价格，缓存未命中时调用 fetcher
+
+        Args:
+            chain: 链标识
+            asset: 代币地址
+            fetcher: 无参协程函数，返回上游原始价格数据，请求失败返回 None，上游确认没有价格时返回空字典
+
+        Returns:
+            Optional[Dict[str, Any]]: 价格数据
+        """
+        key = cls.make_key(chain, asset)
+        entry = await cls._lookup(key)
+        if entry is not None:
+            value, fresh_until = entry
+            if time.time() >= fresh_until:
+                cls._refresh_in_background(key, fetcher)
+            return value
+        if await cls._is_negative(key):
+            return None
+        return await cls._fetch(key, fetcher)
+
+    @classmethod
+    async def get_many(
+        cls,
+        chain: str,
+        assets: Iterable[str],
+        fetcher_factory: Optional[Callable[[str], PriceFetcher]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量读取缓存，L1 未命中的键一次从 L2 读取
+
+        Args:
+            chain: 链标识
+            assets: 代币地址列表
+            fetcher_factory: 根据代币地址生成 fetcher，用于后台刷新过期价格，为空时不刷新
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 命中的代币地址到价格数据的映射，未命中的地址不在结果中
+        """
+        now = time.time()
+        keys = {cls.make_key(chain, asset): asset for asset in assets}
+        entries: Dict[str, Tuple[Dict[str, Any], float]] = {}
+
+        missing = []
+        for key in keys:
+            entry = cls._get_l1(key, now)
+            if entry is not None and now < entry[1]:
+                entries[key] = entry
+            else:
+                missing.append(key)
+
+        if missing:
+            # 价格和负缓存一次读取
+            negative_keys = {cls.NEGATIVE_PREFIX + key: key for key in missing}
+            stored_entries = await PRICE_CACHE.aget_many(missing + list(negative_keys))
+            for full_key, stored in stored_entries.items():
+                if full_key in negative_keys:
+                    cls._set_negative_l1(negative_keys[full_key], stored)
+                    continue
+                entry = cls._from_stored(stored)
+                if entry is not None:
+                    cls._set_l1(full_key, entry[0], entry[1], stored['expires_at'])
+                    entries[full_key] = entry
+            # L2 中也没有的，再看 L1 中是否还有过期但可用的数据
+            for key in missing:
+                if key not in entries:
+                    entry = cls._get_l1(key, now)
+                    if entry is not None:
+                        entries[key] = entry
+
+        result = {}
+        for key, (value, fresh_until) in entries.items():
+            asset = keys[key]
+            if now >= fresh_until and fetcher_factory is not None:
+                cls._refresh_in_background(key, fetcher_factory(asset))
+            result[asset] = value
+        return result
+
+    @classmethod
+    def is_backing_off(cls, chain: str, asset: str) -> bool:
+        """代币是否处于负缓存退避期（只检查进程内，需先调用 get_many）"""
+        entry = cls._negative_l1.get(cls.make_key(chain, asset))
+        return entry is not None and time.time() < entry[0]
+
+    @classmethod
+    async def store_results(cls, chain: str, results: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """写入批量请求的结果，有价格的一次写入，确认没有价格的记录负缓存，请求失败（None）的跳过"""
+        priced = {asset: value for asset, value in results.items() if cls.has_price(value)}
+        await cls.set_many(chain, priced)
+        await cls._clear_negative_many([cls.make_key(chain, asset) for asset in priced])
+        await cls._record_negative_many([
+            cls.make_key(chain, asset) for asset, value in results.items() if cls.is_no_price(value)
+        ])
+
+    @classmethod
+    async def set(cls, chain: str, asset: str, value: Dict[str, Any]) -> None:
+        await cls.set_many(chain, {asset: value})
+
+    @classmethod
+    async def set_many(cls, chain: str, values: Dict[str, Dict[str, Any]]) -> None:
+        """批量写入价格，L2 一次写入"""
+        if not values:
+            return
+        now = time.time()
+        stored = {}
+        for asset, value in values.items():
+            key = cls.make_key(chain, asset)
+            fresh_until = now + cls.SOFT_TTL
+            expires_at = now + cls.HARD_TTL
+            cls._set_l1(key, value, fresh_until, expires_at)
+            stored[key] = {'value': value, 'fresh_until': fresh_until, 'expires_at': expires_at}
+        await PRICE_CACHE.aset_many(stored, cls.HARD_TTL)
+
+    @classmethod
+    async def _lookup(cls, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """依次查找 L1、L2，返回 (value, fresh_until)"""
+        now = time.time()
+        entry = cls._get_l1(key, now)
+        if entry is not None and now < entry[1]:
+            return entry
+
+        # L1 不存在或已过期，回查 L2，其他 worker 可能已经刷新
+        stored = await PRICE_CACHE.aget(key)
+        l2_entry = cls._from_stored(stored)
+        if l2_entry is not None:
+            cls._set_l1(key, l2_entry[0], l2_entry[1], stored['expires_at'])
+            return l2_entry
+        return entry
+
+    @classmethod
+    async def _fetch(cls, key: str, fetcher: PriceFetcher) -> Optional[Dict[str, Any]]:
+        value = await fetcher()
+        if cls.has_price(value):
+            chain, asset = key.split(':', 1)
+            await cls.set(chain, asset, value)
+            await cls._clear_negative_many([key])
+        elif cls.is_no_price(value):
+            await cls._record_negative(key)
+        return value or None
+
+    @staticmethod
+    def has_price(value: Any) -> bool:
+        """上游返回的数据中是否有有效价格"""
+        if not isinstance(value, dict):
+            return False
+        try:
+            return float(value.get('usdPrice') or 0) > 0
+        except (TypeError, ValueError):
+            return False
+
+    @classmethod
+    def is_no_price(cls, value: Any) -> bool:
+        """上游是否确认没有价格（请求失败返回的 None 不算）"""
+        return value is not None and not cls.has_price(value)
+
+    @classmethod
+    async def _is_negative(cls, key: str) -> bool:
+        """代币是否处于负缓存的退避时间内"""
+        now = time.time()
+        entry = cls._negative_l1.get(key)
+        if entry is not None:
+            return now < entry[0]
+        stored = await PRICE_CACHE.aget(cls.NEGATIVE_PREFIX + key)
+        if stored is None:
+            return False
+        cls._set_negative_l1(key, stored)
+        return now < stored.get('until', 0)
+
+    @classmethod
+    async def _record_negative(cls, key: str) -> None:
+        await cls._record_negative_many([key])
+
+    @classmethod
+    async def _record_negative_many(cls, keys: List[str]) -> None:
+        """记录确认无价格，退避时间按连续次数翻倍；L2 一次读取、按退避时间分组写入"""
+        if not keys:
+            return
+        failures = {key: cls._negative_l1[key][1] for key in keys if key in cls._negative_l1}
+        unknown = [cls.NEGATIVE_PREFIX + key for key in keys if key not in failures]
+        if unknown:
+            found = await PRICE_CACHE.aget_many(unknown)
+            for key in keys:
+                if key not in failures:
+                    stored = found.get(cls.NEGATIVE_PREFIX + key)
+                    failures[key] = stored.get('failures', 0) if isinstance(stored, dict) else 0
+
+        now = time.time()
+        by_ttl: Dict[int, Dict[str, Any]] = {}
+        for key in keys:
+            count = failures[key] + 1
+            ttl = min(cls.NEGATIVE_BASE_TTL * 2 ** (count - 1), cls.NEGATIVE_MAX_TTL)
+            stored = {'until': now + ttl, 'failures': count}
+            cls._set_negative_l1(key, stored)
+            by_ttl.setdefault(ttl, {})[cls.NEGATIVE_PREFIX + key] = stored
+            logger.debug(f"代币无价格 {key}，{ttl} 秒内不再请求（连续 {count} 次）")
+
+        # 失败次数保留到退避结束后一段时间，再次失败时继续翻倍
+        for ttl, stored in by_ttl.items():
+            await PRICE_CACHE.aset_many(stored, int(ttl + cls.NEGATIVE_MAX_TTL))
+
+    @classmethod
+    async def _clear_negative_many(cls, keys: List[str]) -> None:
+        """清除负缓存，L2 总是删除（可能是其他 worker 记录的）"""
+        for key in keys:
+            cls._negative_l1.pop(key, None)
+        await PRICE_CACHE.adelete_many([cls.NEGATIVE_PREFIX + key for key in keys])
+
+    @classmethod
+    def _set_negative_l1(cls, key: str, stored: Any) -> None:
+        if not isinstance(stored, dict):
+            return
+        cls._negative_l1[key] = (stored.get('until', 0), stored.get('failures', 0))
+        cls._negative_l1.move_to_end(key)
+        while len(cls._negative_l1) > cls.L1_MAX_ENTRIES:
+            cls._negative_l1.popitem(last=False)
+
+    @classmethod
+    def _refresh_in_background(cls, key: str, fetcher: PriceFetcher) -> None:
+        loop = asyncio.get_running_loop()
+        refreshing = cls._refreshing.get(loop)
+        if refreshing is None:
+            refreshing = {}
+            cls._refreshing[loop] = refreshing
+        if key in refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await cls._fetch(key, fetcher)
+            except Exception as e:
+                logger.warning(f"后台刷新价格失败 {key}: {str(e)}")
+            finally:
+                refreshing.pop(key, None)
+
+        refreshing[key] = loop.create_task(refresh())
+
+    @staticmethod
+    def _from_stored(stored: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        if not isinstance(stored, dict) or 'value' not in stored:
+            return None
+        if time.time() >= stored.get('expires_at', 0):
+            return None
+        return stored['value'], stored.get('fresh_until', 0)
+
+    @classmethod
+    def _get_l1(cls, key: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = cls._l1.get(key)
+        if entry is None:
+            return None
+        value, fresh_until, expires_at = entry
+        if now >= expires_at:
+            cls._l1.pop(key, None)
+            return None
+        cls._l1.move_to_end(key)
+        return value, fresh_until
+
+    @classmethod
+    def _set_l1(cls, key: str, value: Dict[str, Any], fresh_until: float, expires_at: float) -> None:
+        cls._l1[key] = (value, fresh_until, expires_at)
+        cls._l1.move_to_end(key)
+        while len(cls._l1) > cls.L1_MAX_ENTRIES:
+            cls._l1.popitem(last=False)
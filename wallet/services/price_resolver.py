@@ -0,0 +1,282 @@
+"""批量代币价格解析"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .evm_config import MoralisConfig as EVMMoralisConfig
+from .gateway import UpstreamGateway
+from .price_cache import PriceCache, PriceFetcher
+from .solana_config import JupiterConfig, MoralisConfig as SolanaMoralisConfig
+
+logger = logging.getLogger(__name__)
+
+
+class PriceResolver:
+    """一次解析一个钱包所有代币的价格
+
+    先通过 PriceCache.get_many 一次读取缓存（含负缓存），只对未命中的地址请求上游：
+    - EVM：Moralis POST /erc20/prices，每批 EVM_BATCH_SIZE 个，批次之间并发
+    - Solana：Moralis 单个价格接口有限并发请求（保留 24 小时涨跌幅），
+      Moralis 没有价格的代币再通过 Jupiter ids= 批量接口补充
+
+    请求失败的代币结果为 None，只按未命中处理；上游成功返回但没有价格的代币结果为空字典，
+    由 PriceCache.store_results 记录负缓存。
+
+    返回值与 PriceCache 中保存的数据格式一致（Moralis 原始价格数据），
+    由各服务自行格式化。resolve_iter() 按到达顺序分批产出价格，用于流式响应。
+    """
+
+    CHAIN_SOLANA = 'SOL'
+    EVM_BATCH_SIZE = 25
+    MAX_CONCURRENCY = 8
+
+    @classmethod
+    async def resolve(
+        cls,
+        chain: str,
+        addresses: List[str],
+        fetcher_factory: Optional[Callable[[str], PriceFetcher]] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """批量获取价格
+
+        Args:
+            chain: 链标识
+            addresses: 代币地址列表
+            fetcher_factory: 生成单个代币 fetcher，用于后台刷新过期价格
+
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: 代币地址到原始价格数据的映射，没有价格时为 None
+        """
+        result: Dict[str, Optional[Dict[str, Any]]] = {}
+        async for prices in cls.resolve_iter(chain, addresses, fetcher_factory=fetcher_factory):
+            result.update(prices)
+        return result
+
+    @classmethod
+    async def resolve_iter(
+        cls,
+        chain: str,
+        addresses: List[str],
+        fetcher_factory: Optional[Callable[[str], PriceFetcher]] = None
+    ) -> AsyncIterator[Dict[str, Optional[Dict[str, Any]]]]:
+        """分批产出价格：先产出缓存命中（及退避期内）的代币，之后每完成一次上游请求产出一批
+
+        参数与 resolve() 相同，所有批次合并后与 resolve() 的结果一致。
+        """
+        addresses = list(dict.fromkeys(addresses))
+        cached: Dict[str, Optional[Dict[str, Any]]] = dict(
+            await PriceCache.get_many(chain, addresses, fetcher_factory=fetcher_factory)
+        )
+
+        missing = []
+        for address in addresses:
+            if address in cached:
+                continue
+            if PriceCache.is_backing_off(chain, address):
+                cached[address] = None
+            else:
+                missing.append(address)
+
+        if cached:
+            yield cached
+        if missing:
+            fetching = cls._iter_fetch_and_store(chain, missing)
+            try:
+                async for prices in fetching:
+                    yield prices
+            finally:
+                await fetching.aclose()
+
+    @classmethod
+    async def refresh(cls, chain: str, addresses: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """忽略已缓存的价格，直接从上游批量获取并写入缓存（用于缓存预热），
+        处于负缓存退避期的代币仍然跳过"""
+        addresses = list(dict.fromkeys(addresses))
+        # 读取一次缓存，加载负缓存状态
+        await PriceCache.get_many(chain, addresses)
+        addresses = [address for address in addresses if not PriceCache.is_backing_off(chain, address)]
+        if not addresses:
+            return {}
+        return await cls._fetch_and_store(chain, addresses)
+
+    @classmethod
+    async def _fetch_and_store(cls, chain: str, addresses: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        fetched: Dict[str, Optional[Dict[str, Any]]] = {}
+        async for prices in cls._iter_fetch_and_store(chain, addresses):
+            fetched.update(prices)
+        return fetched
+
+    @classmethod
+    async def _iter_fetch_and_store(
+        cls,
+        chain: str,
+        addresses: List[str]
+    ) -> AsyncIterator[Dict[str, Optional[Dict[str, Any]]]]:
+        """从上游获取价格并分批产出，请求失败的代币为 None
+
+        结果在迭代结束时一次写入缓存；调用方提前停止迭代时只写入已获取的价格。
+        """
+        remaining = dict.fromkeys(addresses)
+        fetched: Dict[str, Optional[Dict[str, Any]]] = {}
+        chunks = cls._iter_solana(addresses) if chain == cls.CHAIN_SOLANA else cls._iter_evm(chain, addresses)
+        try:
+            try:
+                async for chunk in chunks:
+                    prices = {address: chunk[address] for address in chunk if address in remaining}
+                    for address in prices:
+                        del remaining[address]
+                    if prices:
+                        fetched.update(prices)
+                        yield prices
+            except Exception as e:
+                logger.error(f"批量获取 {chain} 代币价格失败: {str(e)}")
+
+            if remaining:
+                prices = dict.fromkeys(remaining)
+                fetched.update(prices)
+                yield prices
+        finally:
+            await chunks.aclose()
+            await PriceCache.store_results(chain, fetched)
+
+    @classmethod
+    async def _iter_evm(cls, chain: str, addresses: List[str]) -> AsyncIterator[Dict[str, Optional[Dict[str, Any]]]]:
+        """通过 Moralis 批量价格接口获取 EVM 代币价格，每完成一批产出一次"""
+        params = {
+            'chain': EVMMoralisConfig.get_chain_id(chain),
+            'include': 'percent_change'
+        }
+        batches = [
+            addresses[i:i + cls.EVM_BATCH_SIZE]
+            for i in range(0, len(addresses), cls.EVM_BATCH_SIZE)
+        ]
+        by_address = {address.lower(): address for address in addresses}
+        requests = [
+            (batch, UpstreamGateway.fetch_json(
+                'moralis',
+                EVMMoralisConfig.EVM_TOKEN_PRICES_URL,
+                method='post',
+                headers=EVMMoralisConfig.get_headers(),
+                params=params,
+                json={'tokens': [{'token_address': address} for address in batch]}
+            ))
+            for batch in batches
+        ]
+        responses = cls._iter_bounded(requests)
+        try:
+            async for batch, response in responses:
+                if not isinstance(response, list):
+                    # 请求失败，按未命中处理
+                    yield dict.fromkeys(batch)
+                    continue
+                # 上游成功返回但没有包含的代币确认没有价格
+                result: Dict[str, Optional[Dict[str, Any]]] = {address: {} for address in batch}
+                for item in response:
+                    if not isinstance(item, dict):
+                        continue
+                    address = by_address.get(str(item.get('tokenAddress', '')).lower())
+                    if address:
+                        result[address] = item
+                yield result
+        finally:
+            await responses.aclose()
+
+    @classmethod
+    async def _iter_solana(cls, addresses: List[str]) -> AsyncIterator[Dict[str, Optional[Dict[str, Any]]]]:
+        """Moralis 逐个获取，有价格的立即产出；没有价格的最后通过 Jupiter 批量补充"""
+        headers = {
+            "accept": "application/json",
+            "X-API-Key": SolanaMoralisConfig.API_KEY
+        }
+        requests = [
+            (address, UpstreamGateway.fetch_json(
+                'moralis',
+                SolanaMoralisConfig.SOLANA_TOKEN_PRICE_URL.format(address),
+                headers=headers,
+                params={'network': 'mainnet'},
+                coalesce=True,
+                not_found={}
+            ))
+            for address in addresses
+        ]
+        unpriced: Dict[str, Optional[Dict[str, Any]]] = {}
+        responses = cls._iter_bounded(requests)
+        try:
+            async for address, response in responses:
+                if PriceCache.has_price(response):
+                    yield {address: response}
+                else:
+                    unpriced[address] = response
+        finally:
+            await responses.aclose()
+
+        if unpriced:
+            jupiter = await cls._fetch_jupiter(list(unpriced))
+            # Moralis 请求失败（None）且 Jupiter 也没有价格时仍按未命中处理
+            yield {address: jupiter.get(address, response) for address, response in unpriced.items()}
+
+    @classmethod
+    async def _fetch_jupiter(cls, addresses: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Jupiter 批量价格接口，转换为与 Moralis 一致的 usdPrice 字段，请求失败的批次中的代币为 None"""
+        batches = [
+            addresses[i:i + JupiterConfig.PRICE_BATCH_SIZE]
+            for i in range(0, len(addresses), JupiterConfig.PRICE_BATCH_SIZE)
+        ]
+        responses = await cls._gather_bounded([
+            UpstreamGateway.fetch_json('jupiter', JupiterConfig.PRICE_URL, params={'ids': ','.join(batch)})
+            for batch in batches
+        ])
+
+        result: Dict[str, Optional[Dict[str, Any]]] = {}
+        for batch, response in zip(batches, responses):
+            data = response.get('data') if isinstance(response, dict) else None
+            if not isinstance(data, dict):
+                result.update(dict.fromkeys(batch))
+                continue
+            for address, item in data.items():
+                if not isinstance(item, dict) or item.get('price') is None:
+                    continue
+                try:
+                    price = float(item['price'])
+                except (TypeError, ValueError):
+                    continue
+                # Jupiter 不提供 24 小时涨跌幅
+                result[address] = {'tokenAddress': address, 'usdPrice': price, 'source': 'jupiter'}
+        return result
+
+    @classmethod
+    async def _gather_bounded(cls, coroutines: List[Any]) -> List[Any]:
+        """限制并发数执行，单个失败返回 None"""
+        semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+
+        async def run(coroutine):
+            async with semaphore:
+                try:
+                    return await coroutine
+                except Exception as e:
+                    logger.warning(f"获取价格失败: {str(e)}")
+                    return None
+
+        return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+    @classmethod
+    async def _iter_bounded(cls, requests: List[Tuple[Any, Awaitable[Any]]]) -> AsyncIterator[Tuple[Any, Any]]:
+        """限制并发数执行，按完成顺序产出 (key, 结果)，单个失败的结果为 None"""
+        semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+
+        async def run(key, coroutine):
+            async with semaphore:
+                try:
+                    return key, await coroutine
+                except Exception as e:
+                    logger.warning(f"获取价格失败: {str(e)}")
+                    return key, None
+
+        tasks = [asyncio.ensure_future(run(key, coroutine)) for key, coroutine in requests]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 调用方提前停止迭代时取消未完成的请求
+            for task in tasks:
+                task.cancel()
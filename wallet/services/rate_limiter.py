@@ -0,0 +1,115 @@
+"""基于 Redis 令牌桶的跨进程上游限流"""
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+from django.conf import settings
+
+from .redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(aiohttp.ClientError):
+    """在允许的排队时间内未能获取到令牌"""
+
+
+class UpstreamRateLimiter:
+    """所有 Web / Celery 进程共享同一个 API Key 的令牌桶
+
+    令牌桶状态保存在 Redis 中，由 Lua 脚本原子地补充和扣减，时间取自 Redis 服务器，
+    避免多台机器时钟不一致。令牌不足时按脚本返回的等待时间排队，超过 max_wait 则放弃，
+    在请求发出前就控制节奏，而不是等到收到 429 才退避。
+    Redis 不可用时直接放行，由 UpstreamGateway 的 429 处理兜底。
+    """
+
+    KEY_PREFIX = 'ratelimit:bucket:'
+    DEFAULT_MAX_WAIT = 10.0
+
+    # 返回需要等待的秒数，0 表示已获取到令牌
+    TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', key, math.ceil(capacity / rate) * 2 + 1)
+return tostring(wait)
+"""
+
+    @classmethod
+    def get_limit(cls, provider: str) -> Optional[Dict[str, Any]]:
+        """获取服务商的限流配置，未配置时返回 None"""
+        return getattr(settings, 'UPSTREAM_RATE_LIMITS', {}).get(provider)
+
+    @classmethod
+    def is_limited(cls, provider: str) -> bool:
+        return cls.get_limit(provider) is not None
+
+    @classmethod
+    async def acquire(cls, provider: str, tokens: int = 1) -> bool:
+        """获取令牌
+
+        Returns:
+            bool: 获取成功（或未配置限流、Redis 不可用）返回 True，排队超时返回 False
+        """
+        limit = cls.get_limit(provider)
+        if not limit:
+            return True
+
+        rate = float(limit['rate'])
+        capacity = float(limit['capacity'])
+        deadline = time.monotonic() + float(limit.get('max_wait', cls.DEFAULT_MAX_WAIT))
+        key = f"{cls.KEY_PREFIX}{provider}"
+
+        while True:
+            client = AsyncRedisClient.get_client()
+            if client is None:
+                return True
+            try:
+                wait = float(await client.eval(cls.TOKEN_BUCKET_SCRIPT, 1, key, rate, capacity, tokens))
+            except Exception as e:
+                AsyncRedisClient.mark_unavailable(e)
+                return True
+
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                logger.warning(f"{provider} 令牌不足，排队超时")
+                return False
+            await asyncio.sleep(wait)
+
+    @classmethod
+    def trace_config(cls, provider: str) -> aiohttp.TraceConfig:
+        """为共享会话生成请求前获取令牌的 TraceConfig"""
+
+        async def on_request_start(
+            session: aiohttp.ClientSession,
+            trace_config_ctx: SimpleNamespace,
+            params: aiohttp.TraceRequestStartParams
+        ) -> None:
+            if not await cls.acquire(provider):
+                raise RateLimitExceeded(f"{provider} 请求频率超出全局限制: {params.url}")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        return trace_config
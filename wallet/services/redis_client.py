@@ -0,0 +1,65 @@
+"""与事件循环绑定的共享异步 Redis 客户端"""
+import asyncio
+import logging
+import time
+import weakref
+from typing import Optional
+
+from django.conf import settings
+from redis import asyncio as aioredis
+
+from .http_client import HTTPClientRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRedisClient:
+    """按事件循环缓存的 redis.asyncio 客户端
+
+    Redis 不可用时在 UNAVAILABLE_BACKOFF 秒内直接返回 None，调用方按无 Redis 的方式降级，
+    避免每个请求都等待连接超时。
+    """
+
+    SOCKET_TIMEOUT = 0.5
+    UNAVAILABLE_BACKOFF = 30.0
+
+    _clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]' = weakref.WeakKeyDictionary()
+    _unavailable_until = 0.0
+
+    @classmethod
+    def get_client(cls) -> Optional[aioredis.Redis]:
+        """获取当前事件循环中的 Redis 客户端，Redis 暂不可用时返回 None"""
+        if time.monotonic() < cls._unavailable_until:
+            return None
+
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None:
+            client = aioredis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=cls.SOCKET_TIMEOUT,
+                socket_connect_timeout=cls.SOCKET_TIMEOUT
+            )
+            cls._clients[loop] = client
+        return client
+
+    @classmethod
+    def mark_unavailable(cls, error: Exception) -> None:
+        """记录 Redis 故障，在退避时间内不再尝试"""
+        if time.monotonic() >= cls._unavailable_until:
+            logger.warning(f"Redis 不可用，{cls.UNAVAILABLE_BACKOFF:.0f} 秒内跳过: {str(error)}")
+        cls._unavailable_until = time.monotonic() + cls.UNAVAILABLE_BACKOFF
+
+    @classmethod
+    async def close(cls) -> None:
+        """关闭当前事件循环中的 Redis 客户端"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = cls._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+HTTPClientRegistry.add_close_hook(AsyncRedisClient.close)
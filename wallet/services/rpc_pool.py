@@ -0,0 +1,402 @@
+"""JSON-RPC 节点池：按健康度与延迟路由，故障节点熔断，幂等读请求可对冲"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from .gateway import UpstreamGateway
+
+logger = logging.getLogger(__name__)
+
+
+class RPCEndpoint:
+    """单个 RPC 节点的健康状态
+
+    记录延迟和错误率的指数加权移动平均（EWMA），连续失败达到阈值后熔断，
+    熔断期结束后进入半开状态，只放行一个探测请求，成功则恢复，失败则加倍熔断时间。
+    """
+
+    EWMA_ALPHA = 0.2
+    # 尚无延迟样本时的默认延迟（秒）
+    DEFAULT_LATENCY = 1.0
+    FAILURE_THRESHOLD = 3
+    OPEN_SECONDS = 30.0
+    MAX_OPEN_SECONDS = 300.0
+    SAMPLE_SIZE = 100
+    # 对冲延迟：样本不足时使用默认值，并限制在上下限之间（秒）
+    MIN_HEDGE_SAMPLES = 20
+    DEFAULT_HEDGE_DELAY = 1.0
+    MIN_HEDGE_DELAY = 0.05
+    MAX_HEDGE_DELAY = 3.0
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.consecutive_failures = 0
+        self.open_seconds = self.OPEN_SECONDS
+        self.opened_until = 0.0
+        self.probing = False
+        self.latencies: Deque[float] = deque(maxlen=self.SAMPLE_SIZE)
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_until > 0
+
+    def is_available(self, now: Optional[float] = None) -> bool:
+        """节点当前是否可以接收请求"""
+        if not self.is_open:
+            return True
+        now = now if now is not None else time.monotonic()
+        # 熔断期已过，半开状态下只放行一个探测请求
+        return now >= self.opened_until and not self.probing
+
+    def score(self) -> float:
+        """路由评分，越小越优先"""
+        latency = self.latency_ewma if self.latency_ewma is not None else self.DEFAULT_LATENCY
+        return latency * (1 + 4 * self.error_ewma)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """最近请求延迟的分位数，样本不足时返回 None"""
+        if len(self.latencies) < self.MIN_HEDGE_SAMPLES:
+            return None
+        samples = sorted(self.latencies)
+        index = min(len(samples) - 1, int(len(samples) * percentile))
+        return samples[index]
+
+    def hedge_delay(self) -> float:
+        """发出对冲请求前的等待时间，取该节点的 p95 延迟"""
+        p95 = self.latency_percentile(0.95)
+        if p95 is None:
+            return self.DEFAULT_HEDGE_DELAY
+        return max(self.MIN_HEDGE_DELAY, min(self.MAX_HEDGE_DELAY, p95))
+
+    def on_request_start(self) -> None:
+        if self.is_open:
+            self.probing = True
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = self.EWMA_ALPHA * latency + (1 - self.EWMA_ALPHA) * self.latency_ewma
+        self.error_ewma = (1 - self.EWMA_ALPHA) * self.error_ewma
+        self.consecutive_failures = 0
+        if self.is_open:
+            logger.info(f"RPC节点恢复: {self.url}")
+        self.opened_until = 0.0
+        self.open_seconds = self.OPEN_SECONDS
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.error_ewma = self.EWMA_ALPHA + (1 - self.EWMA_ALPHA) * self.error_ewma
+        self.consecutive_failures += 1
+
+        if self.is_open and self.probing:
+            # 半开探测失败，延长熔断时间
+            self.open_seconds = min(self.open_seconds * 2, self.MAX_OPEN_SECONDS)
+            self.opened_until = time.monotonic() + self.open_seconds
+            logger.warning(f"RPC节点探测失败，继续熔断 {self.open_seconds:.0f} 秒: {self.url}")
+        elif not self.is_open and self.consecutive_failures >= self.FAILURE_THRESHOLD:
+            self.opened_until = time.monotonic() + self.open_seconds
+            logger.warning(f"RPC节点连续失败 {self.consecutive_failures} 次，熔断 {self.open_seconds:.0f} 秒: {self.url}")
+        self.probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """节点状态快照，用于健康检查输出"""
+        return {
+            'url': self.url,
+            'latency_ewma': self.latency_ewma,
+            'latency_p95': self.latency_percentile(0.95),
+            'error_rate': round(self.error_ewma, 4),
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open': self.is_open,
+        }
+
+
+class RPCEndpointPool:
+    """JSON-RPC 节点池（Solana 与 EVM 通用）
+
+    节点健康状态按 URL 在进程内共享，所有服务实例看到的是同一份统计。
+    """
+
+    # 允许对冲的幂等只读方法，发送交易等写操作永远不会被重复发送
+    HEDGEABLE_METHODS = frozenset({
+        'getBalance',
+        'getAccountInfo',
+        'getSignatureStatuses',
+        'getTokenAccountBalance',
+        'eth_getBalance',
+        'eth_call',
+        'eth_blockNumber',
+    })
+
+    _endpoints: Dict[str, RPCEndpoint] = {}
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        headers: Optional[Dict[str, str]] = None,
+        provider: str = 'solana_rpc'
+    ):
+        # 去重并保持配置顺序，顺序作为评分相同时的优先级
+        self.urls = [url for url in dict.fromkeys(urls) if url]
+        self.headers = headers or {}
+        self.provider = provider
+
+    @classmethod
+    def get_endpoint(cls, url: str) -> RPCEndpoint:
+        endpoint = cls._endpoints.get(url)
+        if endpoint is None:
+            endpoint = RPCEndpoint(url)
+            cls._endpoints[url] = endpoint
+        return endpoint
+
+    @property
+    def endpoints(self) -> List[RPCEndpoint]:
+        return [self.get_endpoint(url) for url in self.urls]
+
+    def ranked_endpoints(self) -> List[RPCEndpoint]:
+        """按健康度排序的可用节点；全部熔断时返回最早恢复的节点用于探测"""
+        now = time.monotonic()
+        endpoints = self.endpoints
+        available = [endpoint for endpoint in endpoints if endpoint.is_available(now)]
+        if not available:
+            return [min(endpoints, key=lambda endpoint: endpoint.opened_until)]
+        order = {endpoint.url: index for index, endpoint in enumerate(endpoints)}
+        return sorted(available, key=lambda endpoint: (endpoint.score(), order[endpoint.url]))
+
+    async def post(self, endpoint: RPCEndpoint, payload: Any, timeout: Optional[float] = None) -> Optional[Any]:
+        """向指定节点发送 JSON-RPC 请求并记录健康状态
+
+        返回 JSON-RPC 响应体（包含 result 或 error），网络错误、HTTP 错误或限流时返回 None。
+        """
+        kwargs: Dict[str, Any] = {'json': payload, 'headers': self.headers}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+
+        endpoint.on_request_start()
+        started = time.monotonic()
+        try:
+            response = await UpstreamGateway.fetch_json(
+                self.provider,
+                endpoint.url,
+                'post',
+                max_attempts=1,
+                cooldown_key=endpoint.url,
+                **kwargs
+            )
+        except BaseException:
+            endpoint.probing = False
+            raise
+        if response is None:
+            endpoint.record_failure()
+        else:
+            endpoint.record_success(time.monotonic() - started)
+        return response
+
+    async def _hedged_post(
+        self,
+        primary: RPCEndpoint,
+        secondary: RPCEndpoint,
+        payload: Any,
+        timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        """对冲请求：主节点超过其 p95 延迟仍未返回时，向第二个节点发出相同请求，取先返回的结果"""
+        tasks = [asyncio.ensure_future(self.post(primary, payload, timeout))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=primary.hedge_delay())
+            if done and not tasks[0].cancelled() and tasks[0].exception() is None and tasks[0].result() is not None:
+                return tasks[0].result()
+
+            logger.debug(f"RPC节点 {primary.url} 响应慢，对冲请求 {secondary.url}")
+            tasks.append(asyncio.ensure_future(self.post(secondary, payload, timeout)))
+            pending = {task for task in tasks if not task.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and task.result() is not None:
+                        return task.result()
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def call(
+        self,
+        method: str,
+        params: Optional[List[Any]] = None,
+        hedge: bool = False,
+        timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        """按健康度依次请求各节点，返回第一个成功的 JSON-RPC 响应体
+
+        Args:
+            method: RPC 方法名
+            params: RPC 参数
+            hedge: 是否对冲，仅对 HEDGEABLE_METHODS 中的方法生效
+            timeout: 单个节点的超时时间（秒）
+
+        Returns:
+            Optional[Any]: JSON-RPC 响应体（包含 result 或 error），所有节点失败时返回 None
+        """
+        payload = {
+            "jsonrpc": "2.0",
+            "id": int(time.time() * 1000),
+            "method": method,
+            "params": params or []
+        }
+        return await self.send(payload, hedge=hedge and method in self.HEDGEABLE_METHODS, timeout=timeout)
+
+    async def send(self, payload: Any, hedge: bool = False, timeout: Optional[float] = None) -> Optional[Any]:
+        """按健康度依次向各节点发送请求体（单个请求或批量数组），返回第一个成功的响应"""
+        endpoints = self.ranked_endpoints()
+        # 只有一个可用节点时不对冲，避免向已经变慢的节点重复发送请求
+        if hedge and len(endpoints) >= 2:
+            response = await self._hedged_post(endpoints[0], endpoints[1], payload, timeout)
+            if response is not None:
+                return response
+            endpoints = endpoints[2:]
+
+        for endpoint in endpoints:
+            response = await self.post(endpoint, payload, timeout)
+            if response is not None:
+                return response
+        return None
+
+    def health(self) -> List[Dict[str, Any]]:
+        """所有节点的健康状态"""
+        return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+class _PendingBatch:
+    """事件循环内等待发送的批量调用"""
+
+    def __init__(self):
+        # (method, params, hedge, timeout, future)
+        self.calls: List[Tuple[str, List[Any], bool, Optional[float], asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class RPCBatcher:
+    """JSON-RPC 批量请求
+
+    在 BATCH_WINDOW 时间窗口内收集同一节点池的调用，合并为一个批量数组 POST，
+    再按 id 把各自的响应分发给调用方。节点不支持批量请求时退回逐个发送；
+    所有节点都失败时直接返回 None，不再逐个重发。
+    同一组节点共享一个 batcher，不同服务实例发起的调用也能合并。
+    """
+
+    BATCH_WINDOW = 0.005
+    MAX_BATCH_SIZE = 50
+
+    # 可以合并的只读方法
+    BATCHABLE_METHODS = frozenset({
+        'getBalance',
+        'getAccountInfo',
+        'getMultipleAccounts',
+        'getSignatureStatuses',
+        'getTokenAccountBalance',
+        'getTokenSupply',
+        'getTokenAccountsByOwner',
+    })
+
+    _batchers: Dict[Tuple[str, Tuple[str, ...]], 'RPCBatcher'] = {}
+
+    def __init__(self, pool: RPCEndpointPool):
+        self.pool = pool
+        self._pending: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingBatch]' = \
+            weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_pool(cls, pool: RPCEndpointPool) -> 'RPCBatcher':
+        """获取节点池对应的共享 batcher"""
+        key = (pool.provider, tuple(pool.urls))
+        batcher = cls._batchers.get(key)
+        if batcher is None:
+            batcher = cls(pool)
+            cls._batchers[key] = batcher
+        return batcher
+
+    async def call(
+        self,
+        method: str,
+        params: Optional[List[Any]] = None,
+        hedge: bool = False,
+        timeout: Optional[float] = None
+    ) -> Optional[Any]:
+        """加入当前批次并等待自己的响应，不可合并的方法直接交给节点池
+
+        Returns:
+            Optional[Any]: JSON-RPC 响应体（包含 result 或 error），请求失败时返回 None
+        """
+        if method not in self.BATCHABLE_METHODS:
+            return await self.pool.call(method, params, hedge=hedge, timeout=timeout)
+
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = _PendingBatch()
+            self._pending[loop] = batch
+
+        future = loop.create_future()
+        batch.calls.append((method, params or [], hedge, timeout, future))
+        if len(batch.calls) >= self.MAX_BATCH_SIZE:
+            self._flush(loop)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.BATCH_WINDOW, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        if batch.calls:
+            loop.create_task(self._send(batch.calls))
+
+    async def _send(self, calls: List[Tuple[str, List[Any], bool, Optional[float], asyncio.Future]]) -> None:
+        try:
+            hedge = all(method in self.pool.HEDGEABLE_METHODS for method, _, _, _, _ in calls) and \
+                any(call_hedge for _, _, call_hedge, _, _ in calls)
+            # 批量请求使用各调用中最长的超时，任一调用未指定时使用节点池默认值
+            timeouts = [timeout for _, _, _, timeout, _ in calls]
+            batch_timeout = None if None in timeouts else max(timeouts)
+
+            if len(calls) == 1:
+                method, params, _, timeout, future = calls[0]
+                results = [await self.pool.call(method, params, hedge=hedge, timeout=timeout)]
+            else:
+                payload = [
+                    {"jsonrpc": "2.0", "id": index, "method": method, "params": params}
+                    for index, (method, params, _, _, _) in enumerate(calls)
+                ]
+                response = await self.pool.send(payload, hedge=hedge, timeout=batch_timeout)
+                if isinstance(response, list):
+                    by_id = {item.get('id'): item for item in response if isinstance(item, dict)}
+                    results = [by_id.get(index) for index in range(len(calls))]
+                elif response is None:
+                    # 所有节点都失败（超时、熔断），逐个重发只会加重负担
+                    logger.warning(f"批量 RPC 请求失败: {len(calls)} 个调用")
+                    results = [None] * len(calls)
+                else:
+                    # 节点不支持批量请求，逐个发送
+                    logger.warning(f"节点不支持批量 RPC 请求，改为逐个发送: {response}")
+                    results = await asyncio.gather(*[
+                        self.pool.call(method, params, hedge=call_hedge, timeout=timeout)
+                        for method, params, call_hedge, timeout, _ in calls
+                    ])
+
+            for (_, _, _, _, future), result in zip(calls, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"批量 RPC 请求出错: {str(e)}")
+            for _, _, _, _, future in calls:
+                if not future.done():
+                    future.set_exception(e)
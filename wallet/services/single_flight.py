@@ -0,0 +1,131 @@
+"""相同上游请求的合并（single-flight）"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+from .redis_client import AsyncRedisClient
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """合并并发的相同请求
+
+    - 进程内：同一个 key 的并发调用共享一个 Task，只有第一个调用真正执行，
+      调用者被取消时请求仍在后台完成
+    - 跨进程：第一个执行者在 Redis 中持有短期租约，其他 worker 等待其发布结果，
+      租约过期或执行者失败时再自行执行
+
+    结果通过 JSON 在 worker 之间传递，只适用于返回 JSON 兼容数据的请求。
+    """
+
+    LEASE_PREFIX = 'singleflight:lease:'
+    RESULT_PREFIX = 'singleflight:result:'
+    # 租约及结果的有效期（秒）
+    LEASE_TTL = 5
+    POLL_INTERVAL = 0.05
+
+    # 仅在持有者匹配时删除租约
+    RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+    _inflight: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]' = \
+        weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _get_inflight(cls) -> Dict[str, asyncio.Task]:
+        loop = asyncio.get_running_loop()
+        inflight = cls._inflight.get(loop)
+        if inflight is None:
+            inflight = {}
+            cls._inflight[loop] = inflight
+        return inflight
+
+    @classmethod
+    async def do(cls, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 func，相同 key 的并发调用只执行一次
+
+        Args:
+            key: 请求标识，相同 key 视为相同请求
+            func: 无参协程函数
+
+        Returns:
+            Any: func 的返回值
+        """
+        inflight = cls._get_inflight()
+        task = inflight.get(key)
+        if task is None:
+            # 请求在独立的任务中执行，任一调用者被取消都不会影响其他等待者
+            task = asyncio.ensure_future(cls._do_distributed(key, func))
+            inflight[key] = task
+
+            def on_done(done: asyncio.Future) -> None:
+                if inflight.get(key) is done:
+                    inflight.pop(key, None)
+                # 所有调用者都已取消时避免 "exception was never retrieved" 警告
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(on_done)
+
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def _do_distributed(cls, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """通过 Redis 租约在 worker 之间合并请求"""
+        client = AsyncRedisClient.get_client()
+        if client is None:
+            return await func()
+
+        lease_key = f"{cls.LEASE_PREFIX}{key}"
+        result_key = f"{cls.RESULT_PREFIX}{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await client.set(lease_key, token, nx=True, ex=cls.LEASE_TTL)
+        except Exception as e:
+            AsyncRedisClient.mark_unavailable(e)
+            return await func()
+
+        if acquired:
+            try:
+                result = await func()
+                # 失败结果不共享，等待者在租约释放后自行请求
+                if result is not None:
+                    try:
+                        await client.set(result_key, json.dumps(result), ex=cls.LEASE_TTL)
+                    except Exception as e:
+                        logger.debug(f"发布请求结果失败 {key}: {str(e)}")
+                return result
+            finally:
+                try:
+                    await client.eval(cls.RELEASE_SCRIPT, 1, lease_key, token)
+                except Exception as e:
+                    logger.debug(f"释放请求租约失败 {key}: {str(e)}")
+
+        # 其他 worker 正在请求，等待其结果
+        deadline = time.monotonic() + cls.LEASE_TTL
+        try:
+            while time.monotonic() < deadline:
+                cached = await client.get(result_key)
+                if cached is not None:
+                    return json.loads(cached)
+                if not await client.exists(lease_key):
+                    # 租约已释放但没有结果，说明执行者失败，再检查一次结果后自行请求
+                    cached = await client.get(result_key)
+                    if cached is not None:
+                        return json.loads(cached)
+                    break
+                await asyncio.sleep(cls.POLL_INTERVAL)
+        except Exception as e:
+            AsyncRedisClient.mark_unavailable(e)
+
+        return await func()
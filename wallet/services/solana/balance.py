@@ -1,17 +1,24 @@
 import aiohttp
 import asyncio
+import functools
 import logging
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from django.utils import timezone
 from datetime import timedelta
 from asgiref.sync import sync_to_async
-from django.core.cache import cache
 import time
 import json
 
 from ...models import Token, Wallet
 from ...services.solana_config import MoralisConfig, RPCConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.price_cache import PriceCache
+from ...services.price_resolver import PriceResolver
+from ...services.portfolio_cache import PortfolioSnapshot
+from ...services.gateway import UpstreamGateway
+from ...services.rpc_pool import RPCBatcher, RPCEndpointPool
+from ...services.token_registry import TokenRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +28,33 @@ class SolanaBalanceService:
     PRICE_CACHE_TTL = 300  # 价格缓存5分钟
     TOKEN_CACHE_TTL = 86400  # 代币元数据缓存24小时
 
+    # 钱包持仓数据源
+    BACKEND_MORALIS = 'moralis'
+    BACKEND_RPC = 'rpc'
+    BACKEND_AUTO = 'auto'
+    # auto 模式下按延迟的指数移动平均选择数据源；超过 PROBE_INTERVAL 秒没有样本的数据源会被重新尝试
+    LATENCY_ALPHA = 0.2
+    PROBE_INTERVAL = 300
+    FAILURE_LATENCY = 10.0  # 失败按该延迟计入统计
+
+    # SPL Token 与 Token-2022 程序
+    TOKEN_PROGRAM_IDS = (
+        'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+        'TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb',
+    )
+
+    # backend -> (平均延迟, 最近一次样本时间)
+    _backend_latency: Dict[str, Tuple[float, float]] = {}
+
     def __init__(self):
         self.headers = {
             "accept": "application/json",
             "X-API-Key": MoralisConfig.API_KEY
         }
         self.timeout = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=10)
+        self.rpc_batcher = RPCBatcher.for_pool(
+            RPCEndpointPool([RPCConfig.SOLANA_MAINNET_RPC_URL] + RPCConfig.SOLANA_BACKUP_RPC_URLS)
+        )
 
     def get_health_check_url(self) -> str:
         """获取健康检查URL"""
@@ -39,7 +67,7 @@ class SolanaBalanceService:
 
     async def get_native_balance(self, address: str) -> Decimal:
         """获取 SOL 原生代币余额"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 url = MoralisConfig.SOLANA_ACCOUNT_BALANCE_URL.format(address)
                 sol_data = await self._fetch_with_retry(session, url)
@@ -57,7 +85,7 @@ class SolanaBalanceService:
 
     async def get_token_balance(self, address: str, token_address: str) -> Decimal:
         """获取指定代币余额"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 logger.info(f"开始获取代币余额 - 钱包地址: {address}, 代币地址: {token_address}")
                 
@@ -89,7 +117,7 @@ class SolanaBalanceService:
         """获取关联代币账户地址"""
         try:
             url = f"{MoralisConfig.SOLANA_URL}/account/{wallet_address}/tokens/{token_address}/associated"
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 response = await self._fetch_with_retry(session, url)
                 if response and 'associatedTokenAddress' in response:
                     return response['associatedTokenAddress']
@@ -105,25 +133,26 @@ class SolanaBalanceService:
         
         try:
             url = f"{MoralisConfig.SOLANA_URL}/account/{account_address}"
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 response = await self._fetch_with_retry(session, url)
                 return bool(response and response.get('lamports', 0) > 0)
         except Exception as e:
             logger.error(f"检查代币账户是否存在时出错: {str(e)}")
             return False
 
-    async def _get_cached_price(self, token_address: str) -> Dict:
-        """获取缓存的价格数据"""
-        cache_key = f"solana_token_price_{token_address}"
-        price_data = cache.get(cache_key)
-        if price_data:
-            return price_data
-        return None # type: ignore
+    async def _get_price(self, token_address: str) -> Optional[Dict]:
+        """获取价格数据，两级缓存，过期价格先返回并在后台刷新"""
+        return await PriceCache.get('SOL', token_address, functools.partial(self._fetch_price, token_address))
 
-    async def _cache_price(self, token_address: str, price_data: Dict):
-        """缓存价格数据"""
-        cache_key = f"solana_token_price_{token_address}"
-        cache.set(cache_key, price_data, self.PRICE_CACHE_TTL)
+    async def _fetch_price(self, token_address: str) -> Optional[Dict]:
+        """从 Moralis 获取原始价格数据"""
+        async with HTTPClientRegistry.session('moralis') as session:
+            return await self._fetch_with_retry(
+                session,
+                MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(token_address),
+                coalesce=True,
+                not_found={}
+            )
 
     async def _get_or_create_token_metadata(self, token_address: str, token_data: Dict) -> Token:
         """获取或创建代币元数据"""
@@ -176,47 +205,57 @@ class SolanaBalanceService:
 
     async def get_all_token_balances(self, address: str, include_hidden: bool = False) -> Dict:
         """获取所有代币余额
-        
+
         Args:
             address: 钱包地址
             include_hidden: 是否包含隐藏的代币，默认为 False
-            
+
         Returns:
             Dict: 代币余额信息
         """
         try:
-            tokens = []
-            total_value = 0
-            
-            # 获取原生代币余额
-            native_balance = await self.get_native_balance(address)
+            tokens = [token async for token in self.iter_token_balances(address, include_hidden)]
+        except Exception as e:
+            logger.error(f"获取代币列表失败: {str(e)}")
+            return {
+                'total_value_usd': '0',
+                'tokens': []
+            }
+        logger.info(f"最终返回 {len(tokens)} 个代币")
+        return PortfolioSnapshot.summarize(tokens)
+
+    async def iter_token_balances(self, address: str, include_hidden: bool = False) -> AsyncIterator[Dict]:
+        """逐个产出代币余额：先产出 SOL，SPL 代币在价格解析后立即产出
+
+        Args:
+            address: 钱包地址
+            include_hidden: 是否包含隐藏的代币，默认为 False
+
+        Yields:
+            Dict: 单个代币的余额信息，格式与 get_all_token_balances 的 tokens 元素相同
+        """
+        # 使用 Wrapped SOL 的合约地址
+        wsol_address = "So11111111111111111111111111111111111111112"
+
+        # SOL 价格与持仓并发获取，不在持仓返回后再串行等待
+        native_price = asyncio.ensure_future(self._get_price(wsol_address))
+        try:
+            # 原生代币余额和 SPL 代币列表
+            native_balance, token_balances = await self._get_holdings(address)
             logger.info(f"原生代币余额: {native_balance}")
-            
+
             if native_balance > 0:  # 只有当余额大于0时才添加
-                # 使用 Wrapped SOL 的合约地址
-                wsol_address = "So11111111111111111111111111111111111111112"
-                
                 # 获取 SOL 价格数据
-                price_data = await self._get_cached_price(wsol_address)
-                if not price_data:
-                    # 如果缓存中没有，则直接获取价格
-                    async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                        price_data = await self._fetch_with_retry(
-                            session, 
-                            MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(wsol_address)
-                        )
-                        if price_data:
-                            await self._cache_price(wsol_address, price_data)
-                
+                price_data = await native_price
+
                 # 获取价格和价格变化
                 price_usd = price_data.get('usdPrice', '0') if price_data else '0'
                 price_change_24h = f"{price_data.get('usdPrice24hrPercentChange', 0):+.2f}%" if price_data else '+0.00%'
-                
+
                 # 计算价值
                 value = float(native_balance) * float(price_usd)
-                total_value += value
-                
-                native_token = {
+
+                yield {
                     'chain': 'SOL',
                     'address': wsol_address,  # 使用 Wrapped SOL 地址
                     'name': 'Solana',
@@ -231,142 +270,114 @@ class SolanaBalanceService:
                     'is_native': True,
                     'is_visible': True
                 }
-                tokens.append(native_token)
-            
-            # 获取 SPL 代币余额
-            url = f"{MoralisConfig.SOLANA_ACCOUNT_TOKENS_URL.format(address)}"
-            logger.info(f"获取 SPL 代币余额 URL: {url}")
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(url, headers=self.headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"获取代币列表失败: 状态码 {response.status}, 错误信息: {error_text}")
-                        return {
-                            'total_value_usd': str(total_value),
-                            'tokens': tokens
+        finally:
+            # 余额为 0 或调用方提前停止迭代时不再等待 SOL 价格，但不取消：
+            # 该请求经过 SingleFlight 合并，其他并发请求可能正在等待同一结果，让它在后台完成
+            if not native_price.done():
+                native_price.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        if token_balances is None:
+            return
+        logger.info(f"获取到 {len(token_balances)} 个 SPL 代币")
+
+        # 获取所有代币的显示状态
+        token_addresses = [token['mint'] for token in token_balances]
+        db_tokens = await sync_to_async(list)(Token.objects.filter(
+            chain='SOL',
+            address__in=token_addresses
+        ).values('address', 'is_visible'))
+
+        # 创建地址到显示状态的映射
+        visibility_map = {t['address']: t['is_visible'] for t in db_tokens}
+        logger.info(f"数据库中找到 {len(db_tokens)} 个代币记录")
+
+        # 先过滤出需要展示的代币，只为这些代币解析价格
+        pending = {}
+        for token_data in token_balances:
+            try:
+                token_address = token_data['mint']
+
+                # 如果代币被隐藏且不包含隐藏代币，则跳过
+                if not include_hidden and not visibility_map.get(token_address, True):
+                    logger.info(f"跳过隐藏代币 {token_address}")
+                    continue
+
+                decimals = int(token_data.get('decimals', 9))
+
+                # 跳过 decimals 为 0 的代币（可能是 NFT）
+                if decimals == 0:
+                    logger.info(f"跳过 NFT 代币 {token_address} (decimals=0)")
+                    continue
+
+                # 计算余额
+                raw_balance = token_data.get('amount', '0')
+                if isinstance(raw_balance, str) and '.' in raw_balance:
+                    # 如果原始余额包含小数点，直接使用
+                    balance_formatted = raw_balance
+                    balance = raw_balance
+                else:
+                    # 否则进行精度转换
+                    balance = str(raw_balance)
+                    balance_formatted = str(float(raw_balance) / (10 ** decimals))
+
+                # 如果格式化后的余额为0，跳过
+                if float(balance_formatted) <= 0:
+                    logger.info(f"跳过零余额代币 {token_address}")
+                    continue
+
+                pending[token_address] = (token_data, decimals, balance, balance_formatted)
+
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning(f"无法解析代币余额: {token_data}, 错误: {str(e)}")
+                continue
+
+        # 价格按到达顺序分批返回（缓存 + 批量请求未命中的代币），缓存命中的代币最先产出
+        price_chunks = PriceResolver.resolve_iter(
+            'SOL',
+            list(pending),
+            fetcher_factory=lambda token_address: functools.partial(self._fetch_price, token_address)
+        )
+        try:
+            async for price_map in price_chunks:
+                for token_address, price_data in price_map.items():
+                    if token_address not in pending:
+                        continue
+                    token_data, decimals, balance, balance_formatted = pending[token_address]
+                    try:
+                        # 获取价格和价格变化
+                        price = float(price_data.get('usdPrice', '0') if price_data else '0')
+                        price_change = price_data.get('usdPrice24hrPercentChange', 0) if price_data else 0
+
+                        # 计算价值
+                        value = float(balance_formatted) * price
+
+                        token_info = {
+                            'chain': 'SOL',
+                            'address': token_address,
+                            'name': token_data.get('name', ''),
+                            'symbol': token_data.get('symbol', ''),
+                            'decimals': decimals,
+                            'logo': token_data.get('logo', ''),
+                            'balance': balance,
+                            'balance_formatted': balance_formatted,
+                            'price_usd': str(price),
+                            'value_usd': str(value),
+                            'price_change_24h': f"{price_change:+.2f}%" if price_change else '+0.00%',
+                            'is_native': False,
+                            'is_visible': visibility_map.get(token_address, True)
                         }
-                    
-                    token_balances = await response.json()
-                    logger.info(f"获取到 {len(token_balances)} 个 SPL 代币")
-                    
-                    # 获取所有代币的显示状态
-                    token_addresses = [token['mint'] for token in token_balances]
-                    db_tokens = await sync_to_async(list)(Token.objects.filter(
-                        chain='SOL',
-                        address__in=token_addresses
-                    ).values('address', 'is_visible'))
-                    
-                    # 创建地址到显示状态的映射
-                    visibility_map = {t['address']: t['is_visible'] for t in db_tokens}
-                    logger.info(f"数据库中找到 {len(db_tokens)} 个代币记录")
-                    
-                    # 处理 SPL 代币
-                    for token_data in token_balances:
-                        try:
-                            token_address = token_data['mint']
-                            logger.info(f"处理代币 {token_address}")
-                            
-                            # 如果代币被隐藏且不包含隐藏代币，则跳过
-                            if not include_hidden and not visibility_map.get(token_address, True):
-                                logger.info(f"跳过隐藏代币 {token_address}")
-                                continue
-                                
-                            decimals = int(token_data.get('decimals', 9))
-                            
-                            # 跳过 decimals 为 0 的代币（可能是 NFT）
-                            if decimals == 0:
-                                logger.info(f"跳过 NFT 代币 {token_address} (decimals=0)")
-                                continue
-                                
-                            # 计算余额
-                            try:
-                                # 使用原始余额数据
-                                raw_balance = token_data.get('amount', '0')
-                                if isinstance(raw_balance, str) and '.' in raw_balance:
-                                    # 如果原始余额包含小数点，直接使用
-                                    balance_formatted = raw_balance
-                                    balance = raw_balance
-                                else:
-                                    # 否则进行精度转换
-                                    balance = str(raw_balance)
-                                    balance_formatted = str(float(raw_balance) / (10 ** decimals))
-                                
-                                logger.info(f"代币 {token_address} 余额: {balance_formatted} (原始: {balance})")
-                                
-                                # 如果格式化后的余额为0，跳过
-                                if float(balance_formatted) <= 0:
-                                    logger.info(f"跳过零余额代币 {token_address}")
-                                    continue
-                                    
-                            except (ValueError, TypeError) as e:
-                                logger.warning(f"无法解析代币余额: {token_data}, 错误: {str(e)}")
-                                continue
-                            
-                            # 获取代币价格
-                            price_data = await self._get_cached_price(token_address)
-                            if not price_data:
-                                # 如果缓存中没有，则获取代币价格
-                                price_response = await self._fetch_with_retry(
-                                    session, 
-                                    MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(token_address)
-                                )
-                                if price_response:
-                                    price_data = price_response
-                                    await self._cache_price(token_address, price_response)
-                            
-                            # 获取价格和价格变化
-                            price = float(price_data.get('usdPrice', '0') if price_data else '0')
-                            price_change = price_data.get('usdPrice24hrPercentChange', 0) if price_data else 0
-                            logger.info(f"代币 {token_address} 价格: ${price}, 24h变化: {price_change}%")
-                            
-                            # 计算价值
-                            value = float(balance_formatted) * price
-                            total_value += value
-                            
-                            token_info = {
-                                'chain': 'SOL',
-                                'address': token_address,
-                                'name': token_data.get('name', ''),
-                                'symbol': token_data.get('symbol', ''),
-                                'decimals': decimals,
-                                'logo': token_data.get('logo', ''),
-                                'balance': balance,
-                                'balance_formatted': balance_formatted,
-                                'price_usd': str(price),
-                                'value_usd': str(value),
-                                'price_change_24h': f"{price_change:+.2f}%" if price_change else '+0.00%',
-                                'is_native': False,
-                                'is_visible': visibility_map.get(token_address, True)
-                            }
-                            
-                            tokens.append(token_info)
-                            logger.info(f"成功添加代币 {token_address}")
-                            
-                        except Exception as e:
-                            logger.error(f"处理代币数据失败: {str(e)}, 数据: {token_data}")
-                            continue
-                    
-                    # 按价值排序
-                    tokens.sort(key=lambda x: float(x['value_usd']), reverse=True)
-                    logger.info(f"最终返回 {len(tokens)} 个代币")
-                    
-                    return {
-                        'total_value_usd': str(total_value),
-                        'tokens': tokens
-                    }
-                    
-        except Exception as e:
-            logger.error(f"获取代币列表失败: {str(e)}")
-            return {
-                'total_value_usd': '0',
-                'tokens': []
-            }
+                    except Exception as e:
+                        logger.error(f"处理代币数据失败: {str(e)}, 数据: {token_data}")
+                        continue
+
+                    yield token_info
+        finally:
+            await price_chunks.aclose()
 
     async def _async_update_tokens(self, new_tokens: List[Dict], price_update_needed: List[str]):
         """异步更新代币信息和价格"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 # 1. 创建新代币
                 for token_data in new_tokens:
                     try:
@@ -390,7 +401,9 @@ class SolanaBalanceService:
                 for token_address in price_update_needed:
                     price_tasks.append((
                         token_address,
-                        self._fetch_with_retry(session, MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(token_address))
+                        self._fetch_with_retry(
+                            session, MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(token_address), coalesce=True
+                        )
                     ))
 
                 if price_tasks:
@@ -400,13 +413,145 @@ class SolanaBalanceService:
                             try:
                                 token = await sync_to_async(Token.objects.get)(chain='SOL', address=token_address)
                                 await self._update_token_price(token, price_data)
-                                await self._cache_price(token_address, price_data)
+                                await PriceCache.set('SOL', token_address, price_data)
                             except Exception as e:
                                 logger.error(f"更新代币价格失败: {str(e)}")
 
         except Exception as e:
             logger.error(f"异步更新代币信息失败: {str(e)}")
 
+    async def _get_holdings(self, address: str) -> Tuple[Decimal, Optional[List[Dict]]]:
+        """获取原生代币余额和 SPL 代币列表
+
+        按 RPCConfig.SOLANA_BALANCE_BACKEND 选择数据源，代币列表获取失败时依次尝试下一个数据源。
+        代币列表的格式与 Moralis 返回的一致（mint、amount、decimals、name、symbol、logo）。
+
+        Returns:
+            Tuple[Decimal, Optional[List[Dict]]]: SOL 余额和代币列表，所有数据源都失败时代币列表为 None
+        """
+        loaders = {
+            self.BACKEND_MORALIS: self._get_moralis_holdings,
+            self.BACKEND_RPC: self._get_rpc_holdings,
+        }
+        holdings: Tuple[Decimal, Optional[List[Dict]]] = (Decimal('0'), None)
+        for backend in self._select_backends():
+            started_at = time.monotonic()
+            holdings = await loaders[backend](address)
+            if holdings[1] is not None:
+                self._record_latency(backend, time.monotonic() - started_at)
+                return holdings
+            self._record_latency(backend, self.FAILURE_LATENCY)
+            logger.warning(f"通过 {backend} 获取 SOL 持仓失败: {address}")
+        return holdings
+
+    @classmethod
+    def _select_backends(cls) -> List[str]:
+        """按配置返回依次尝试的数据源"""
+        backend = RPCConfig.SOLANA_BALANCE_BACKEND
+        if backend == cls.BACKEND_MORALIS:
+            return [cls.BACKEND_MORALIS]
+        if backend == cls.BACKEND_RPC:
+            return [cls.BACKEND_RPC, cls.BACKEND_MORALIS]
+
+        # auto：没有样本或样本过期的数据源排在最前，其余按平均延迟排序
+        now = time.monotonic()
+
+        def latency(name: str) -> float:
+            stats = cls._backend_latency.get(name)
+            if stats is None or now - stats[1] > cls.PROBE_INTERVAL:
+                return 0.0
+            return stats[0]
+
+        return sorted([cls.BACKEND_MORALIS, cls.BACKEND_RPC], key=latency)
+
+    @classmethod
+    def _record_latency(cls, backend: str, latency: float) -> None:
+        stats = cls._backend_latency.get(backend)
+        if stats is not None:
+            latency = stats[0] + cls.LATENCY_ALPHA * (latency - stats[0])
+        cls._backend_latency[backend] = (latency, time.monotonic())
+
+    async def _get_moralis_holdings(self, address: str) -> Tuple[Decimal, Optional[List[Dict]]]:
+        """通过 Moralis 获取持仓，原生余额和代币列表并发请求"""
+
+        async def get_tokens() -> Optional[List[Dict]]:
+            url = MoralisConfig.SOLANA_ACCOUNT_TOKENS_URL.format(address)
+            async with HTTPClientRegistry.session('moralis') as session:
+                async with session.get(url, headers=self.headers) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"获取代币列表失败: 状态码 {response.status}, 错误信息: {error_text}")
+                        return None
+                    return await response.json()
+
+        try:
+            native_balance, token_balances = await asyncio.gather(self.get_native_balance(address), get_tokens())
+            return native_balance, token_balances
+        except Exception as e:
+            logger.error(f"通过 Moralis 获取代币列表失败: {str(e)}")
+            return Decimal('0'), None
+
+    async def _get_rpc_holdings(self, address: str) -> Tuple[Decimal, Optional[List[Dict]]]:
+        """通过 RPC 获取持仓
+
+        getBalance 与两个代币程序的 getTokenAccountsByOwner（jsonParsed）由 RPCBatcher
+        合并为一个批量请求；同一代币的多个账户余额相加，名称、符号和图标从 TokenRegistry 获取。
+        amount 为 UI 数量字符串，与 Moralis 返回格式相同，原始整数数量另放在 raw_amount。
+        """
+        options = {"encoding": "jsonParsed", "commitment": "confirmed"}
+        try:
+            responses = await asyncio.gather(
+                self.rpc_batcher.call('getBalance', [address, {"commitment": "confirmed"}]),
+                *[
+                    self.rpc_batcher.call('getTokenAccountsByOwner', [address, {"programId": program_id}, options])
+                    for program_id in self.TOKEN_PROGRAM_IDS
+                ]
+            )
+        except Exception as e:
+            logger.error(f"通过 RPC 获取持仓失败: {str(e)}")
+            return Decimal('0'), None
+
+        for response in responses:
+            if not isinstance(response, dict) or 'result' not in response:
+                logger.error(f"通过 RPC 获取持仓失败: {response}")
+                return Decimal('0'), None
+
+        lamports = responses[0]['result'].get('value') or 0
+        native_balance = Decimal(str(lamports)) / Decimal('1000000000')
+
+        # mint -> [原始数量, 精度]
+        amounts: Dict[str, List[int]] = {}
+        for response in responses[1:]:
+            for account in response['result'].get('value') or []:
+                try:
+                    info = account['account']['data']['parsed']['info']
+                    token_amount = info['tokenAmount']
+                    mint = info['mint']
+                    amount = int(token_amount['amount'])
+                    decimals = int(token_amount['decimals'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                amounts.setdefault(mint, [0, decimals])[0] += amount
+
+        metadata = await TokenRegistry.get_many('SOL', list(amounts))
+        token_balances = []
+        for mint, (amount, decimals) in amounts.items():
+            meta = metadata.get(mint) or {}
+            # amount 与 Moralis 一致使用 UI 数量（同 uiAmountString 格式），原始数量放在 raw_amount
+            ui_amount = format(Decimal(amount).scaleb(-decimals), 'f')
+            if '.' in ui_amount:
+                ui_amount = ui_amount.rstrip('0').rstrip('.')
+            token_balances.append({
+                'mint': mint,
+                'amount': ui_amount,
+                'raw_amount': str(amount),
+                'decimals': decimals,
+                'name': meta.get('name') or '',
+                'symbol': meta.get('symbol') or '',
+                'logo': meta.get('logo') or ''
+            })
+        return native_balance, token_balances
+
     async def _fetch_with_retry(self, session, url, method="get", **kwargs):
         """带重试的HTTP请求函数"""
         kwargs['headers'] = self.headers
@@ -416,38 +561,9 @@ class SolanaBalanceService:
         kwargs['params']['network'] = 'mainnet'
         
         logger.debug(f"开始请求: {url}")
-        logger.debug(f"请求头: {self.headers}")
         logger.debug(f"请求参数: {kwargs['params']}")
         
-        for attempt in range(3):
-            try:
-                async with getattr(session, method)(url, **kwargs) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.debug(f"请求成功: {url}, 响应: {data}")
-                        return data
-                    elif response.status == 429:  # Rate limit
-                        retry_after = int(response.headers.get('Retry-After', 2))
-                        logger.warning(f"请求频率限制: {url}, 等待 {retry_after} 秒后重试")
-                        await asyncio.sleep(retry_after)
-                        continue
-                    else:
-                        logger.error(f"请求失败: {url}, 状态码: {response.status}")
-                        try:
-                            error_content = await response.text()
-                            logger.error(f"错误响应内容: {error_content}")
-                        except:
-                            pass
-                        return None
-            except Exception as e:
-                if attempt < 2:
-                    wait_time = 2 * (attempt + 1)
-                    logger.warning(f"请求出错: {url}, 错误: {str(e)}, {wait_time} 秒后重试")
-                    await asyncio.sleep(wait_time)
-                    continue
-                logger.error(f"请求最终失败: {url}, 错误: {str(e)}")
-                return None
-        return None
+        return await UpstreamGateway.fetch_json('moralis', url, method, session=session, **kwargs)
 
     async def toggle_token_visibility(self, wallet_id: int, token_address: str) -> dict:
         """切换代币的显示/隐藏状态"""
@@ -3,14 +3,15 @@ import logging
 from typing import Dict, List, Optional
 from decimal import Decimal
 import aiohttp
-import asyncio
 from datetime import datetime
-from asgiref.sync import sync_to_async
 import json
 from django.utils import timezone
 
-from ...models import Transaction, Token, Wallet
+from ...models import Transaction, Wallet
 from ...services.solana_config import MoralisConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.gateway import UpstreamGateway
+from ...services.token_registry import TokenRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +34,7 @@ class SolanaHistoryService:
         offset: int = 0
     ) -> List[Dict]:
         """获取 SOL 原生代币交易历史"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 url = f"{MoralisConfig.SOLANA_URL}/account/mainnet/{address}/transfers"
                 params = {
@@ -80,7 +81,7 @@ class SolanaHistoryService:
         offset: int = 0
     ) -> List[Dict]:
         """获取 SPL 代币交易历史"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 url = f"{MoralisConfig.SOLANA_URL}/account/mainnet/{address}/transfers"
                 params = {
@@ -98,10 +99,7 @@ class SolanaHistoryService:
                     return []
 
                 # 获取代币信息
-                token_info = await sync_to_async(Token.objects.filter(
-                    chain='SOL',
-                    address=token_address
-                ).first)()
+                token_info = await TokenRegistry.get('SOL', token_address) or {}
 
                 transactions = []
                 for tx in response:
@@ -117,9 +115,9 @@ class SolanaHistoryService:
                             'fee': tx.get('fee', '0'),
                             'status': tx.get('status', 'success'),
                             'token_address': token_address,
-                            'token_name': token_info.name if token_info else 'Unknown Token',
-                            'token_symbol': token_info.symbol if token_info else 'Unknown',
-                            'token_decimals': token_info.decimals if token_info else 0,
+                            'token_name': token_info.get('name', 'Unknown Token'),
+                            'token_symbol': token_info.get('symbol', 'Unknown'),
+                            'token_decimals': token_info.get('decimals', 0),
                             'is_native': False
                         })
 
@@ -131,7 +129,7 @@ class SolanaHistoryService:
 
     async def get_transaction_details(self, tx_hash: str) -> Dict:
         """获取交易详情"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 url = f"{MoralisConfig.SOLANA_URL}/transaction/mainnet/{tx_hash}"
                 response = await self._fetch_with_retry(session, url)
@@ -144,12 +142,9 @@ class SolanaHistoryService:
                 token_address = response.get('token_address') if is_spl else None
 
                 # 如果是 SPL 代币交易，获取代币信息
-                token_info = None
+                token_info = {}
                 if token_address:
-                    token_info = await sync_to_async(Token.objects.filter(
-                        chain='SOL',
-                        address=token_address
-                    ).first)()
+                    token_info = await TokenRegistry.get('SOL', token_address) or {}
 
                 return {
                     'tx_hash': response.get('signature'),
@@ -162,9 +157,9 @@ class SolanaHistoryService:
                     'status': response.get('status', 'success'),
                     'is_native': not is_spl,
                     'token_address': token_address,
-                    'token_name': token_info.name if token_info else None,
-                    'token_symbol': token_info.symbol if token_info else None,
-                    'token_decimals': token_info.decimals if token_info else None,
+                    'token_name': token_info.get('name'),
+                    'token_symbol': token_info.get('symbol'),
+                    'token_decimals': token_info.get('decimals'),
                     'raw_data': response
                 }
 
@@ -175,22 +170,4 @@ class SolanaHistoryService:
     async def _fetch_with_retry(self, session, url, method="get", **kwargs):
         """带重试的HTTP请求函数"""
         kwargs['headers'] = self.headers
-        for attempt in range(3):
-            try:
-                async with getattr(session, method)(url, **kwargs) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 429:  # Rate limit
-                        retry_after = int(response.headers.get('Retry-After', 2))
-                        await asyncio.sleep(retry_after)
-                        continue
-                    else:
-                        logger.error(f"请求失败: {url}, 状态码: {response.status}")
-                        return None
-            except Exception as e:
-                if attempt < 2:
-                    await asyncio.sleep(2 * (attempt + 1))
-                    continue
-                logger.error(f"请求失败: {url}, 错误: {str(e)}")
-                return None
-        return None
\ No newline at end of file
+        return await UpstreamGateway.fetch_json('moralis', url, method, session=session, **kwargs)
\ No newline at end of file
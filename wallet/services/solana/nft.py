@@ -23,6 +23,12 @@ from django.core.cache import cache
 from ...models import Wallet, Transaction as DBTransaction, Token, NFTCollection
 from ...exceptions import InsufficientBalanceError, InvalidAddressError, TransferError
 from ...services.solana_config import HeliusConfig, RPCConfig, MoralisConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.gateway import UpstreamGateway
+from ...services.rpc_pool import RPCBatcher, RPCEndpointPool
+from ...services.portfolio_cache import PortfolioSnapshot
+from ...services.nft_inventory import NFTInventory
+from ...services.etag import ResponseETag
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +47,10 @@ class SolanaNFTService:
             commitment=Commitment("confirmed")
         )
         
+        # 只读查询使用的 RPC 节点池，支持对冲请求
+        self.rpc_pool = RPCEndpointPool([self.rpc_url] + RPCConfig.SOLANA_BACKUP_RPC_URLS)
+        self.rpc_batcher = RPCBatcher.for_pool(self.rpc_pool)
+        
         # 设置超时和重试配置
         self.timeout = aiohttp.ClientTimeout(total=30, connect=5, sock_connect=5, sock_read=10)
         self.max_retries = 3
@@ -48,7 +58,11 @@ class SolanaNFTService:
     async def _check_token_account(self, address: str) -> bool:
         """检查代币账户是否存在"""
         try:
-            response = await self.client.get_account_info(address)
+            response = await self.rpc_batcher.call(
+                'getAccountInfo',
+                [address, {"encoding": "base64", "commitment": "confirmed"}],
+                hedge=True
+            )
             if response and isinstance(response, dict):
                 result = response.get('result', {})
                 if result and result.get('value'):
@@ -100,7 +114,10 @@ class SolanaNFTService:
                     raise TransferError("源账户的关联代币账户不存在")
             
             # 检查源账户是否拥有 NFT
-            source_account_info = await self.client.get_token_account_balance(str(source_token_account))
+            source_account_info = await self.rpc_batcher.call(
+                'getTokenAccountBalance',
+                [str(source_token_account), {"commitment": "confirmed"}]
+            )
             logger.info(f"源账户余额信息: {source_account_info}")
             
             if not source_account_info or not source_account_info.get('result', {}).get('value', {}).get('amount'):
@@ -118,7 +135,11 @@ class SolanaNFTService:
                 raise TransferError("NFT 余额不足")
                 
             # 检查 SOL 余额是否足够支付交易费用
-            balance_response = await self.client.get_balance(from_address)
+            balance_response = await self.rpc_batcher.call(
+                'getBalance',
+                [from_address, {"commitment": "confirmed"}],
+                hedge=True
+            )
             logger.info(f"SOL 余额响应: {balance_response}")
             
             if not balance_response or not balance_response.get('result', {}).get('value'):
@@ -263,7 +284,7 @@ class SolanaNFTService:
     async def _get_nft_info(self, nft_address: str) -> Dict[str, Any]:
         """获取NFT详细信息"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with HTTPClientRegistry.session('helius') as session:
                 payload = {
                     "jsonrpc": "2.0",
                     "id": "my-id",
@@ -470,6 +491,11 @@ class SolanaNFTService:
         except Exception as e:
             logger.error(f"保存交易记录失败: {str(e)}")
             # 不抛出异常，因为转账已经成功了
+        finally:
+            # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+            await PortfolioSnapshot.ainvalidate('SOL', wallet_address)
+            await NFTInventory.ainvalidate('SOL', wallet_address)
+            await ResponseETag.abump(ResponseETag.wallet_scope('SOL', wallet_address))
 
     def _is_valid_address(self, address: str) -> bool:
         """验证地址是否有效"""
@@ -481,15 +507,9 @@ class SolanaNFTService:
 
     async def _fetch_with_retry(self, method: str, **kwargs) -> Any:
         """带重试的 RPC 请求"""
-        for attempt in range(self.max_retries):
-            try:
-                response = await getattr(self.client, method)(**kwargs)
-                return response
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    raise
-                await asyncio.sleep(2 ** attempt)
-        return None
+        return await UpstreamGateway.call(
+            'solana_rpc', getattr(self.client, method), max_attempts=self.max_retries, **kwargs
+        )
 
     async def _find_token_account_for_mint(self, owner_address: str, mint_address: str) -> Optional[str]:
         """查找指定 NFT 的实际代币账户"""
@@ -503,7 +523,10 @@ class SolanaNFTService:
             
             # 检查账户是否存在并有余额
             try:
-                balance_info = await self.client.get_token_account_balance(default_ata)
+                balance_info = await self.rpc_batcher.call(
+                    'getTokenAccountBalance',
+                    [default_ata, {"commitment": "confirmed"}]
+                )
                 if balance_info and isinstance(balance_info, dict):
                     value = balance_info.get('result', {}).get('value', {})
                     amount = value.get('amount', '0')
@@ -530,7 +553,7 @@ class SolanaNFTService:
         """
         try:
             # 调用 Helius API 获取 NFT 资产
-            async with aiohttp.ClientSession() as session:
+            async with HTTPClientRegistry.session('helius') as session:
                 payload = {
                     "jsonrpc": "2.0",
                     "id": "my-id",
@@ -11,6 +11,9 @@ from datetime import datetime, timedelta
 
 from ...models import Token
 from ...services.solana_config import MoralisConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.gateway import UpstreamGateway
+from ...services.price_cache import PriceCache
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +32,14 @@ class SolanaPriceService:
 
     async def get_token_price(self, token_address: str) -> Optional[Dict]:
         """获取代币价格"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 price_url = MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(token_address)
-                price_data = await self._fetch_with_retry(session, price_url)
+                price_data = await PriceCache.get(
+                    'SOL',
+                    token_address,
+                    lambda: self._fetch_with_retry(session, price_url, coalesce=True, not_found={})
+                )
                 
                 if price_data and 'usdPrice' in price_data:
                     return {
@@ -51,7 +58,7 @@ class SolanaPriceService:
         days: int = 7
     ) -> List[Dict]:
         """获取代币历史价格"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 # 首先尝试获取交易对价格
                 url = MoralisConfig.SOLANA_TOKEN_PAIRS_PRICE_URL.format(token_address)
@@ -116,7 +123,7 @@ class SolanaPriceService:
     async def get_token_prices(self, token_addresses: List[str]) -> Dict[str, Dict]:
         """批量获取代币价格"""
         result = {}
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             tasks = []
             for address in token_addresses:
                 price_url = MoralisConfig.SOLANA_TOKEN_PRICE_URL.format(address)
@@ -132,7 +139,7 @@ class SolanaPriceService:
     async def _get_single_token_price(self, session, price_url: str) -> Dict:
         """获取单个代币价格"""
         try:
-            price_data = await self._fetch_with_retry(session, price_url)
+            price_data = await self._fetch_with_retry(session, price_url, coalesce=True)
             
             if price_data and 'usdPrice' in price_data:
                 return {
@@ -146,31 +153,7 @@ class SolanaPriceService:
     async def _fetch_with_retry(self, session, url, method="get", **kwargs):
         """带重试的HTTP请求函数"""
         kwargs['headers'] = self.headers
-        for attempt in range(3):
-            try:
-                async with getattr(session, method)(url, **kwargs) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 429:  # Rate limit
-                        retry_after = int(response.headers.get('Retry-After', 2))
-                        await asyncio.sleep(retry_after)
-                        continue
-                    else:
-                        logger.error(f"请求失败: {url}, 状态码: {response.status}")
-                        if response.status != 404:  # 对于非404错误，记录响应内容
-                            try:
-                                error_content = await response.text()
-                                logger.error(f"错误响应内容: {error_content}")
-                            except:
-                                pass
-                        return None
-            except Exception as e:
-                if attempt < 2:
-                    await asyncio.sleep(2 * (attempt + 1))
-                    continue
-                logger.error(f"请求失败: {url}, 错误: {str(e)}")
-                return None
-        return None
+        return await UpstreamGateway.fetch_json('moralis', url, method, session=session, **kwargs)
 
     async def get_multiple_token_prices(
         self,
@@ -179,7 +162,7 @@ class SolanaPriceService:
     ) -> Dict[str, Decimal]:
         """批量获取代币价格"""
         result = {}
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 # 创建异步任务列表
                 tasks = [
@@ -234,11 +217,11 @@ class SolanaPriceService:
             
             logger.info(f"计算时间范围: from={from_date}, to={to_date}")
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 # 获取代币价格数据
                 price_url = f"{MoralisConfig.SOLANA_URL}/token/mainnet/{token_address}/price"
                 logger.info(f"获取代币价格: {price_url}")
-                price_data = await self._fetch_with_retry(session, price_url)
+                price_data = await self._fetch_with_retry(session, price_url, coalesce=True)
                 
                 if not price_data:
                     logger.error("无法获取价格数据")
@@ -21,6 +21,12 @@ import ssl
 import time
 
 from ...services.solana_config import MoralisConfig, RPCConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.cache import METADATA_CACHE
+from ...services.rpc_pool import RPCBatcher, RPCEndpointPool
+from ...services.portfolio_cache import PortfolioSnapshot
+from ...services.etag import ResponseETag
+from ...services.decimals_store import TokenDecimals
 from ...exceptions import SwapError, InsufficientBalanceError
 from .price import SolanaPriceService
 
@@ -28,9 +34,27 @@ logger = logging.getLogger(__name__)
 
 class SolanaSwapService:
     """Solana 代币兑换服务"""
+
+    # Jupiter 代币列表缓存
+    SUPPORTED_TOKENS_CACHE_KEY = 'swap_tokens:SOL'
+    SUPPORTED_TOKENS_CACHE_TTL = 3600
     
     async def get_supported_tokens(self) -> List[Dict[str, Any]]:
-        """获取支持的代币列表
+        """获取支持的代币列表，结果以 CompactCodec 编码缓存 SUPPORTED_TOKENS_CACHE_TTL 秒
+
+        Returns:
+            List[Dict[str, Any]]: 支持的代币列表
+        """
+        tokens = await METADATA_CACHE.aget_compact(self.SUPPORTED_TOKENS_CACHE_KEY)
+        if tokens:
+            return tokens
+
+        tokens = await self._fetch_supported_tokens()
+        await METADATA_CACHE.aset_compact(self.SUPPORTED_TOKENS_CACHE_KEY, tokens, self.SUPPORTED_TOKENS_CACHE_TTL)
+        return tokens
+
+    async def _fetch_supported_tokens(self) -> List[Dict[str, Any]]:
+        """从 Jupiter 获取支持的代币列表
 
         Returns:
             List[Dict[str, Any]]: 支持的代币列表
@@ -147,10 +171,6 @@ class SolanaSwapService:
                 if retry < self.max_retries - 1:
                     retry_wait = self.retry_delay * (retry + 1)
                     await asyncio.sleep(retry_wait)
-            finally:
-                if session and not session.closed:
-                    await session.close()
-                    session = None
         
         # 如果所有重试都失败了
         raise SwapError(f"获取代币列表失败，已重试{self.max_retries}次。最后的错误: {last_error}")
@@ -175,6 +195,7 @@ class SolanaSwapService:
             raise SwapError(f"获取代币列表失败: {str(e)}")
             
         finally:
+            loop.run_until_complete(HTTPClientRegistry.close())
             loop.close()
 
     def get_quote(self, wallet_id: str, device_id: str, from_token: str, to_token: str, amount: str, slippage: Optional[str] = None) -> Dict[str, Any]:
@@ -219,6 +240,7 @@ class SolanaSwapService:
             raise SwapError(f"获取兑换报价失败: {str(e)}")
             
         finally:
+            loop.run_until_complete(HTTPClientRegistry.close())
             loop.close()
     
     def __init__(self):
@@ -265,20 +287,15 @@ class SolanaSwapService:
         
         # Alchemy RPC 客户端
         self.rpc_client = AsyncClient(RPCConfig.SOLANA_MAINNET_RPC_URL)
+        
+        # 只读查询走节点池，短时间窗口内的调用合并为批量请求
+        self.rpc_batcher = RPCBatcher.for_pool(
+            RPCEndpointPool([RPCConfig.SOLANA_MAINNET_RPC_URL] + RPCConfig.SOLANA_BACKUP_RPC_URLS)
+        )
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """获取或创建 aiohttp 会话"""
-        if self.session is None or self.session.closed:
-            connector = aiohttp.TCPConnector(
-                ssl=False,
-                force_close=True
-            )
-            self.session = aiohttp.ClientSession(
-                timeout=self.timeout,
-                headers=self.headers,
-                connector=connector
-            )
-        return self.session
+        """获取共享的 Jupiter 会话，请求头需在每次请求时传入"""
+        return HTTPClientRegistry.get_session('jupiter')
     
     async def _get_next_api_url(self) -> str:
         """获取下一个可用的 API URL"""
@@ -286,6 +303,12 @@ class SolanaSwapService:
         return self.jup_api_urls[self.current_api_url_index]
     
     async def _get_token_decimals(self, token_address: str) -> int:
+        """获取代币精度，每个代币只从 Moralis 获取一次"""
+        decimals = await TokenDecimals.get('SOL', token_address, lambda: self._fetch_token_decimals(token_address))
+        # 获取失败时默认返回 9 (SOL的精度)
+        return decimals if decimals is not None else 9
+
+    async def _fetch_token_decimals(self, token_address: str) -> Optional[int]:
         """从 Moralis 获取代币精度"""
         try:
             # 使用 Moralis API 获取代币元数据
@@ -295,30 +318,18 @@ class SolanaSwapService:
                 'X-API-Key': MoralisConfig.API_KEY
             }
 
-            async with aiohttp.ClientSession() as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 async with session.get(url, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
-                        return int(data.get('decimals', 9))  # 默认返回 9 (SOL的精度)
+                        if data.get('decimals') is not None:
+                            return int(data['decimals'])
                     else:
                         logger.error(f"获取代币元数据失败: HTTP {response.status}")
-                        # 根据代币地址返回默认精度
-                        if token_address == "So11111111111111111111111111111111111111112":
-                            return 9  # SOL
-                        elif token_address == "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v":
-                            return 6  # USDC
-                        else:
-                            return 9  # 其他代币默认精度为9
 
         except Exception as e:
             logger.error(f"获取代币精度时出错: {str(e)}")
-            # 同样的默认精度处理
-            if token_address == "So11111111111111111111111111111111111111112":
-                return 9
-            elif token_address == "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v":
-                return 6
-            else:
-                return 9
+        return None
 
     async def get_swap_quote(self, 
         from_token: str,
@@ -357,7 +368,7 @@ class SolanaSwapService:
             
             url = f"{self.jup_api_urls[0]}/quote"
             
-            async with session.get(url, params=params) as response:
+            async with session.get(url, params=params, headers=self.headers) as response:
                 response_text = await response.text()
                 
                 if response.status != 200:
@@ -404,9 +415,6 @@ class SolanaSwapService:
                 'message': str(e),
                 'code': 'QUOTE_FAILED'
             }
-        finally:
-            if session and not session.closed:
-                await session.close()
 
     def _check_route_exists(self, route_map: Dict, from_token: str, to_token: str) -> bool:
         """检查是否存在从源代币到目标代币的路由
@@ -537,6 +545,10 @@ class SolanaSwapService:
             logger.error(f"错误类型: {type(e).__name__}")
             # 不抛出异常，因为交易已经成功了
             pass
+        finally:
+            # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+            await PortfolioSnapshot.ainvalidate('SOL', wallet_address)
+            await ResponseETag.abump(ResponseETag.wallet_scope('SOL', wallet_address))
 
     async def execute_swap(self, quote_id: str, from_token: str, to_token: str, amount: str, from_address: str, private_key: str, slippage: Optional[Decimal] = None) -> Dict[str, Any]:
         try:
@@ -568,7 +580,7 @@ class SolanaSwapService:
             logger.debug(f"请求交易 URL: {url}")
             logger.debug(f"交易请求数据: {swap_request}")
             
-            async with session.post(url, json=swap_request) as response:
+            async with session.post(url, json=swap_request, headers=self.headers) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     raise SwapError(f"交易请求失败: {error_text}")
@@ -709,7 +721,7 @@ class SolanaSwapService:
             for attempt in range(max_retries):
                 try:
                     # 使用 getSignatureStatuses 检查交易状态
-                    status_response = await self.rpc_client.get_signature_statuses([signature])
+                    status_response = await self.rpc_batcher.call('getSignatureStatuses', [[signature]], hedge=True)
                     logger.debug(f"状态响应: {status_response}")
                     
                     if status_response and isinstance(status_response, dict):
@@ -771,6 +783,7 @@ class SolanaSwapService:
         try:
             return loop.run_until_complete(self.get_transaction_status(signature))
         finally:
+            loop.run_until_complete(HTTPClientRegistry.close())
             loop.close()
 
     def estimate_fees(self, from_token: str, to_token: str, amount: str, wallet_address: str) -> Dict[str, Any]:
@@ -800,6 +813,7 @@ class SolanaSwapService:
                 )
             )
         finally:
+            loop.run_until_complete(HTTPClientRegistry.close())
             loop.close()
 
     async def _estimate_fees_async(self, from_token: str, to_token: str, amount: str, wallet_address: str) -> Dict[str, Any]:
@@ -943,7 +957,11 @@ class SolanaSwapService:
                 logger.debug(f"账户公钥: {account_pubkey}")
                 
                 # 获取账户信息
-                response = await self.rpc_client.get_account_info(str(account_pubkey))
+                response = await self.rpc_batcher.call(
+                    'getAccountInfo',
+                    [str(account_pubkey), {"encoding": "base64"}],
+                    hedge=True
+                )
                 
                 if response and isinstance(response, dict):
                     value = response.get('result', {}).get('value')
@@ -1015,9 +1033,6 @@ class SolanaSwapService:
         except Exception as e:
             logger.error(f"获取代币价格失败: {str(e)}")
             raise SwapError(f"获取代币价格失败: {str(e)}")
-        finally:
-            if session and not session.closed:
-                await session.close()
 
     def get_token_prices(self, token_addresses: List[str]) -> Dict[str, Any]:
         """获取代币价格信息（同步方法）
@@ -1042,4 +1057,5 @@ class SolanaSwapService:
             raise SwapError(f"获取代币价格失败: {str(e)}")
             
         finally:
+            loop.run_until_complete(HTTPClientRegistry.close())
             loop.close()
\ No newline at end of file
@@ -11,6 +11,8 @@ from django.conf import settings
 
 from ...models import Token, Wallet, Transaction
 from ...services.solana_config import MoralisConfig, RPCConfig, HeliusConfig
+from ...services.http_client import HTTPClientRegistry
+from ...services.gateway import UpstreamGateway
 from datetime import timedelta, datetime
 import async_timeout
 
@@ -30,7 +32,7 @@ class SolanaTokenInfoService:
     async def get_token_metadata(self, address: str) -> Optional[Dict]:
         """获取代币元数据"""
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with HTTPClientRegistry.session('moralis') as session:
                 # 获取代币元数据
                 url = f"{MoralisConfig.SOLANA_URL}/token/mainnet/{address}/metadata"
                 logger.debug(f"请求Moralis API获取代币元数据: {url}")
@@ -68,7 +70,7 @@ class SolanaTokenInfoService:
 
                 # 获取价格数据
                 price_url = f"{MoralisConfig.SOLANA_URL}/token/mainnet/{address}/price"
-                price_response = await self._fetch_with_retry(session, price_url)
+                price_response = await self._fetch_with_retry(session, price_url, coalesce=True)
                 
                 if price_response:
                     try:
@@ -100,40 +102,13 @@ class SolanaTokenInfoService:
         
         logger.info(f"发起请求: {url}")
         
-        for attempt in range(self.max_retries):
-            try:
-                async with getattr(session, method)(url, **kwargs) as response:
-                    response_text = await response.text()
-                    logger.info(f"响应状态码: {response.status}")
-                    
-                    if response.status == 200:
-                        try:
-                            data = json.loads(response_text)
-                            return data
-                        except json.JSONDecodeError as e:
-                            logger.error(f"JSON解析错误: {str(e)}")
-                            return None
-                    elif response.status == 429:  # Rate limit
-                        retry_after = int(response.headers.get('Retry-After', 2))
-                        logger.warning(f"请求频率限制，等待 {retry_after} 秒后重试")
-                        await asyncio.sleep(retry_after)
-                        continue
-                    else:
-                        logger.error(f"请求失败: {url}, 状态码: {response.status}")
-                        return None
-            except Exception as e:
-                if attempt < self.max_retries - 1:
-                    wait_time = 2 * (attempt + 1)
-                    logger.warning(f"请求出错: {str(e)}, {wait_time} 秒后重试")
-                    await asyncio.sleep(wait_time)
-                    continue
-                logger.error(f"请求最终失败: {str(e)}")
-                return None
-        return None
+        return await UpstreamGateway.fetch_json(
+            'moralis', url, method, session=session, max_attempts=self.max_retries, **kwargs
+        )
 
     async def get_token_info(self, token_address: str) -> Dict:
         """获取代币基本信息"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 # 添加详细日志
                 logger.info(f"开始获取代币信息: {token_address}")
@@ -173,7 +148,7 @@ class SolanaTokenInfoService:
                 retry_count = 0
                 while retry_count < max_retries:
                     try:
-                        price_response = await self._fetch_with_retry(session, price_url)
+                        price_response = await self._fetch_with_retry(session, price_url, coalesce=True)
                         logger.info(f"Moralis价格响应 (尝试 {retry_count + 1}): {price_response}")
                         
                         if price_response:
@@ -242,7 +217,7 @@ class SolanaTokenInfoService:
     async def get_token_supply(self, token_address: str) -> Dict:
         """获取代币供应量信息"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with HTTPClientRegistry.session('helius') as session:
                 payload = {
                     "jsonrpc": "2.0",
                     "id": "my-id",
@@ -340,7 +315,7 @@ class SolanaTokenInfoService:
         limit: int = 24
     ) -> Dict:
         """获取代币价格走势图数据"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with HTTPClientRegistry.session('moralis') as session:
             try:
                 logger.debug(f"开始获取代币 {token_address} 的 OHLCV 数据")
                 logger.debug(f"参数: timeframe={timeframe}, currency={currency}, limit={limit}, from_date={from_date}, to_date={to_date}")
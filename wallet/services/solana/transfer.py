@@ -6,7 +6,6 @@ import asyncio
 import aiohttp
 from django.utils import timezone
 import base58
-import time
 
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Commitment
@@ -23,8 +22,14 @@ from spl.token.client import Token
 from ...models import Wallet, Transaction as DBTransaction, Token
 from ...exceptions import InsufficientBalanceError, InvalidAddressError, TransferError
 from ..solana_config import RPCConfig , MoralisConfig
+from ..http_client import HTTPClientRegistry
+from ..gateway import UpstreamGateway
+from ..rpc_pool import RPCBatcher, RPCEndpointPool
+from ..decimals_store import TokenDecimals
+from ..portfolio_cache import PortfolioSnapshot
+from ..etag import ResponseETag
+from ..token_registry import TokenRegistry
 import json
-from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
@@ -34,10 +39,7 @@ class SolanaTransferService:
         """初始化 Solana 转账服务"""
         # 初始化 RPC 配置
         self.primary_rpc_url = RPCConfig.SOLANA_MAINNET_RPC_URL
-        self.backup_rpc_urls = [
-            "https://api.mainnet-beta.solana.com",
-            "https://solana-api.projectserum.com"
-        ]
+        self.backup_rpc_urls = RPCConfig.SOLANA_BACKUP_RPC_URLS
         self.current_rpc_url = self.primary_rpc_url
         self.rpc_url = self.current_rpc_url
         
@@ -69,12 +71,13 @@ class SolanaTransferService:
                     'Alchemy-Web3-Version': '2.0.0'
                 })
         
-        # RPC 节点健康状态
-        self.rpc_health = {
-            'last_check': 0,
-            'check_interval': 300,  # 5分钟检查一次
-            'is_healthy': True
-        }
+        # RPC 节点池，按健康度与延迟选择节点
+        self.rpc_pool = RPCEndpointPool(
+            [self.primary_rpc_url] + self.backup_rpc_urls,
+            headers=self.request_headers
+        )
+        # 短时间窗口内的只读调用合并为批量请求
+        self.rpc_batcher = RPCBatcher.for_pool(self.rpc_pool)
         
         # 设置 aiohttp 会话配置
         self.timeout = aiohttp.ClientTimeout(
@@ -84,81 +87,39 @@ class SolanaTransferService:
             sock_read=10
         )
         
-        # 创建 aiohttp 会话
-        self._session = None
-        self._session_lock = asyncio.Lock()
-        
     async def _get_session(self) -> aiohttp.ClientSession:
-        """获取或创建 aiohttp 会话"""
-        async with self._session_lock:
-            if self._session is None or self._session.closed:
-                connector = aiohttp.TCPConnector(ssl=False)
-                self._session = aiohttp.ClientSession(
-                    connector=connector,
-                    timeout=self.timeout,
-                    headers=self.request_headers
-                )
-            return self._session
+        """获取共享的 RPC 会话"""
+        return HTTPClientRegistry.get_session('solana_rpc')
         
     async def _fetch_with_retry(self, method: str, *args, **kwargs) -> Any:
-        """带重试的 RPC 请求"""
+        """带重试的 RPC 请求
+
+        传入 hedge=True 时，幂等只读方法在主节点响应慢时会对冲到第二个节点。
+        """
         max_retries = kwargs.pop('max_retries', self.max_retries)
         timeout = kwargs.pop('timeout', self.timeout.total)
-        
-        # 构建请求体
+        hedge = kwargs.pop('hedge', False)
         params = kwargs.get('params', [])
-        payload = {
-            "jsonrpc": "2.0",
-            "id": int(time.time() * 1000),  # 使用时间戳作为唯一ID
-            "method": method,
-            "params": params
-        }
 
-        # 添加备用RPC节点
-        rpc_urls = [self.primary_rpc_url] + self.backup_rpc_urls
-        
         for attempt in range(max_retries):
-            for rpc_url in rpc_urls:
-                try:
-                    session = await self._get_session()
-                    async with session.post(
-                        rpc_url,
-                        json=payload,
-                        timeout=timeout
-                    ) as response:
-                        if response.status == 429:  # 速率限制
-                            wait_time = int(response.headers.get('Retry-After', 2 ** attempt))
-                            logger.warning(f"RPC节点 {rpc_url} 触发速率限制,等待 {wait_time} 秒")
-                            await asyncio.sleep(wait_time)
-                            continue
-                            
-                        if response.status == 200:
-                            result = await response.json()
-                            if 'error' in result:
-                                error = result['error']
-                                error_msg = error.get('message', str(error))
-                                
-                                if 'BlockhashNotFound' in error_msg:
-                                    logger.warning(f"区块哈希已过期,重试请求")
-                                    break  # 尝试下一个重试
-                                    
-                                raise TransferError(f"RPC请求失败: {error_msg}")
-                                
-                            return result.get('result')
-                            
-                        logger.error(f"HTTP {response.status}: {await response.text()}")
-                        
-                except asyncio.TimeoutError:
-                    logger.warning(f"RPC节点 {rpc_url} 超时")
-                    continue
+            # 按健康度依次请求各节点，熔断中的节点不参与
+            result = await self.rpc_batcher.call(method, params, hedge=hedge, timeout=timeout)
+            if result is not None:
+                if 'error' not in result:
+                    return result.get('result')
                     
-                except Exception as e:
-                    logger.error(f"请求RPC节点 {rpc_url} 失败: {str(e)}")
-                    continue
+                error = result['error']
+                error_msg = error.get('message', str(error))
+                
+                if 'BlockhashNotFound' not in error_msg:
+                    raise TransferError(f"RPC请求失败: {error_msg}")
+                logger.warning(f"区块哈希已过期,重试请求")
+            else:
+                logger.warning(f"所有RPC节点请求失败: {method}")
                     
-            # 所有节点都失败,等待后重试
-            wait_time = min(2 ** attempt, self.max_delay)
-            logger.warning(f"所有RPC节点请求失败,等待 {wait_time} 秒后重试")
+            # 退避后重试
+            wait_time = UpstreamGateway.backoff_delay(attempt, cap=self.max_delay)
+            logger.warning(f"等待 {wait_time:.2f} 秒后重试")
             await asyncio.sleep(wait_time)
         
         raise TransferError("多次重试后仍无法完成RPC请求")
@@ -231,6 +192,9 @@ class SolanaTransferService:
                     'timestamp': timezone.now().isoformat()
                 }
             
+            # 各 RPC 节点的延迟、错误率与熔断状态
+            health_status['rpc_endpoints'] = self.rpc_pool.health()
+            
             return health_status
             
         except Exception as e:
@@ -264,92 +228,65 @@ class SolanaTransferService:
             raise TransferError("Failed to get wallet keypair")
 
     async def _get_token_decimals(self, token_address: str) -> int:
-        """获取代币精度"""
-        try:
-            # 使用缓存键
-            cache_key = f"solana_token_decimals_{token_address}"
-            
-            # 首先尝试从缓存获取
-            cached_decimals = cache.get(cache_key)
-            if cached_decimals is not None:
-                logger.info(f"从缓存获取代币精度: {token_address} = {cached_decimals}")
-                return cached_decimals
+        """获取代币精度（缓存、数据库都没有时从 Moralis 或链上获取一次）"""
+        decimals = await TokenDecimals.get('SOL', token_address, lambda: self._fetch_token_decimals(token_address))
+        if decimals is None:
+            raise TransferError(f"无法获取代币 {token_address} 的精度")
+        return decimals
 
-            # 从数据库获取代币信息
-            try:
-                token = await Token.objects.aget(chain='SOL', address=token_address)
-                if token and token.decimals is not None:
-                    logger.info(f"从数据库获取代币精度: {token_address} = {token.decimals}")
-                    cache.set(cache_key, token.decimals, timeout=3600)  # 缓存1小时
-                    return token.decimals
-            except Token.DoesNotExist:
-                logger.warning(f"数据库中未找到代币: {token_address}")
-            
-            # 从 Moralis API 获取
-            try:
-                url = MoralisConfig.SOLANA_TOKEN_METADATA_URL.format(token_address)
-                headers = {
-                    'accept': 'application/json',
-                    'X-API-Key': MoralisConfig.API_KEY
-                }
-                
-                session = await self._get_session()
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'decimals' in data:
-                            decimals = int(data['decimals'])
-                            logger.info(f"从 Moralis 获取代币精度: {token_address} = {decimals}")
-                            # 更新数据库
-                            await Token.objects.aupdate_or_create(
-                                chain='SOL',
-                                address=token_address,
-                                defaults={
-                                    'decimals': decimals,
-                                    'name': data.get('name', ''),
-                                    'symbol': data.get('symbol', ''),
-                                    'logo': data.get('logo', '')
-                                }
-                            )
-                            cache.set(cache_key, decimals, timeout=3600)
-                            return decimals
-                    else:
-                        logger.warning(f"Moralis API 请求失败: {response.status}")
-                    
-            except Exception as e:
-                logger.warning(f"从 Moralis 获取代币精度失败: {str(e)}")
+    async def _fetch_token_decimals(self, token_address: str) -> Optional[int]:
+        """从 Moralis 获取代币精度，失败时从链上获取"""
+        # 从 Moralis API 获取
+        try:
+            url = MoralisConfig.SOLANA_TOKEN_METADATA_URL.format(token_address)
+            headers = {
+                'accept': 'application/json',
+                'X-API-Key': MoralisConfig.API_KEY
+            }
             
-            # 从链上获取
-            try:
-                # 使用 getTokenSupply 获取代币信息
-                response = await self._fetch_with_retry(
-                    'getTokenSupply',
-                    params=[token_address]
-                )
-                
-                if response and isinstance(response, dict):
-                    value = response.get('value', {})
-                    if isinstance(value, dict) and 'decimals' in value:
-                        decimals = int(value['decimals'])
-                        logger.info(f"从链上获取代币精度: {token_address} = {decimals}")
+            session = HTTPClientRegistry.get_session('moralis')
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if 'decimals' in data:
+                        decimals = int(data['decimals'])
+                        logger.info(f"从 Moralis 获取代币精度: {token_address} = {decimals}")
                         # 更新数据库
                         await Token.objects.aupdate_or_create(
                             chain='SOL',
                             address=token_address,
-                            defaults={'decimals': decimals}
+                            defaults={
+                                'decimals': decimals,
+                                'name': data.get('name', ''),
+                                'symbol': data.get('symbol', ''),
+                                'logo': data.get('logo', '')
+                            }
                         )
-                        cache.set(cache_key, decimals, timeout=3600)
                         return decimals
-                    
-            except Exception as e:
-                logger.warning(f"从链上获取代币精度失败: {str(e)}")
-            
-            # 如果所有方法都失败，抛出异常
-            raise TransferError(f"无法获取代币 {token_address} 的精度")
+                else:
+                    logger.warning(f"Moralis API 请求失败: {response.status}")
+                
+        except Exception as e:
+            logger.warning(f"从 Moralis 获取代币精度失败: {str(e)}")
+        
+        # 从链上获取
+        try:
+            # 使用 getTokenSupply 获取代币信息
+            response = await self._fetch_with_retry(
+                'getTokenSupply',
+                params=[token_address]
+            )
             
+            if response and isinstance(response, dict):
+                value = response.get('value', {})
+                if isinstance(value, dict) and 'decimals' in value:
+                    decimals = int(value['decimals'])
+                    logger.info(f"从链上获取代币精度: {token_address} = {decimals}")
+                    return decimals
+                
         except Exception as e:
-            logger.error(f"获取代币精度失败: {str(e)}")
-            raise TransferError(f"获取代币精度失败: {str(e)}")
+            logger.warning(f"从链上获取代币精度失败: {str(e)}")
+        return None
 
     async def _get_associated_token_address(self, wallet_address: str, token_address: str) -> str:
         """获取关联代币账户地址"""
@@ -375,6 +312,7 @@ class SolanaTransferService:
             logger.debug(f"检查账户 {account_address} 是否存在")
             response = await self._fetch_with_retry(
                 'getAccountInfo',
+                hedge=True,
                 params=[
                     account_address,
                     {
@@ -723,17 +661,16 @@ class SolanaTransferService:
     async def _get_token_info(self, token_address: str) -> Dict[str, Any]:
         """获取代币信息"""
         try:
-            # 从数据库获取代币信息
-            try:
-                token = await Token.objects.aget(chain='SOL', address=token_address)
+            # 从代币注册表获取代币信息（下面会自行从链上获取，不需要后台补充）
+            token = await TokenRegistry.get('SOL', token_address, fill_missing=False)
+            if token:
                 return {
-                    'name': token.name,
-                    'symbol': token.symbol,
-                    'decimals': token.decimals,
+                    'name': token['name'],
+                    'symbol': token['symbol'],
+                    'decimals': token['decimals'],
                     'mint': token_address
                 }
-            except Token.DoesNotExist:
-                logger.warning(f"代币 {token_address} 在数据库中不存在")
+            logger.warning(f"代币 {token_address} 在代币注册表中不存在")
             
             # 如果数据库中没有，从链上获取
             response = await self._fetch_with_retry(
@@ -1006,7 +943,8 @@ class SolanaTransferService:
                     response = await self._fetch_with_retry(
                         'getSignatureStatuses',
                         params=[[tx_hash]],
-                        max_retries=1
+                        max_retries=1,
+                        hedge=True
                     )
                     
                     if response and isinstance(response, dict):
@@ -1093,12 +1031,15 @@ class SolanaTransferService:
             logger.error(f"错误类型: {type(e).__name__}")
             # 不抛出异常，因为交易已经成功了
             pass
+        finally:
+            # 交易记录写入后再使缓存失效，避免并发轮询把旧的交易记录缓存到新的 ETag 版本下
+            await PortfolioSnapshot.ainvalidate('SOL', wallet_address)
+            await ResponseETag.abump(ResponseETag.wallet_scope('SOL', wallet_address))
 
     async def __aenter__(self):
         """异步上下文管理器入口"""
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """异步上下文管理器退出"""
-        if self._session and not self._session.closed:
-            await self._session.close()
\ No newline at end of file
+        """异步上下文管理器退出，共享会话由 HTTPClientRegistry 统一关闭"""
+        pass
\ No newline at end of file
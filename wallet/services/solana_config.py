@@ -16,6 +16,15 @@ class RPCConfig:
         f'https://solana-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}' if ALCHEMY_API_KEY else 
         'https://api.mainnet-beta.solana.com'
     )
+    # 备用 Solana 主网节点，逗号分隔
+    SOLANA_BACKUP_RPC_URLS = [
+        url.strip() for url in os.getenv(
+            'SOLANA_BACKUP_RPC_URLS',
+            'https://api.mainnet-beta.solana.com,https://solana-api.projectserum.com'
+        ).split(',') if url.strip()
+    ]
+    # 钱包余额数据源：moralis、rpc（getTokenAccountsByOwner，失败时退回 Moralis）或 auto（按最近延迟选择）
+    SOLANA_BALANCE_BACKEND: str = os.getenv('SOLANA_BALANCE_BACKEND', 'auto').lower()
     SOLANA_TESTNET_RPC_URL: str = os.getenv('SOLANA_TESTNET_RPC_URL', 'https://api.testnet.solana.com')
     SOLANA_DEVNET_RPC_URL: str = os.getenv('SOLANA_DEVNET_RPC_URL', 'https://api.devnet.solana.com')
     
@@ -56,6 +65,11 @@ class MoralisConfig:
     SOLANA_SWAP_QUOTE_URL: str = f"{SOLANA_URL}/swap/mainnet/quote"  # 获取 swap 报价
     SOLANA_SWAP_EXECUTE_URL: str = f"{SOLANA_URL}/swap/mainnet/execute"  # 执行 swap 交易
 
+class JupiterConfig:
+    """Jupiter API 配置"""
+    PRICE_URL: str = os.getenv('JUPITER_PRICE_URL', 'https://api.jup.ag/price/v2')  # 批量获取代币价格（ids=逗号分隔）
+    PRICE_BATCH_SIZE: int = 100  # 每次请求最多的代币数量
+
 class HeliusConfig:
     """Helius API 配置"""
     API_KEY = os.getenv('HELIUS_API_KEY')
@@ -71,6 +85,10 @@ class HeliusConfig:
     # 转账记录接口
     TRANSACTIONS_URL = f"{BASE_URL}/addresses/{{address}}/transactions"  # 使用 transactions 端点
     
+    # 代币元数据接口（POST mintAccounts）
+    TOKEN_METADATA_URL = f"{BASE_URL}/token-metadata"
+    TOKEN_METADATA_BATCH_SIZE = 100  # 每次请求最多的代币数量
+    
     @classmethod
     def get_rpc_url(cls) -> str:
         """获取 RPC URL"""
@@ -0,0 +1,554 @@
+"""代币元数据注册表（进程内 + Redis + Token 表）"""
+import asyncio
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db.models import Q
+from web3 import Web3
+
+from ..models import Token
+from .cache import METADATA_CACHE
+from .evm_config import MoralisConfig as EVMMoralisConfig
+from .evm.multicall import Multicall3
+from .gateway import UpstreamGateway
+from .solana_config import HeliusConfig, MoralisConfig as SolanaMoralisConfig
+
+logger = logging.getLogger(__name__)
+
+TokenMeta = Dict[str, Any]
+
+
+class TokenRegistry:
+    """统一的代币元数据查询入口
+
+    依次查找进程内 LRU、Redis（METADATA_CACHE 命名空间）、Token 表和内置代币列表，
+    命中后回填上一级。都没有的代币在后台从上游补充（EVM：Moralis 批量元数据接口，
+    Moralis 没有的再通过 Multicall3 读取合约；Solana：Helius 批量元数据接口，
+    Helius 没有的再通过 Moralis 元数据接口），
+    补充完成前调用方按未知代币处理。
+
+    首次查询数据库时预热推荐和已验证的代币。
+    返回的元数据格式统一为 address、name、symbol、decimals、logo、thumbnail、verified、is_native。
+    """
+
+    CHAIN_SOLANA = 'SOL'
+
+    L1_TTL = 600
+    L1_MAX_ENTRIES = 20000
+    L2_TTL = 24 * 3600
+    # 上游也没有的代币，在这段时间内不再请求
+    MISSING_TTL = 600
+
+    EVM_METADATA_BATCH_SIZE = 10
+    MAX_CONCURRENCY = 8
+
+    KEY_PREFIX = 'token:'
+
+    # 数据库中可能没有的常见代币
+    BUILTIN_TOKENS: Dict[str, Dict[str, TokenMeta]] = {
+        'SOL': {
+            'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': {
+                'name': 'USD Coin',
+                'symbol': 'USDC',
+                'decimals': 6,
+                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v/logo.png'
+            },
+            'DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263': {
+                'name': 'Bonk',
+                'symbol': 'BONK',
+                'decimals': 5,
+                'logo': 'https://d23exngyjlavgo.cloudfront.net/solana_DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263'
+            },
+            'So11111111111111111111111111111111111111112': {
+                'name': 'Solana',
+                'symbol': 'SOL',
+                'decimals': 9,
+                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/So11111111111111111111111111111111111111112/logo.png'
+            },
+            'EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm': {
+                'name': 'dogwifhat',
+                'symbol': '$WIF',
+                'decimals': 6,
+                'logo': 'https://s2.coinmarketcap.com/static/img/coins/64x64/24484.png'
+            },
+            'mSoLzYCxHdYgdzU16g5QSh3i5K3z3KZK7ytfqcJm7So': {
+                'name': 'Marinade staked SOL',
+                'symbol': 'mSOL',
+                'decimals': 9,
+                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/mSoLzYCxHdYgdzU16g5QSh3i5K3z3KZK7ytfqcJm7So/logo.png'
+            },
+            'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB': {
+                'name': 'USDT',
+                'symbol': 'USDT',
+                'decimals': 6,
+                'logo': 'https://s2.coinmarketcap.com/static/img/coins/64x64/825.png'
+            }
+        }
+    }
+
+    # key -> (meta, expires_at)
+    _l1: 'OrderedDict[str, Tuple[TokenMeta, float]]' = OrderedDict()
+    # key -> until
+    _missing: 'OrderedDict[str, float]' = OrderedDict()
+    _warmed = False
+    _filling: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Set[str]]' = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """EVM 地址不区分大小写，Solana 地址区分大小写"""
+        return address.lower() if address.startswith('0x') else address
+
+    @classmethod
+    def make_key(cls, chain: str, address: str) -> str:
+        return f"{chain.upper()}:{cls.normalize_address(address)}"
+
+    @classmethod
+    async def get(cls, chain: str, address: str, fill_missing: bool = True) -> Optional[TokenMeta]:
+        """获取单个代币的元数据，未知代币返回 None"""
+        return (await cls.get_many(chain, [address], fill_missing=fill_missing)).get(address)
+
+    @classmethod
+    async def get_many(
+        cls,
+        chain: str,
+        addresses: Iterable[str],
+        fill_missing: bool = True
+    ) -> Dict[str, TokenMeta]:
+        """批量获取代币元数据
+
+        Args:
+            chain: 链标识
+            addresses: 代币地址列表
+            fill_missing: 是否在后台从上游补充未知代币
+
+        Returns:
+            Dict[str, TokenMeta]: 代币地址到元数据的映射，未知代币不在结果中
+        """
+        addresses = [address for address in dict.fromkeys(addresses) if address]
+        result = cls._get_l1_many(chain, addresses)
+        missing = [address for address in addresses if address not in result]
+        if missing:
+            result.update(await sync_to_async(cls._load_stored)(chain, missing))
+            missing = [
+                address for address in missing
+                if address not in result and not cls._is_missing(cls.make_key(chain, address))
+            ]
+            if missing and fill_missing:
+                cls._fill_in_background(chain, missing)
+        return result
+
+    @classmethod
+    def get_many_sync(
+        cls,
+        chain: str,
+        addresses: Iterable[str],
+        fetch_missing: bool = False
+    ) -> Dict[str, TokenMeta]:
+        """同步代码中批量获取代币元数据
+
+        Args:
+            chain: 链标识
+            addresses: 代币地址列表
+            fetch_missing: 是否同步从上游批量获取未知代币，默认只查缓存、数据库和内置列表
+
+        Returns:
+            Dict[str, TokenMeta]: 代币地址到元数据的映射，未知代币不在结果中
+        """
+        addresses = [address for address in dict.fromkeys(addresses) if address]
+        result = cls._get_l1_many(chain, addresses)
+        missing = [address for address in addresses if address not in result]
+        if missing:
+            result.update(cls._load_stored(chain, missing))
+            missing = [
+                address for address in missing
+                if address not in result and not cls._is_missing(cls.make_key(chain, address))
+            ]
+            if missing and fetch_missing:
+                fetched = async_to_sync(cls.fetch_missing)(chain, missing)
+                result.update({address: cls._for_address(meta, address) for address, meta in fetched.items()})
+        return result
+
+    @classmethod
+    async def fetch_missing(cls, chain: str, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """从上游获取代币元数据并写入注册表
+
+        Returns:
+            Dict[str, TokenMeta]: 获取到的代币元数据，上游也没有的代币记录一段时间不再请求
+        """
+        try:
+            if chain.upper() == cls.CHAIN_SOLANA:
+                fetched = await cls._fetch_solana(addresses)
+            else:
+                fetched = await cls._fetch_evm(chain, addresses)
+        except Exception as e:
+            logger.error(f"从上游获取 {chain} 代币元数据失败: {str(e)}")
+            fetched = {}
+
+        await cls.aset_many(chain, fetched)
+        now = time.time()
+        for address in addresses:
+            if address not in fetched:
+                cls._set_missing(cls.make_key(chain, address), now + cls.MISSING_TTL)
+        return fetched
+
+    @classmethod
+    def set_many(cls, chain: str, entries: Dict[str, TokenMeta]) -> None:
+        """写入代币元数据，Redis 一次写入"""
+        METADATA_CACHE.set_many(cls._set_l1_many(chain, entries), cls.L2_TTL)
+
+    @classmethod
+    async def aset_many(cls, chain: str, entries: Dict[str, TokenMeta]) -> None:
+        await METADATA_CACHE.aset_many(cls._set_l1_many(chain, entries), cls.L2_TTL)
+
+    @classmethod
+    def _set_l1_many(cls, chain: str, entries: Dict[str, TokenMeta]) -> Dict[str, TokenMeta]:
+        """写入进程内缓存，返回需要写入 Redis 的键值"""
+        expires_at = time.time() + cls.L1_TTL
+        stored = {}
+        for address, meta in entries.items():
+            key = cls.make_key(chain, address)
+            cls._set_l1(key, meta, expires_at)
+            cls._missing.pop(key, None)
+            stored[cls.KEY_PREFIX + key] = meta
+        return stored
+
+    @classmethod
+    def invalidate(cls, chain: str, address: str) -> None:
+        """代币信息在数据库中更新后调用"""
+        key = cls.make_key(chain, address)
+        cls._l1.pop(key, None)
+        METADATA_CACHE.delete(cls.KEY_PREFIX + key)
+
+    @classmethod
+    def warm_up(cls) -> int:
+        """预热推荐和已验证的代币
+
+        Returns:
+            int: 预热的代币数量
+        """
+        by_chain: Dict[str, Dict[str, TokenMeta]] = {}
+        for token in Token.objects.filter(Q(is_recommended=True) | Q(is_verified=True)):
+            by_chain.setdefault(token.chain, {})[token.address] = cls._from_token(token)
+        for chain, entries in by_chain.items():
+            cls.set_many(chain, entries)
+        count = sum(len(entries) for entries in by_chain.values())
+        logger.info(f"代币注册表预热完成，共 {count} 个代币")
+        return count
+
+    @classmethod
+    def _load_stored(cls, chain: str, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """依次从 Redis、Token 表、内置列表读取（同步，涉及数据库）"""
+        if not cls._warmed:
+            cls._warmed = True
+            try:
+                cls.warm_up()
+            except Exception as e:
+                logger.warning(f"代币注册表预热失败: {str(e)}")
+
+        result: Dict[str, TokenMeta] = {}
+        expires_at = time.time() + cls.L1_TTL
+
+        # Redis
+        keys = {cls.KEY_PREFIX + cls.make_key(chain, address): address for address in addresses}
+        for full_key, meta in METADATA_CACHE.get_many(list(keys)).items():
+            address = keys[full_key]
+            cls._set_l1(full_key[len(cls.KEY_PREFIX):], meta, expires_at)
+            result[address] = cls._for_address(meta, address)
+
+        # Token 表
+        missing = [address for address in addresses if address not in result]
+        if missing:
+            by_key = {cls.make_key(chain, address): address for address in missing}
+            found = {}
+            # 排除 toggle_token_visibility 创建的占位记录（symbol 为空、decimals 为默认值）
+            stored = Token.objects.filter(chain=chain, address__in=cls._address_variants(missing)).exclude(symbol='')
+            for token in stored:
+                address = by_key.get(cls.make_key(chain, token.address))
+                if address:
+                    found[address] = cls._from_token(token)
+            cls.set_many(chain, found)
+            result.update({address: cls._for_address(meta, address) for address, meta in found.items()})
+
+        # 内置列表
+        builtin = cls.BUILTIN_TOKENS.get(chain.upper(), {})
+        for address in addresses:
+            if address not in result and address in builtin:
+                result[address] = {
+                    'address': address,
+                    'thumbnail': '',
+                    'verified': True,
+                    'is_native': False,
+                    **builtin[address]
+                }
+        return result
+
+    @classmethod
+    def _fill_in_background(cls, chain: str, addresses: List[str]) -> None:
+        """后台补充未知代币，同一事件循环内同一代币只补充一次"""
+        loop = asyncio.get_running_loop()
+        filling = cls._filling.get(loop)
+        if filling is None:
+            filling = set()
+            cls._filling[loop] = filling
+
+        keys = {cls.make_key(chain, address): address for address in addresses}
+        pending = {key: address for key, address in keys.items() if key not in filling}
+        if not pending:
+            return
+        filling.update(pending)
+
+        async def fill() -> None:
+            try:
+                await cls.fetch_missing(chain, list(pending.values()))
+            except Exception as e:
+                logger.warning(f"后台补充代币元数据失败: {str(e)}")
+            finally:
+                filling.difference_update(pending)
+
+        loop.create_task(fill())
+
+    @classmethod
+    async def _fetch_evm(cls, chain: str, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """Moralis 批量元数据接口，没有结果的代币通过 Multicall3 读取合约"""
+        params_base = {'chain': EVMMoralisConfig.get_chain_id(chain)}
+        batches = [
+            addresses[i:i + cls.EVM_METADATA_BATCH_SIZE]
+            for i in range(0, len(addresses), cls.EVM_METADATA_BATCH_SIZE)
+        ]
+        responses = await cls._gather_bounded([
+            UpstreamGateway.fetch_json(
+                'moralis',
+                EVMMoralisConfig.EVM_TOKEN_METADATA_URL,
+                headers=EVMMoralisConfig.get_headers(),
+                params={**params_base, 'addresses': batch}
+            )
+            for batch in batches
+        ])
+
+        by_address = {address.lower(): address for address in addresses}
+        result: Dict[str, TokenMeta] = {}
+        for response in responses:
+            if not isinstance(response, list):
+                continue
+            for item in response:
+                if not isinstance(item, dict):
+                    continue
+                address = by_address.get(str(item.get('address', '')).lower())
+                if address and item.get('symbol'):
+                    result[address] = {
+                        'address': address,
+                        'name': item.get('name') or '',
+                        'symbol': item.get('symbol') or '',
+                        'decimals': int(item.get('decimals') or 18),
+                        'logo': item.get('logo') or '',
+                        'thumbnail': item.get('thumbnail') or '',
+                        'verified': bool(item.get('verified_contract', False)),
+                        'is_native': False
+                    }
+
+        missing = [address for address in addresses if address not in result]
+        if missing:
+            multicall = Multicall3.for_chain(chain)
+            contract_results = await cls._gather_bounded([multicall.read_erc20(address) for address in missing])
+            for address, data in zip(missing, contract_results):
+                if data and data.get('symbol') and data.get('decimals') is not None:
+                    result[address] = {
+                        'address': address,
+                        'name': data.get('name') or '',
+                        'symbol': data['symbol'],
+                        'decimals': int(data['decimals']),
+                        'logo': '',
+                        'thumbnail': '',
+                        'verified': False,
+                        'is_native': False
+                    }
+        return result
+
+    @classmethod
+    async def _fetch_solana(cls, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """优先使用 Helius 批量元数据接口，没有结果的代币再通过 Moralis 逐个获取"""
+        result = await cls._fetch_helius(addresses) if HeliusConfig.API_KEY else {}
+        missing = [address for address in addresses if address not in result]
+        if missing:
+            result.update(await cls._fetch_moralis_solana(missing))
+        return result
+
+    @classmethod
+    async def _fetch_helius(cls, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """Helius token-metadata 接口，每次最多 TOKEN_METADATA_BATCH_SIZE 个代币"""
+        batches = [
+            addresses[i:i + HeliusConfig.TOKEN_METADATA_BATCH_SIZE]
+            for i in range(0, len(addresses), HeliusConfig.TOKEN_METADATA_BATCH_SIZE)
+        ]
+        responses = await cls._gather_bounded([
+            UpstreamGateway.fetch_json(
+                'helius',
+                HeliusConfig.TOKEN_METADATA_URL,
+                method='post',
+                params={'api-key': HeliusConfig.API_KEY},
+                json={'mintAccounts': batch, 'includeOffChain': True}
+            )
+            for batch in batches
+        ])
+
+        result: Dict[str, TokenMeta] = {}
+        for response in responses:
+            if not isinstance(response, list):
+                continue
+            for item in response:
+                if not isinstance(item, dict) or item.get('account') not in addresses:
+                    continue
+                meta = cls._from_helius(item)
+                if meta:
+                    result[item['account']] = meta
+        return result
+
+    @staticmethod
+    def _from_helius(item: Dict[str, Any]) -> Optional[TokenMeta]:
+        """合并 Helius 返回的链上、链下和旧版 token list 元数据"""
+        legacy = item.get('legacyMetadata') or {}
+        on_chain = ((item.get('onChainMetadata') or {}).get('metadata') or {}).get('data') or {}
+        off_chain = (item.get('offChainMetadata') or {}).get('metadata') or {}
+        parsed = (((item.get('onChainAccountInfo') or {}).get('accountInfo') or {})
+                  .get('data') or {}).get('parsed') or {}
+        decimals = (parsed.get('info') or {}).get('decimals', legacy.get('decimals'))
+
+        symbol = (legacy.get('symbol') or on_chain.get('symbol') or off_chain.get('symbol') or '').strip('\x00 ')
+        if not symbol or decimals is None:
+            return None
+        return {
+            'address': item['account'],
+            'name': (legacy.get('name') or on_chain.get('name') or off_chain.get('name') or '').strip('\x00 '),
+            'symbol': symbol,
+            'decimals': int(decimals),
+            'logo': legacy.get('logoURI') or off_chain.get('image') or '',
+            'thumbnail': '',
+            'verified': bool(legacy),
+            'is_native': False
+        }
+
+    @classmethod
+    async def _fetch_moralis_solana(cls, addresses: List[str]) -> Dict[str, TokenMeta]:
+        """Moralis 元数据接口，有限并发逐个获取"""
+        headers = {
+            "accept": "application/json",
+            "X-API-Key": SolanaMoralisConfig.API_KEY
+        }
+        responses = await cls._gather_bounded([
+            UpstreamGateway.fetch_json(
+                'moralis',
+                SolanaMoralisConfig.SOLANA_TOKEN_METADATA_URL.format(address),
+                headers=headers,
+                coalesce=True
+            )
+            for address in addresses
+        ])
+
+        result: Dict[str, TokenMeta] = {}
+        for address, item in zip(addresses, responses):
+            if not isinstance(item, dict) or not item.get('symbol'):
+                continue
+            result[address] = {
+                'address': address,
+                'name': item.get('name') or '',
+                'symbol': item.get('symbol') or '',
+                'decimals': int(item.get('decimals') or 9),
+                'logo': item.get('logo') or '',
+                'thumbnail': item.get('thumbnail') or '',
+                'verified': False,
+                'is_native': False
+            }
+        return result
+
+    @classmethod
+    async def _gather_bounded(cls, coroutines: List[Any]) -> List[Any]:
+        """限制并发数执行，单个失败返回 None"""
+        semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+
+        async def run(coroutine):
+            async with semaphore:
+                try:
+                    return await coroutine
+                except Exception as e:
+                    logger.warning(f"获取代币元数据失败: {str(e)}")
+                    return None
+
+        return await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+    @staticmethod
+    def _from_token(token: Token) -> TokenMeta:
+        return {
+            'address': token.address,
+            'name': token.name,
+            'symbol': token.symbol,
+            'decimals': token.decimals,
+            'logo': token.logo or '',
+            'thumbnail': token.thumbnail or '',
+            'verified': token.is_verified,
+            'is_native': token.is_native
+        }
+
+    @staticmethod
+    def _for_address(meta: TokenMeta, address: str) -> TokenMeta:
+        """返回的 address 与调用方传入的一致（EVM 地址大小写可能不同）"""
+        if meta.get('address') == address:
+            return meta
+        return {**meta, 'address': address}
+
+    @staticmethod
+    def _address_variants(addresses: List[str]) -> List[str]:
+        """数据库中 EVM 地址可能是小写或校验和格式"""
+        variants = set()
+        for address in addresses:
+            variants.add(address)
+            if address.startswith('0x'):
+                variants.add(address.lower())
+                try:
+                    variants.add(Web3.to_checksum_address(address))
+                except ValueError:
+                    pass
+        return list(variants)
+
+    @classmethod
+    def _get_l1_many(cls, chain: str, addresses: List[str]) -> Dict[str, TokenMeta]:
+        now = time.time()
+        result = {}
+        for address in addresses:
+            key = cls.make_key(chain, address)
+            entry = cls._l1.get(key)
+            if entry is None:
+                continue
+            if now >= entry[1]:
+                cls._l1.pop(key, None)
+                continue
+            cls._l1.move_to_end(key)
+            result[address] = cls._for_address(entry[0], address)
+        return result
+
+    @classmethod
+    def _set_l1(cls, key: str, meta: TokenMeta, expires_at: float) -> None:
+        cls._l1[key] = (meta, expires_at)
+        cls._l1.move_to_end(key)
+        while len(cls._l1) > cls.L1_MAX_ENTRIES:
+            cls._l1.popitem(last=False)
+
+    @classmethod
+    def _is_missing(cls, key: str) -> bool:
+        until = cls._missing.get(key)
+        if until is None:
+            return False
+        if time.time() >= until:
+            cls._missing.pop(key, None)
+            return False
+        return True
+
+    @classmethod
+    def _set_missing(cls, key: str, until: float) -> None:
+        cls._missing[key] = until
+        cls._missing.move_to_end(key)
+        while len(cls._missing) > cls.L1_MAX_ENTRIES:
+            cls._missing.popitem(last=False)
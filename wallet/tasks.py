@@ -0,0 +1,23 @@
+"""Celery 定时任务"""
+import asyncio
+import logging
+
+from celery import shared_task
+
+from .services.cache_warmer import CacheWarmer
+from .services.http_client import HTTPClientRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def warm_hot_token_caches():
+    """预热热门代币的价格和元数据缓存"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(CacheWarmer.run())
+    except Exception as e:
+        logger.error(f"热门代币缓存预热失败: {str(e)}")
+    finally:
+        loop.run_until_complete(HTTPClientRegistry.close())
+        loop.close()
@@ -22,6 +22,9 @@ from ..models import Wallet, PaymentPassword, Token, Transaction
 from ..serializers import WalletSerializer
 from ..services.factory import ChainServiceFactory
 from ..services.evm.utils import EVMUtils
+from ..services.portfolio_cache import PortfolioSnapshot
+from ..services.etag import ResponseETag
+from ..services.portfolio_stream import PortfolioStream
 from django.db.models.functions import Cast
 from django.db.models import CharField
 from django.db.models import Q
@@ -212,6 +215,13 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
                         'message': '该接口仅支持EVM链钱包'
                     }, status=status.HTTP_400_BAD_REQUEST)
                 
+                # 资产快照未变化时直接返回 304
+                refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+                if not refresh:
+                    etag = await PortfolioSnapshot.aget_etag(wallet.chain, wallet.address)
+                    if ResponseETag.matches(request, etag):
+                        return ResponseETag.not_modified(etag)
+
                 # 获取余额服务
                 logger.debug("获取余额服务")
                 balance_service = ChainServiceFactory.get_balance_service(wallet.chain)
@@ -222,19 +232,24 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
                         'message': 'EVM余额服务不可用'
                     }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
                 
-                # 获取代币余额
+                # 获取代币余额，默认使用资产快照，refresh=true 时强制刷新
                 logger.debug(f"开始获取代币余额: {wallet.address}")
                 try:
-                    result = await balance_service.get_all_token_balances(wallet.address, include_hidden=False)
+                    result, etag = await PortfolioSnapshot.get_or_load(
+                        wallet.chain,
+                        wallet.address,
+                        lambda: balance_service.get_all_token_balances(wallet.address, include_hidden=False),
+                        refresh=refresh
+                    )
                     logger.debug(f"成功获取代币余额: {result}")
                 except Exception as balance_error:
                     logger.error(f"获取代币余额失败: {str(balance_error)}")
                     raise
                 
-                return Response({
+                return ResponseETag.attach(Response({
                     'status': 'success',
                     'data': result
-                })
+                }), etag)
                 
             except Exception as e:
                 logger.error(f"获取代币余额失败: {str(e)}")
@@ -245,6 +260,43 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
 
         return async_to_sync(async_tokens)()
 
+    @action(detail=True, methods=['get'], url_path='tokens/stream')
+    @async_to_sync_api
+    async def tokens_stream(self, request: Any, pk: Union[int, str]) -> Any:
+        """流式获取 EVM 钱包的所有代币余额
+
+        依次写出原生代币、每个价格解析完成的代币，最后写出总价值。
+        transport=sse 时使用 Server-Sent Events，默认 NDJSON；refresh=true 时强制刷新。
+        """
+        try:
+            device_id: Optional[str] = request.query_params.get('device_id')
+            if not device_id:
+                return Response({
+                    'status': 'error',
+                    'message': '缺少device_id参数'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            wallet = await self.get_wallet_async(pk, device_id)
+            if wallet.chain not in EVMUtils.CHAIN_CONFIG:
+                return Response({
+                    'status': 'error',
+                    'message': '该接口仅支持EVM链钱包'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            balance_service = ChainServiceFactory.get_balance_service(wallet.chain)
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+            return PortfolioStream.response(
+                PortfolioStream.wallet_frames(wallet.chain, wallet.address, balance_service, refresh=refresh),
+                PortfolioStream.get_transport(request)
+            )
+
+        except Exception as e:
+            logger.error(f"流式获取代币余额失败: {str(e)}")
+            return Response({
+                'status': 'error',
+                'message': f'获取代币余额失败: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['post'])
     @async_to_sync_api
     @verify_payment_password()
@@ -619,6 +671,16 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
                     'message': '不支持的链类型'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
+            # 交易记录未变化时直接返回 304
+            etag = await ResponseETag.aversion_etag(
+                'token_transfers',
+                [ResponseETag.wallet_scope(wallet.chain, wallet.address)],
+                page,
+                page_size
+            )
+            if ResponseETag.matches(request, etag):
+                return ResponseETag.not_modified(etag)
+
             # 定义同步函数来处理数据库操作
             @sync_to_async
             def get_transfers():
@@ -660,7 +722,7 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
             # 获取转账记录
             total_count, transfer_list = await get_transfers()
 
-            return Response({
+            return ResponseETag.attach(Response({
                 'status': 'success',
                 'data': {
                     'total': total_count,
@@ -668,7 +730,7 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
                     'page_size': page_size,
                     'transfers': transfer_list
                 }
-            })
+            }), etag)
             
         except Exception as e:
             logger.error(f"获取代币转账记录失败: {str(e)}")
@@ -1053,6 +1115,7 @@ class EVMWalletViewSet(viewsets.ModelViewSet):
                 )
                 token.is_visible = not token.is_visible
                 await sync_to_async(token.save)()
+                await PortfolioSnapshot.ainvalidate(wallet.chain, wallet.address)
                 
                 return Response({
                     'status': 'success',
@@ -8,8 +8,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import JSONParser
 from rest_framework.authentication import SessionAuthentication, BasicAuthentication
-import aiohttp
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from rest_framework.views import APIView
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -17,8 +16,11 @@ from drf_yasg import openapi
 from ..models import Wallet, NFTCollection
 from ..serializers import WalletSerializer
 from ..services.solana_config import HeliusConfig
+from ..services.http_client import HTTPClientRegistry
+from ..services.etag import ResponseETag
+from ..services.nft_inventory import NFTInventory
 from ..services.factory import ChainServiceFactory
-from ..exceptions import InvalidAddressError, TransferError, WalletNotFoundError
+from ..exceptions import InvalidAddressError, TransferError, WalletNotFoundError, ServiceUnavailableError
 from ..services.evm.nft import EVMNFTService
 from ..services.evm.utils import EVMUtils
 from ..decorators import verify_payment_password
@@ -62,6 +64,40 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
             logger.error(f"获取钱包时出错: {str(e)}")
             raise
 
+    async def _get_owned_assets(self, address: str) -> List[Dict[str, Any]]:
+        """获取钱包持有的全部 NFT（Helius 原始数据），结果按钱包缓存
+
+        Raises:
+            ServiceUnavailableError: Helius 请求失败
+        """
+        async def load() -> List[Dict[str, Any]]:
+            payload = {
+                "jsonrpc": "2.0",
+                "id": "my-id",
+                "method": HeliusConfig.GET_ASSETS_BY_OWNER,
+                "params": {
+                    "ownerAddress": address,
+                    "page": 1,
+                    "limit": 1000
+                }
+            }
+
+            async with HTTPClientRegistry.session('helius') as session:
+                async with session.post(HeliusConfig.get_rpc_url(), json=payload) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"获取NFT列表失败: HTTP {response.status}, 响应: {error_text}")
+                        raise ServiceUnavailableError(f'获取NFT列表失败: {error_text}')
+
+                    data = await response.json()
+
+            if 'error' in data:
+                logger.error(f"API返回错误: {data['error']}")
+                raise ServiceUnavailableError(f"获取NFT数据失败: {data['error']}")
+            return data.get('result', {}).get('items', [])
+
+        return await NFTInventory.get_or_load('SOL', address, load)
+
     @action(detail=False, methods=['get'], url_path=r'collections/(?P<wallet_id>[^/.]+)')
     @async_to_sync_api
     async def get_nft_collections(self, request, wallet_id=None):
@@ -81,159 +117,143 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
                     'status': 'error',
                     'message': '该接口仅支持SOL链钱包'
                 }, status=status.HTTP_400_BAD_REQUEST)
+
+            # 钱包 NFT 和合集显示状态未变化时直接返回 304
+            etag = await ResponseETag.aversion_etag(
+                'nft_collections',
+                [ResponseETag.wallet_scope('SOL', wallet.address), 'nft_visibility:SOL']
+            )
+            if ResponseETag.matches(request, etag):
+                return ResponseETag.not_modified(etag)
             
             logger.debug(f"开始获取NFT合集数据，钱包地址: {wallet.address}")
             
-            # 使用 Helius API 获取 NFT 数据
-            payload = {
-                "jsonrpc": "2.0",
-                "id": "my-id",
-                "method": HeliusConfig.GET_ASSETS_BY_OWNER,
-                "params": {
-                    "ownerAddress": wallet.address,
-                    "page": 1,
-                    "limit": 1000
-                }
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(HeliusConfig.get_rpc_url(), json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"获取NFT列表失败: HTTP {response.status}, 响应: {error_text}")
-                        return Response({
-                            'status': 'error',
-                            'message': f'获取NFT列表失败: {error_text}'
-                        }, status=status.HTTP_400_BAD_REQUEST)
+            # 使用 Helius API 获取 NFT 数据（按钱包缓存）
+            items = await self._get_owned_assets(wallet.address)
+
+            # 按合集分组NFTs
+            collections = {}
+            
+            for item in items:
+                try:
+                    # 获取合集信息
+                    grouping = item.get('grouping', [])
+                    collection_name = None
+                    collection_address = None
+                    collection_symbol = None
                     
-                    data = await response.json()
-                    if 'error' in data:
-                        logger.error(f"API返回错误: {data['error']}")
-                        return Response({
-                            'status': 'error',
-                            'message': f"获取NFT数据失败: {data['error']}"
-                        }, status=status.HTTP_400_BAD_REQUEST)
+                    # 尝试从grouping中获取合集信息
+                    for group in grouping:
+                        if group.get('group_key') == 'collection':
+                            collection_name = group.get('group_value')
+                            collection_address = group.get('group_value')
+                            break
                     
-                    items = data.get('result', {}).get('items', [])
+                    # 获取symbol
+                    content = item.get('content', {})
+                    metadata = content.get('metadata', {})
+                    collection_symbol = metadata.get('symbol', '')
                     
-                    # 按合集分组NFTs
-                    collections = {}
+                    # 如果没有合集名称，使用symbol
+                    if not collection_name:
+                        collection_name = collection_symbol or 'Unknown'
+                        collection_address = collection_symbol or 'Unknown'
                     
-                    for item in items:
-                        try:
-                            # 获取合集信息
-                            grouping = item.get('grouping', [])
-                            collection_name = None
-                            collection_address = None
-                            collection_symbol = None
-                            
-                            # 尝试从grouping中获取合集信息
-                            for group in grouping:
-                                if group.get('group_key') == 'collection':
-                                    collection_name = group.get('group_value')
-                                    collection_address = group.get('group_value')
-                                    break
-                            
-                            # 获取symbol
-                            content = item.get('content', {})
-                            metadata = content.get('metadata', {})
-                            collection_symbol = metadata.get('symbol', '')
-                            
-                            # 如果没有合集名称，使用symbol
-                            if not collection_name:
-                                collection_name = collection_symbol or 'Unknown'
-                                collection_address = collection_symbol or 'Unknown'
-                            
-                            if collection_address not in collections:
-                                collections[collection_address] = {
-                                    'name': collection_name,
-                                    'symbol': collection_symbol or collection_name,
-                                    'address': collection_address,
-                                    'nft_count': 0,
-                                    'image_url': None,
-                                    'first_mint': None
-                                }
-                            
-                            # 获取NFT信息
-                            mint = item.get('id', '')
-                            
-                            # 获取图片URL
-                            image_url = None
-                            files = content.get('files', [])
-                            if files and isinstance(files, list) and len(files) > 0:
-                                image_url = files[0].get('uri', '')
-                            
-                            if not image_url:
-                                image_url = metadata.get('image', '')
-                            
-                            collections[collection_address]['nft_count'] += 1
-                            
-                            # 记录第一个NFT的mint和图片
-                            if not collections[collection_address]['first_mint']:
-                                collections[collection_address]['first_mint'] = mint
-                                collections[collection_address]['image_url'] = image_url
-                            
-                        except Exception as e:
-                            logger.error(f"处理NFT数据时出错: {str(e)}")
-                            continue
+                    if collection_address not in collections:
+                        collections[collection_address] = {
+                            'name': collection_name,
+                            'symbol': collection_symbol or collection_name,
+                            'address': collection_address,
+                            'nft_count': 0,
+                            'image_url': None,
+                            'first_mint': None
+                        }
                     
-                    # 获取隐藏的合集列表
-                    hidden_collections = await sync_to_async(list)(
-                        NFTCollection.objects.filter(
-                            chain='SOL',
-                            is_visible=False
-                        ).values_list('symbol', flat=True)
-                    )
+                    # 获取NFT信息
+                    mint = item.get('id', '')
                     
-                    # 保存合集信息到数据库
-                    for collection_data in collections.values():
-                        try:
-                            # 检查合集是否已存在
-                            collection = await sync_to_async(NFTCollection.objects.filter(
-                                chain='SOL',
-                                symbol=collection_data['symbol']
-                            ).first)()
-                            
-                            if collection:
-                                # 更新现有合集
-                                collection.name = collection_data['name']
-                                collection.contract_address = collection_data['address']
-                                collection.logo = collection_data['image_url']
-                                await sync_to_async(collection.save)()
-                            else:
-                                # 创建新合集
-                                collection = NFTCollection(
-                                    chain='SOL',
-                                    name=collection_data['name'],
-                                    symbol=collection_data['symbol'],
-                                    contract_address=collection_data['address'],
-                                    logo=collection_data['image_url'],
-                                    is_visible=collection_data['symbol'] not in hidden_collections
-                                )
-                                await sync_to_async(collection.save)()
-                                
-                        except Exception as e:
-                            logger.error(f"保存合集信息失败: {str(e)}")
-                            continue
+                    # 获取图片URL
+                    image_url = None
+                    files = content.get('files', [])
+                    if files and isinstance(files, list) and len(files) > 0:
+                        image_url = files[0].get('uri', '')
                     
-                    # 转换为列表并过滤掉隐藏的合集
-                    collection_list = [{
-                        'name': data['name'],
-                        'symbol': data['symbol'],
-                        'address': data['address'],
-                        'nft_count': data['nft_count'],
-                        'image_url': data['image_url']
-                    } for data in collections.values() 
-                      if data['symbol'] not in hidden_collections]
+                    if not image_url:
+                        image_url = metadata.get('image', '')
                     
-                    # 按NFT数量排序
-                    collection_list.sort(key=lambda x: x['nft_count'], reverse=True)
+                    collections[collection_address]['nft_count'] += 1
                     
-                    return Response({
-                        'status': 'success',
-                        'data': collection_list
-                    })
+                    # 记录第一个NFT的mint和图片
+                    if not collections[collection_address]['first_mint']:
+                        collections[collection_address]['first_mint'] = mint
+                        collections[collection_address]['image_url'] = image_url
+                    
+                except Exception as e:
+                    logger.error(f"处理NFT数据时出错: {str(e)}")
+                    continue
+            
+            # 获取隐藏的合集列表
+            hidden_collections = await sync_to_async(list)(
+                NFTCollection.objects.filter(
+                    chain='SOL',
+                    is_visible=False
+                ).values_list('symbol', flat=True)
+            )
+            
+            # 保存合集信息到数据库
+            for collection_data in collections.values():
+                try:
+                    # 检查合集是否已存在
+                    collection = await sync_to_async(NFTCollection.objects.filter(
+                        chain='SOL',
+                        symbol=collection_data['symbol']
+                    ).first)()
                     
+                    if collection:
+                        # 更新现有合集
+                        collection.name = collection_data['name']
+                        collection.contract_address = collection_data['address']
+                        collection.logo = collection_data['image_url']
+                        await sync_to_async(collection.save)()
+                    else:
+                        # 创建新合集
+                        collection = NFTCollection(
+                            chain='SOL',
+                            name=collection_data['name'],
+                            symbol=collection_data['symbol'],
+                            contract_address=collection_data['address'],
+                            logo=collection_data['image_url'],
+                            is_visible=collection_data['symbol'] not in hidden_collections
+                        )
+                        await sync_to_async(collection.save)()
+                        
+                except Exception as e:
+                    logger.error(f"保存合集信息失败: {str(e)}")
+                    continue
+            
+            # 转换为列表并过滤掉隐藏的合集
+            collection_list = [{
+                'name': data['name'],
+                'symbol': data['symbol'],
+                'address': data['address'],
+                'nft_count': data['nft_count'],
+                'image_url': data['image_url']
+            } for data in collections.values() 
+              if data['symbol'] not in hidden_collections]
+            
+            # 按NFT数量排序
+            collection_list.sort(key=lambda x: x['nft_count'], reverse=True)
+            
+            return ResponseETag.attach(Response({
+                'status': 'success',
+                'data': collection_list
+            }), etag)
+            
+        except ServiceUnavailableError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"获取NFT合集列表失败: {str(e)}")
             return Response({
@@ -269,123 +289,99 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
             
             logger.debug(f"开始获取NFT集合数据，钱包地址: {wallet.address}, collection_symbol: {collection_symbol}")
             
-            # 使用 Helius API 获取 NFT 数据
-            payload = {
-                "jsonrpc": "2.0",
-                "id": "my-id",
-                "method": HeliusConfig.GET_ASSETS_BY_OWNER,
-                "params": {
-                    "ownerAddress": wallet.address,
-                    "page": 1,
-                    "limit": 1000
-                }
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(HeliusConfig.get_rpc_url(), json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"获取NFT列表失败: HTTP {response.status}, 响应: {error_text}")
-                        return Response({
-                            'status': 'error',
-                            'message': f'获取NFT列表失败: {error_text}'
-                        }, status=status.HTTP_400_BAD_REQUEST)
+            # 使用 Helius API 获取 NFT 数据（按钱包缓存）
+            items = await self._get_owned_assets(wallet.address)
+
+            # 过滤指定collection的NFTs
+            filtered_nfts = []
+            collection_info = {}
+            
+            for item in items:
+                try:
+                    # 获取合集信息
+                    grouping = item.get('grouping', [])
+                    item_collection_symbol = None
                     
-                    data = await response.json()
-                    if 'error' in data:
-                        logger.error(f"API返回错误: {data['error']}")
-                        return Response({
-                            'status': 'error',
-                            'message': f"获取NFT数据失败: {data['error']}"
-                        }, status=status.HTTP_400_BAD_REQUEST)
+                    # 从metadata中获取symbol
+                    content = item.get('content', {})
+                    metadata = content.get('metadata', {})
+                    item_collection_symbol = metadata.get('symbol', '')
                     
-                    items = data.get('result', {}).get('items', [])
+                    # 如果symbol不匹配，跳过
+                    if not item_collection_symbol or not collection_symbol or \
+                       item_collection_symbol.upper() != collection_symbol.upper():
+                        continue
                     
-                    # 过滤指定collection的NFTs
-                    filtered_nfts = []
-                    collection_info = {}
+                    # 获取NFT信息
+                    mint = item.get('id', '')
+                    name = metadata.get('name', '')
+                    description = metadata.get('description', '')
                     
-                    for item in items:
-                        try:
-                            # 获取合集信息
-                            grouping = item.get('grouping', [])
-                            item_collection_symbol = None
-                            
-                            # 从metadata中获取symbol
-                            content = item.get('content', {})
-                            metadata = content.get('metadata', {})
-                            item_collection_symbol = metadata.get('symbol', '')
-                            
-                            # 如果symbol不匹配，跳过
-                            if not item_collection_symbol or not collection_symbol or \
-                               item_collection_symbol.upper() != collection_symbol.upper():
-                                continue
-                            
-                            # 获取NFT信息
-                            mint = item.get('id', '')
-                            name = metadata.get('name', '')
-                            description = metadata.get('description', '')
-                            
-                            # 获取图片URL
-                            image_url = None
-                            files = content.get('files', [])
-                            if files and isinstance(files, list) and len(files) > 0:
-                                image_url = files[0].get('uri', '')
-                            
-                            if not image_url:
-                                image_url = metadata.get('image', '')
-                            
-                            # 处理属性
-                            attributes = []
-                            raw_attributes = metadata.get('attributes', [])
-                            if isinstance(raw_attributes, list):
-                                attributes = raw_attributes
-                            elif isinstance(raw_attributes, dict):
-                                attributes = [{'trait_type': k, 'value': v} for k, v in raw_attributes.items()]
-                            
-                            nft_info = {
-                                'mint': mint,
-                                'name': name,
-                                'symbol': item_collection_symbol,
-                                'description': description,
-                                'image_url': image_url,
-                                'attributes': attributes,
-                                'owner': wallet.address
-                            }
-                            
-                            filtered_nfts.append(nft_info)
-                            
-                            # 更新合集信息
-                            if not collection_info:
-                                collection_info = {
-                                    'name': metadata.get('collection', {}).get('name', '') or item_collection_symbol,
-                                    'symbol': item_collection_symbol,
-                                    'description': metadata.get('collection', {}).get('description', ''),
-                                    'image_url': metadata.get('collection', {}).get('image', '')
-                                }
-                            
-                        except Exception as e:
-                            logger.error(f"处理NFT数据时出错: {str(e)}")
-                            continue
+                    # 获取图片URL
+                    image_url = None
+                    files = content.get('files', [])
+                    if files and isinstance(files, list) and len(files) > 0:
+                        image_url = files[0].get('uri', '')
+                    
+                    if not image_url:
+                        image_url = metadata.get('image', '')
+                    
+                    # 处理属性
+                    attributes = []
+                    raw_attributes = metadata.get('attributes', [])
+                    if isinstance(raw_attributes, list):
+                        attributes = raw_attributes
+                    elif isinstance(raw_attributes, dict):
+                        attributes = [{'trait_type': k, 'value': v} for k, v in raw_attributes.items()]
+                    
+                    nft_info = {
+                        'mint': mint,
+                        'name': name,
+                        'symbol': item_collection_symbol,
+                        'description': description,
+                        'image_url': image_url,
+                        'attributes': attributes,
+                        'owner': wallet.address
+                    }
+                    
+                    filtered_nfts.append(nft_info)
+                    
+                    # 更新合集信息
+                    if not collection_info:
+                        collection_info = {
+                            'name': metadata.get('collection', {}).get('name', '') or item_collection_symbol,
+                            'symbol': item_collection_symbol,
+                            'description': metadata.get('collection', {}).get('description', ''),
+                            'image_url': metadata.get('collection', {}).get('image', '')
+                        }
+                    
+                except Exception as e:
+                    logger.error(f"处理NFT数据时出错: {str(e)}")
+                    continue
 
-                    if not filtered_nfts:
-                        logger.warning(f"未找到匹配的NFTs，collection_symbol: {collection_symbol}")
-                        return Response({
-                            'status': 'success',
-                            'data': {
-                                'collection': collection_info,
-                                'nfts': []
-                            }
-                        })
+            if not filtered_nfts:
+                logger.warning(f"未找到匹配的NFTs，collection_symbol: {collection_symbol}")
+                return Response({
+                    'status': 'success',
+                    'data': {
+                        'collection': collection_info,
+                        'nfts': []
+                    }
+                })
 
-                    return Response({
-                        'status': 'success',
-                        'data': {
-                            'collection': collection_info,
-                            'nfts': filtered_nfts
-                        }
-                    })
+            return Response({
+                'status': 'success',
+                'data': {
+                    'collection': collection_info,
+                    'nfts': filtered_nfts
+                }
+            })
 
+        except ServiceUnavailableError as e:
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"获取NFT集合数据时出错: {str(e)}")
             return Response({
@@ -425,7 +421,7 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with HTTPClientRegistry.session('helius') as session:
                 async with session.post(HeliusConfig.get_rpc_url(), json=payload) as response:
                     if response.status != 200:
                         error_text = await response.text()
@@ -689,6 +685,7 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
                 # 切换显示状态
                 collection.is_visible = not collection.is_visible
                 await sync_to_async(collection.save)()
+                await ResponseETag.abump('nft_visibility:SOL')
 
                 return Response({
                     'status': 'success',
@@ -707,6 +704,7 @@ class SolanaNFTViewSet(viewsets.ModelViewSet):
                     is_visible=False  # 默认设置为不可见
                 )
                 await sync_to_async(collection.save)()
+                await ResponseETag.abump('nft_visibility:SOL')
                 
                 return Response({
                     'status': 'success',
@@ -989,6 +987,14 @@ class EVMNFTViewSet(viewsets.ModelViewSet):
 
             # 验证钱包
             wallet = await self.get_wallet_async(int(wallet_id), device_id) # type: ignore
+
+            # 钱包 NFT 和合集显示状态未变化时直接返回 304
+            etag = await ResponseETag.aversion_etag(
+                'nft_collections',
+                [ResponseETag.wallet_scope(wallet.chain, wallet.address), f"nft_visibility:{wallet.chain}"]
+            )
+            if ResponseETag.matches(request, etag):
+                return ResponseETag.not_modified(etag)
             
             # 初始化 NFT 服务
             nft_service = EVMNFTService(wallet.chain)
@@ -996,10 +1002,10 @@ class EVMNFTViewSet(viewsets.ModelViewSet):
             # 获取 NFT 合集列表
             collections = await nft_service.get_nft_collections(wallet.address)
             
-            return Response({
+            return ResponseETag.attach(Response({
                 'status': 'success',
                 'data': collections
-            })
+            }), etag)
             
         except ValueError as e:
             return Response({
@@ -1187,6 +1193,7 @@ class EVMNFTViewSet(viewsets.ModelViewSet):
                 # 切换显示状态
                 collection.is_visible = not collection.is_visible
                 await sync_to_async(collection.save)()
+                await ResponseETag.abump(f"nft_visibility:{wallet.chain}")
                 
                 return Response({
                     'status': 'success',
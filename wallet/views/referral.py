@@ -12,6 +12,7 @@ from django.conf import settings
 from django.core.paginator import Paginator
 
 from ..models import ReferralLink, ReferralRelationship, UserPoints, PointsHistory, Task, TaskHistory
+from ..services.etag import ResponseETag
 from ..serializers import (
     ReferralLinkSerializer, ReferralRelationshipSerializer,
     UserPointsSerializer, PointsHistorySerializer, ReferralStatsSerializer
@@ -179,6 +180,7 @@ class ReferralViewSet(viewsets.ViewSet):
                         'is_stage_reward': bool(stage_reward)
                     }
                 )
+                ResponseETag.bump(f"tasks:{referral_link.device_id}")
                 
                 # 获取推荐人的积分账户并添加积分
                 user_points = UserPoints.get_or_create_user_points(referral_link.device_id)
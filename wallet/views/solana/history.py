@@ -5,9 +5,9 @@ from rest_framework import status, viewsets
 from django.shortcuts import get_object_or_404
 import logging
 from django.core.cache import cache
-from functools import lru_cache
 
-from ...models import Wallet, Transaction, Token
+from ...models import Wallet, Transaction
+from ...services.token_registry import TokenRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -18,79 +18,16 @@ class SolanaHistoryViewSet(viewsets.ViewSet):
         """检查设备是否有权限访问钱包"""
         return wallet.device_id == device_id
     
-    # 使用内存缓存装饰器，缓存最近的 100 个查询结果
-    @lru_cache(maxsize=100)
-    def get_token_info_cached(self, token_address):
-        """获取代币信息（带缓存）"""
-        return self._get_token_info(token_address)
-    
-    def _get_token_info(self, token_address):
-        """获取代币信息的实际实现"""
-        try:
-            token = Token.objects.filter(address=token_address).first()
-            if token:
-                return {
-                    'address': token.address,
-                    'name': token.name,
-                    'symbol': token.symbol,
-                    'decimals': token.decimals,
-                    'logo': token.logo
-                }
-        except Exception as e:
-            logger.error(f"获取代币信息失败: {str(e)}")
-        
-        # 如果找不到代币信息，返回默认值
-        # 对于常见代币，提供默认信息
-        DEFAULT_TOKENS = {
-            'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': {
-                'name': 'USD Coin',
-                'symbol': 'USDC',
-                'decimals': 6,
-                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v/logo.png'
-            },
-            'DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263': {
-                'name': 'Bonk',
-                'symbol': 'BONK',
-                'decimals': 5,
-                'logo': 'https://d23exngyjlavgo.cloudfront.net/solana_DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263'
-            },
-            'So11111111111111111111111111111111111111112': {
-                'name': 'Solana',
-                'symbol': 'SOL',
-                'decimals': 9,
-                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/So11111111111111111111111111111111111111112/logo.png'
-            },
-            'EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm': {
-                'name': 'dogwifhat',
-                'symbol': '$WIF',
-                'decimals': 6,
-                'logo': 'https://s2.coinmarketcap.com/static/img/coins/64x64/24484.png'
-            },
-            'mSoLzYCxHdYgdzU16g5QSh3i5K3z3KZK7ytfqcJm7So': {
-                'name': 'Marinade staked SOL',
-                'symbol': 'mSOL',
-                'decimals': 9,
-                'logo': 'https://raw.githubusercontent.com/solana-labs/token-list/main/assets/mainnet/mSoLzYCxHdYgdzU16g5QSh3i5K3z3KZK7ytfqcJm7So/logo.png'
-            },
-            'Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB': {
-                'name': 'USDT',
-                'symbol': 'USDT',
-                'decimals': 6,
-                'logo': 'https://s2.coinmarketcap.com/static/img/coins/64x64/825.png'
-            }
-        }
-        
-        if token_address in DEFAULT_TOKENS:
-            token_info = DEFAULT_TOKENS[token_address]
+    def _format_token_info(self, token_address, token):
+        """转换为接口返回的代币信息，未知代币返回默认值"""
+        if token:
             return {
                 'address': token_address,
-                'name': token_info['name'],
-                'symbol': token_info['symbol'],
-                'decimals': token_info['decimals'],
-                'logo': token_info['logo']
+                'name': token['name'],
+                'symbol': token['symbol'],
+                'decimals': token['decimals'],
+                'logo': token['logo']
             }
-        
-        # 其他未知代币
         return {
             'address': token_address,
             'name': 'Unknown Token',
@@ -100,44 +37,31 @@ class SolanaHistoryViewSet(viewsets.ViewSet):
         }
     
     def get_token_info(self, token_address):
-        """获取代币信息的公共接口"""
+        """获取代币信息（代币注册表带 TTL 和容量上限，跨请求共享）"""
         if not token_address:
-            return {
-                'address': '',
-                'name': 'Unknown Token',
-                'symbol': 'Unknown',
-                'decimals': 0,
-                'logo': ''
-            }
+            return self._format_token_info('', None)
         
-        return self.get_token_info_cached(token_address)
+        try:
+            token = TokenRegistry.get_many_sync('SOL', [token_address]).get(token_address)
+        except Exception as e:
+            logger.error(f"获取代币信息失败: {str(e)}")
+            token = None
+        return self._format_token_info(token_address, token)
     
     def batch_get_token_info(self, token_addresses):
-        """批量获取代币信息"""
-        # 去重
-        unique_addresses = set(filter(None, token_addresses))
+        """批量获取代币信息，未命中的代币一次查询数据库、一次批量请求上游"""
+        unique_addresses = list(dict.fromkeys(filter(None, token_addresses)))
         
-        # 从数据库批量查询
-        db_tokens = {
-            token.address: {
-                'address': token.address,
-                'name': token.name,
-                'symbol': token.symbol,
-                'decimals': token.decimals,
-                'logo': token.logo
-            }
-            for token in Token.objects.filter(address__in=unique_addresses)
-        }
-        
-        # 对于数据库中没有的代币，使用默认信息或缓存
-        result = {}
-        for address in unique_addresses:
-            if address in db_tokens:
-                result[address] = db_tokens[address]
-            else:
-                result[address] = self.get_token_info(address)
+        try:
+            tokens = TokenRegistry.get_many_sync('SOL', unique_addresses, fetch_missing=True)
+        except Exception as e:
+            logger.error(f"批量获取代币信息失败: {str(e)}")
+            tokens = {}
         
-        return result
+        return {
+            address: self._format_token_info(address, tokens.get(address))
+            for address in unique_addresses
+        }
     
     # 注意这里使用 list 方法，而不是 action 装饰器
     def list(self, request, wallet_id=None):
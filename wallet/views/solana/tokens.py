@@ -24,6 +24,9 @@ from django.core.paginator import Paginator
 from ...models import Wallet, Token, Transaction, PaymentPassword
 from ...serializers import WalletSerializer, TokenSerializer
 from ...services.factory import ChainServiceFactory
+from ...services.portfolio_cache import PortfolioSnapshot
+from ...services.etag import ResponseETag
+from ...services.portfolio_stream import PortfolioStream
 from ...services.solana_config import RPCConfig, MoralisConfig, HeliusConfig
 from ...decorators import verify_payment_password
 
@@ -117,12 +120,25 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
                     'message': 'SOL balance service unavailable'
                 }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
-            result = await balance_service.get_all_token_balances(wallet.address, include_hidden=False)
+            # 默认使用资产快照，refresh=true 时强制刷新
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+            if not refresh:
+                # 资产快照未变化时直接返回 304
+                etag = await PortfolioSnapshot.aget_etag('SOL', wallet.address)
+                if ResponseETag.matches(request, etag):
+                    return ResponseETag.not_modified(etag)
+
+            result, etag = await PortfolioSnapshot.get_or_load(
+                'SOL',
+                wallet.address,
+                lambda: balance_service.get_all_token_balances(wallet.address, include_hidden=False),
+                refresh=refresh
+            )
             
-            return Response({
+            return ResponseETag.attach(Response({
                 'status': 'success',
                 'data': result
-            })
+            }), etag)
             
         except Exception as e:
             logger.error(f"Failed to get token balances: {str(e)}")
@@ -131,6 +147,43 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'], url_path='tokens/stream')
+    @async_to_sync_api
+    async def tokens_stream(self, request, pk=None):
+        """流式获取SOL钱包的所有代币余额
+
+        依次写出 SOL、每个价格解析完成的代币，最后写出总价值。
+        transport=sse 时使用 Server-Sent Events，默认 NDJSON；refresh=true 时强制刷新。
+        """
+        try:
+            device_id = request.query_params.get('device_id')
+            if not device_id:
+                return Response({
+                    'status': 'error',
+                    'message': 'Device ID is required'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            wallet = await self.get_wallet_async(int(pk), device_id)
+            if wallet.chain != 'SOL':
+                return Response({
+                    'status': 'error',
+                    'message': 'This API only supports SOL chain wallets'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            balance_service = ChainServiceFactory.get_balance_service('SOL')
+            refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+            return PortfolioStream.response(
+                PortfolioStream.wallet_frames('SOL', wallet.address, balance_service, refresh=refresh),
+                PortfolioStream.get_transport(request)
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to stream token balances: {str(e)}")
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=True, methods=['post'], url_path='tokens/toggle-visibility')
     @async_to_sync_api
     async def toggle_token_visibility(self, request, pk=None):
@@ -164,6 +217,7 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
             
             # 切换代币显示状态
             result = await balance_service.toggle_token_visibility(wallet.id, token_address)
+            await PortfolioSnapshot.ainvalidate('SOL', wallet.address)
             
             return Response({
                 'status': 'success',
@@ -730,7 +784,7 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # 获取并验证钱包
-            wallet = self.get_wallet_async(int(pk), device_id)
+            wallet = async_to_sync(self.get_wallet_async)(int(pk), device_id)
             
             if wallet.chain != 'SOL':
                 return Response({
@@ -741,6 +795,16 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
             # 获取分页参数
             page = int(request.query_params.get('page', 1))
             page_size = int(request.query_params.get('page_size', 20))
+
+            # 交易记录未变化时直接返回 304
+            etag = ResponseETag.version_etag(
+                'token_transfers',
+                [ResponseETag.wallet_scope('SOL', wallet.address)],
+                page,
+                page_size
+            )
+            if ResponseETag.matches(request, etag):
+                return ResponseETag.not_modified(etag)
             
             # 修改查询条件，同时包含 TRANSFER 和 SWAP 类型
             transactions = Transaction.objects.filter(
@@ -809,7 +873,7 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
                 
                 serialized_transactions.append(tx_data)
             
-            return Response({
+            return ResponseETag.attach(Response({
                 'status': 'success',
                 'data': {
                     'total': paginator.count,
@@ -817,7 +881,7 @@ class SolanaWalletViewSet(viewsets.ModelViewSet):
                     'page_size': page_size,
                     'transactions': serialized_transactions
                 }
-            })
+            }), etag)
             
         except Exception as e:
             logger.error(f"获取代币转账记录失败: {str(e)}")
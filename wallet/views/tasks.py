@@ -8,6 +8,7 @@ import logging
 from django.conf import settings
 from django.db.models import Count
 from ..utils.twitter import TwitterValidator
+from ..services.etag import ResponseETag
 from django.core.cache import cache
 from datetime import timedelta
 
@@ -61,6 +62,7 @@ class TaskViewSet(viewsets.ViewSet):
                 task=task,
                 points_awarded=task.points
             )
+            ResponseETag.bump(f"tasks:{device_id}")
 
             # Add points
             user_points = UserPoints.get_or_create_user_points(device_id)
@@ -105,6 +107,15 @@ class TaskViewSet(viewsets.ViewSet):
                     'message': 'Device ID is required'
                 }, status=400)
 
+            # Return 304 when the task history has not changed
+            etag = ResponseETag.version_etag(
+                'list_tasks',
+                [f"tasks:{device_id}"],
+                timezone.now().date()
+            )
+            if ResponseETag.matches(request, etag):
+                return ResponseETag.not_modified(etag)
+
             # Get all active tasks
             tasks = Task.objects.filter(
                 is_active=True
@@ -153,10 +164,10 @@ class TaskViewSet(viewsets.ViewSet):
                 task_data['is_completed'] = is_completed
                 task_list.append(task_data)
 
-            return Response({
+            return ResponseETag.attach(Response({
                 'status': 'success',
                 'data': task_list
-            })
+            }), etag)
             
         except Exception as e:
             logger.error("[list_tasks] Error: %s", str(e), exc_info=True)
@@ -268,6 +279,7 @@ class TaskViewSet(viewsets.ViewSet):
                 task=task,
                 points_awarded=task.points
             )
+            ResponseETag.bump(f"tasks:{device_id}")
             
             # Add points
             user_points = UserPoints.get_or_create_user_points(device_id)
@@ -344,6 +356,7 @@ class TaskViewSet(viewsets.ViewSet):
                     'tweet_id': tweet_id
                 }
             )
+            ResponseETag.bump(f"tasks:{device_id}")
 
             # 5. 添加积分
             user_points = UserPoints.get_or_create_user_points(device_id)
@@ -493,6 +506,7 @@ class ShareTaskTokenViewSet(viewsets.ModelViewSet):
                     'tweet_id': tweet_id
                 }
             )
+            ResponseETag.bump(f"tasks:{device_id}")
 
             # 5. 添加积分
             user_points = UserPoints.get_or_create_user_points(device_id)
@@ -573,6 +587,7 @@ def complete_task(device_id, task_code):
                 'task_description': task.description
             }
         )
+        ResponseETag.bump(f"tasks:{device_id}")
         
         user_points = UserPoints.get_or_create_user_points(device_id)
         user_points.add_points(
@@ -18,6 +18,7 @@ from solana.keypair import Keypair
 from base58 import b58encode, b58decode
 from eth_account import Account
 from cryptography.fernet import Fernet
+from asgiref.sync import async_to_sync
 
 from ..models import Wallet, PaymentPassword
 from ..serializers import (
@@ -27,6 +28,8 @@ from ..serializers import (
     ChainSelectionSerializer # type: ignore
 )
 from ..decorators import verify_payment_password
+from ..services.device_portfolio import DevicePortfolio
+from ..services.portfolio_stream import PortfolioStream
 
 logger = logging.getLogger(__name__)
 
@@ -1101,6 +1104,54 @@ class WalletViewSet(viewsets.ModelViewSet):
             'wallets': serializer.data
         })
 
+    @action(detail=False, methods=['get'])
+    def portfolio(self, request):
+        """获取设备下所有钱包的资产汇总
+
+        各链并发加载，超时或失败的钱包在结果中单独标记（status 为 timeout / error），
+        不影响其他链；total_value_usd 只统计加载成功的钱包。refresh=true 时强制刷新。
+        """
+        device_id = request.query_params.get('device_id')
+        if not device_id:
+            return Response({
+                'status': 'error',
+                'message': '缺少设备ID'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+        try:
+            result = async_to_sync(DevicePortfolio.load)(device_id, refresh=refresh)
+            return Response({
+                'status': 'success',
+                'data': result
+            })
+        except Exception as e:
+            logger.error(f"获取设备资产汇总失败: {str(e)}")
+            return Response({
+                'status': 'error',
+                'message': f'获取设备资产汇总失败: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='portfolio/stream')
+    def portfolio_stream(self, request):
+        """流式获取设备下所有钱包的资产汇总
+
+        每个钱包加载完成后写出一帧（type 为 wallet），最后写出总价值（type 为 totals）。
+        transport=sse 时使用 Server-Sent Events，默认 NDJSON；refresh=true 时强制刷新。
+        """
+        device_id = request.query_params.get('device_id')
+        if not device_id:
+            return Response({
+                'status': 'error',
+                'message': '缺少设备ID'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true')
+        return PortfolioStream.response(
+            DevicePortfolio.frames(device_id, refresh=refresh),
+            PortfolioStream.get_transport(request)
+        )
+
     @action(detail=False, methods=['get'])
     def get_supported_chains(self, request):
         """获取支持的链列表